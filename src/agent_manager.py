@@ -1,30 +1,149 @@
 import os
 import json
+import time
+import uuid
+from contextlib import nullcontext
 from typing import List, Any, Dict, Optional
 from langchain_core.messages import AIMessage, ToolMessage, HumanMessage
 from .graph_builder import build_agent_graph
-from .upload_helpers import build_temp_retriever
+from .upload_indexer import upload_indexer, IndexJob
+from .upload_helpers import SessionUploadIndex
+from .upload_pool import upload_pool
+from .summary_memory import SummaryMemory
+from .answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from .prompts import needs_save, needs_slack
+from . import model_router
+from .tool_result_store import ToolResultStore
+from .cassette import AGENT_RECORD_DIR, CassetteWriter, TurnRecorder
+from .util.util import is_valid_session_id
 
 # Agent Logic 클래스 정의 (build_graph, 멀티턴 messages 관리)
 class AgentFlowManager:
     """
     LangGraph 기반 Agent의 상태(messages)와 실행 로직을 관리하는 클래스
     """
-    def __init__(self):
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex  # 업로드 retriever 풀의 key
+        if not is_valid_session_id(self.session_id):
+            # 도구 결과 저장소 / 카세트 경로에 쓰이므로 경로 조작이 가능한 값은 거부
+            raise ValueError(f"Invalid session_id: {self.session_id!r}")
         # graph는 FastAPI startup에서 생성된 객체를 계속 전달 받는다.
         self.graph = build_agent_graph()
         # 멀티턴 상태 저장을 위한 변수
         self.messages: List[Any] = []
-        self.retriver = None
-        self.upload_file_path = None
+        self.memory = SummaryMemory()  # 오래된 대화 요약 (턴 응답 후 백그라운드에서 갱신)
+        self.tool_results = ToolResultStore(self.session_id)  # 지난 턴 도구 결과 전문 (히스토리에는 참조만)
+        self.cassette = CassetteWriter(self.session_id) if AGENT_RECORD_DIR else None  # 성능 회귀용 녹화
+        # 세션 업로드 corpus (여러 파일이 하나의 retriever 로 합쳐짐) 는 upload_pool 이 소유
+        self.index_jobs: Dict[str, IndexJob] = {}  # {path: 백그라운드 색인 작업}
+        self._upload_signatures: Dict[str, Any] = {}  # {path: sha256 또는 (mtime, size)} — 같은 이름으로 수정본이 올라와도 감지
+
+    def start_indexing(self, upload_file_path: str, signature: Optional[Any] = None) -> IndexJob:
+        """
+        업로드 파일을 세션 corpus 에 추가(색인)하는 작업을 백그라운드로 시작합니다.
+        파일이 그대로면 기존 작업을 사용하고, 수정본이면 바뀐 chunk 만 다시 임베딩합니다.
+        signature: 파일 버전 식별자 (/upload 는 내용 sha256 을 넘김, 없으면 mtime/size)
+        """
+        if signature is None:
+            try:
+                st = os.stat(upload_file_path)
+                signature = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                signature = (None, None)
+
+        job = self.index_jobs.get(upload_file_path)
+        if job is None or signature != self._upload_signatures.get(upload_file_path):
+            self._upload_signatures[upload_file_path] = signature
+            job = self._submit(upload_file_path)
+        return job
+
+    def _submit(self, upload_file_path: str) -> IndexJob:
+        # 색인이 끝날 때까지 풀 참조를 잡아 두어 작업 중에 컬렉션이 축출되지 않게 함
+        store = upload_pool.acquire(self.session_id)
+        job = upload_indexer.submit(store, upload_file_path,
+                                    on_done=lambda: upload_pool.release_ref(self.session_id))
+        self.index_jobs[upload_file_path] = job
+        return job
+
+    @property
+    def upload_index(self) -> Optional[SessionUploadIndex]:
+        return upload_pool.get(self.session_id)
+
+    def _restore_if_evicted(self) -> None:
+        """메모리 상한으로 컬렉션이 축출되었으면 다시 색인 (embedding_cache 적중 → 임베딩 호출 없음)."""
+        if self.index_jobs and self.upload_index is None:
+            for path in list(self.index_jobs):
+                self._submit(path)
+
+    def close(self) -> None:
+        """세션 종료: 색인 작업 취소 + 업로드 컬렉션 해제."""
+        for job in self.index_jobs.values():
+            job.cancel()
+        self.index_jobs.clear()
+        self._upload_signatures.clear()
+        upload_pool.release(self.session_id)
+        self.tool_results.clear()
+
+    def remove_upload(self, upload_file_path: str) -> None:
+        """세션 corpus 에서 파일 하나를 제거합니다."""
+        job = self.index_jobs.pop(upload_file_path, None)
+        self._upload_signatures.pop(upload_file_path, None)
+        if job is not None and job.cancel():
+            return  # 색인 중/대기 중이면 워커가 끝난 뒤 chunk 를 제거 (요청 스레드는 기다리지 않음)
+        store = self.upload_index
+        if store is not None:
+            upload_indexer.remove(store, upload_file_path)  # 다른 파일 색인 중이어도 턴은 기다리지 않음
+
+    def sync_uploads(self, upload_file_paths: List[str]) -> None:
+        """클라이언트가 보낸 파일 목록에 맞춰 corpus 를 갱신 (새/수정 파일 색인, 빠진 파일 제거)."""
+        for path in list(self.index_jobs):
+            if path not in upload_file_paths:
+                self.remove_upload(path)
+        for path in upload_file_paths:
+            self.start_indexing(path)
+
+    def index_status(self) -> Optional[dict]:
+        """파일별 색인 상태 + 전체 상태 (하나라도 진행 중이면 running)."""
+        if not self.index_jobs:
+            return None
+        files = [job.status() for job in self.index_jobs.values()]
+        states = {f["state"] for f in files}
+        if states & {"pending", "running"}:
+            state = "running"
+        elif "failed" in states:
+            state = "failed" if states == {"failed"} else "partial"
+        else:
+            state = "ready"
+        return {
+            "state": state,
+            "files": files,
+            "done": sum(f["done"] for f in files),
+            "total": sum(f["total"] or 0 for f in files),
+        }
     
-    def run_agent_flow(self, user_input: str, upload_file_path: Optional[str] = None) -> dict:
+    @staticmethod
+    def _used_side_effect_tools(messages: List[Any]) -> bool:
+        return any(isinstance(m, ToolMessage) and m.name in {"save_text", "slack_notify"} for m in messages)
+
+    def _cacheable(self, user_input: str) -> bool:
+        """답변 캐시 사용 가능 여부: 첫 턴 + 업로드 없음 + 저장/슬랙 같은 부수 효과 요청 아님."""
+        has_context = any(isinstance(m, (HumanMessage, AIMessage, ToolMessage)) for m in self.messages)
+        return (ANSWER_CACHE_ENABLED and not has_context and not self.index_jobs
+                and not (needs_save(user_input) or needs_slack(user_input)))
+
+    def run_agent_flow(self, user_input: str, upload_file_paths: Optional[List[str]] = None) -> dict:
+        """
+        upload_file_paths: 세션 corpus 로 유지할 업로드 파일 목록.
+        None 이면 기존 corpus 를 그대로 사용하고, [] 이면 corpus 를 비웁니다.
+        """
 
         current_messages = self.messages
 
         # 종료 명령어 처리
         if user_input.lower() in {"exit", "종료", "quit", "q"}:
             self.messages = [] # 세션 초기화
+            self.memory.reset()
+            self.tool_results.clear()
             return "챗봇 세션이 초기화되었습니다. 다시 시작합니다."
 
         try:
@@ -33,26 +152,50 @@ class AgentFlowManager:
                 "user_input": user_input,
                 "messages": current_messages, # 이전 대화 상태 전달
             }
+            summary, _ = self.memory.current()  # 준비된 요약만 사용 (진행 중이면 기다리지 않음)
+            if summary:
+                state["memory_summary"] = summary
 
-            if upload_file_path is not None:
-                # upload_file_path 가 설정되어 있다면, 이 경로 기준으로 retriever 생성
-                if self.upload_file_path != upload_file_path:
-                    self.upload_file_path = upload_file_path
-                    self.retriver = build_temp_retriever(upload_file_path)
-                
-                if self.retriver is not None:
-                    state["retriever"] = self.retriver
+            if upload_file_paths is not None:
+                self.sync_uploads(upload_file_paths)
+                if not upload_file_paths:
+                    upload_pool.release(self.session_id)
 
+            # 첫 턴 질문이면 의미 기반 답변 캐시부터 (적중 시 그래프 실행 생략)
+            cache_vec = None
+            cacheable = self._cacheable(user_input)
+            if cacheable:
+                cached, cache_vec = answer_cache.lookup(user_input)
+                if cached is not None:
+                    self.messages = current_messages + [HumanMessage(content=user_input), AIMessage(content=cached)]
+                    return {"message": cached, "filepath": "", "cached": True, "index_status": None}
             else:
-                self.retriever = None
-                self.upload_file_path = None
+                answer_cache.bypass()
 
-            # LangGraph 실행
-            response = self.graph.invoke(state)
+            lease = nullcontext()
+            if self.index_jobs:
+                self._restore_if_evicted()
+                lease = upload_pool.lease(self.session_id)  # 턴 동안 컬렉션 유지
+
+            with lease as store:
+                if store is not None:
+                    # 색인은 백그라운드에서 진행 — 턴은 기다리지 않고, 준비된(부분) 결과만 사용
+                    state["retriever"] = store.retriever
+
+                # LangGraph 실행
+                recorder = TurnRecorder() if self.cassette else None
+                started = time.perf_counter()
+                response = self.graph.invoke(state, config={"callbacks": [recorder]} if recorder else None)
+                elapsed = time.perf_counter() - started
+                model_router.record(response.get("route"), response.get("route_reason"), elapsed)
+                if recorder:
+                    self.cassette.write_turn(recorder, user_input, state.get("memory_summary"), elapsed)
         
-            # 결과 메시지 업데이트
+            # 결과 메시지 업데이트 — 이번 턴 도구 결과 전문은 세션 저장소로 옮기고 히스토리에는 참조/요약만
             updated_messages = response["messages"]
-            self.messages = updated_messages
+            self.messages = self.tool_results.compact(updated_messages)
+            # 다음 턴을 위한 요약은 응답을 돌려준 뒤 백그라운드에서
+            self.memory.schedule(self.messages)
             
             final_answer = ""
             file_path = ""
@@ -94,7 +237,11 @@ class AgentFlowManager:
                 if final_answer and file_path:
                     break 
 
-            return {"message": final_answer, "filepath": file_path, "response": response}
+            if cacheable and final_answer and not self._used_side_effect_tools(updated_messages):
+                answer_cache.store(user_input, final_answer, cache_vec)
+
+            return {"message": final_answer, "filepath": file_path, "response": response,
+                    "index_status": self.index_status()}
         
         except Exception as e:
             print(f"Agent 실행 중 오류 발생: {e}")
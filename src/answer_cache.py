@@ -0,0 +1,152 @@
+# new_src/answer_cache.py
+"""
+첫 턴 질문의 의미 기반 답변 캐시 (그래프 앞단)
+
+"pandas merge 사용법" / "pandas merge 어떻게 써?" 처럼 같은 질문의 변형이 대부분이라,
+첫 턴 질문을 임베딩으로 색인해 두고 유사도가 ANSWER_CACHE_THRESHOLD 이상이면 저장된 답변을 바로 돌려줍니다.
+(LLM / 도구 호출 / 요약 모두 생략)
+
+- 업로드가 있거나 이전 대화가 있는 세션, 저장/슬랙 요청은 캐시를 쓰지 않음 (AgentFlowManager 에서 판단)
+- TTL(ANSWER_CACHE_TTL 초) 지난 항목은 조회 시 제거
+- 최대 ANSWER_CACHE_SIZE 개, 넘치면 가장 오래 사용되지 않은 항목부터 제거 (LRU)
+- 메트릭: answer_cache_requests_total{result=hit|miss|bypass|error}, answer_cache_entries, answer_cache_hit_rate
+"""
+import os
+import re
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+
+def normalize_question(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower().rstrip("?？.!"))
+
+
+class _Entry:
+    def __init__(self, question: str, answer: str):
+        self.question = question
+        self.answer = answer
+        self.created = time.time()
+        self.last_used = self.created
+        self.hits = 0
+
+
+class SemanticAnswerCache:
+    def __init__(self, embeddings=None, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_SIZE):
+        self._embeddings = embeddings  # None 이면 providers.embeddings() (지연 생성)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: List[_Entry] = []
+        self._vecs = np.zeros((0, 0), dtype=np.float32)  # 행 = _entries 와 같은 순서 (정규화된 벡터)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from .embedding_cache import EMBED_MODEL
+            from .providers import embeddings
+            self._embeddings = embeddings(EMBED_MODEL)
+        return self._embeddings
+
+    def _embed(self, question: str) -> np.ndarray:
+        v = np.asarray(self.embeddings.embed_query(normalize_question(question)), dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def _drop(self, keep: np.ndarray) -> None:
+        """(lock 보유 상태) keep 마스크에 해당하는 항목만 남김."""
+        self._entries = [e for e, k in zip(self._entries, keep) if k]
+        self._vecs = self._vecs[keep]
+
+    def _purge_expired(self) -> None:
+        if not self._entries:
+            return
+        now = time.time()
+        keep = np.array([now - e.created <= self.ttl for e in self._entries])
+        if not keep.all():
+            self._drop(keep)
+
+    def lookup(self, question: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """(캐시된 답변 또는 None, 질문 벡터). 벡터는 miss 후 store() 에 넘겨 임베딩을 재사용."""
+        key = normalize_question(question)
+        with self._lock:
+            self._purge_expired()
+            exact = next((e for e in self._entries if e.question == key), None)
+            if exact is not None:
+                return self._hit(exact, 1.0), None
+
+        try:
+            vec = self._embed(question)  # 임베딩 API 호출은 lock 밖에서
+        except Exception as e:
+            # 캐시 장애가 턴 실패로 이어지지 않도록 그래프로 진행
+            metrics.inc("answer_cache_requests_total", result="error")
+            print(f"[answer_cache] embed failed: {e}")
+            return None, None
+        with self._lock:
+            if len(self._entries):
+                scores = self._vecs @ vec
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    return self._hit(self._entries[best], float(scores[best])), vec
+            self.misses += 1
+        metrics.inc("answer_cache_requests_total", result="miss")
+        return None, vec
+
+    def _hit(self, entry: _Entry, score: float) -> str:
+        entry.hits += 1
+        entry.last_used = time.time()
+        self.hits += 1
+        metrics.inc("answer_cache_requests_total", result="hit")
+        metrics.observe("answer_cache_hit_similarity", score)
+        return entry.answer
+
+    def store(self, question: str, answer: str, vec: Optional[np.ndarray] = None) -> None:
+        if not answer.strip():
+            return
+        if vec is None:
+            try:
+                vec = self._embed(question)
+            except Exception as e:
+                print(f"[answer_cache] embed failed: {e}")
+                return
+        with self._lock:
+            key = normalize_question(question)
+            if any(e.question == key for e in self._entries):
+                return
+            if len(self._entries) >= self.max_entries:
+                # LRU: 가장 오래 사용되지 않은 항목 제거
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i].last_used)
+                keep = np.ones(len(self._entries), dtype=bool)
+                keep[oldest] = False
+                self._drop(keep)
+                metrics.inc("answer_cache_evictions_total")
+            self._entries.append(_Entry(key, answer))
+            row = vec.astype(np.float32)[None, :]
+            self._vecs = row if not len(self._vecs) else np.vstack([self._vecs, row])
+
+    def bypass(self) -> None:
+        metrics.inc("answer_cache_requests_total", result="bypass")
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, hits, misses = len(self._entries), self.hits, self.misses
+        return {
+            "answer_cache_entries": n,
+            "answer_cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+answer_cache = SemanticAnswerCache()
+metrics.register_collector(answer_cache.stats)
@@ -0,0 +1,294 @@
+# new_src/cassette.py
+"""
+실제 /agent 대화 녹화(record) / 오프라인 재생(replay) — 성능 회귀 기준선
+
+AGENT_RECORD_DIR 가 설정되면 AgentFlowManager 가 턴마다 한 줄씩 세션 카세트(<dir>/<session_id>.jsonl.gz)에 기록합니다.
+  - 사용자 입력, 이전 요약(memory_summary), 턴 시간
+  - 노드별 실행 시간 (LangGraph 노드 단위)
+  - chatbot 의 LLM 호출: 입력 프롬프트 토큰 수, 지연, 응답 메시지 (hedge 로 중복 호출되면 먼저 끝난 것만)
+  - 도구 호출: 이름, 입력, 출력, 지연
+
+재생은 녹화된 LLM 응답/도구 출력으로 그래프를 다시 실행합니다 (API 호출 없음).
+node.py / prompts.py / tools.py 변경 후 도구 호출 흐름이 같은지 확인하고, 노드 시간·프롬프트 토큰 차이를 보고합니다.
+
+    AGENT_RECORD_DIR=data/cassettes uv run uvicorn src.web.main:app --port 8000   # 녹화
+    uv run python -m src.cassette data/cassettes/<session_id>.jsonl.gz [--realtime]  # 재생 (흐름이 다르면 exit 1)
+
+제약: 답변 캐시 적중 턴은 그래프를 거치지 않아 기록되지 않고, 업로드 retriever 는 재생하지 않습니다.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+AGENT_RECORD_DIR = os.getenv("AGENT_RECORD_DIR")  # 설정되면 녹화
+CASSETTE_VERSION = 1
+
+
+def _tool_output(output: Any) -> str:
+    return output.content if hasattr(output, "content") else str(output)
+
+def _flow(turn: dict) -> List[str]:
+    """비교용 도구 호출 흐름 (prefetch 분기는 병렬이라 순서를 무시하고 정렬)."""
+    return sorted(f"{t['name']}({json.dumps(t['input'], ensure_ascii=False, sort_keys=True)})"
+                  for t in turn["tools"])
+
+
+class TurnRecorder(BaseCallbackHandler):
+    """graph.invoke(config={"callbacks": [recorder]}) 한 번의 노드/LLM/도구 이벤트 수집."""
+
+    def __init__(self):
+        self.nodes: List[dict] = []
+        self.llm: List[dict] = []
+        self.tools: List[dict] = []
+        self._started: Dict[UUID, tuple] = {}
+        self._llm_parents: set = set()
+        self._lock = threading.Lock()
+
+    # ── 노드 ──
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata: Optional[dict] = None,
+                       **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._started[run_id] = ("node", node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started:
+            with self._lock:
+                self.nodes.append({"node": started[1], "seconds": time.perf_counter() - started[2]})
+
+    # ── LLM ──
+    def on_chat_model_start(self, serialized, messages: List[List[BaseMessage]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[dict] = None,
+                            **kwargs: Any) -> None:
+        from .history_window import message_tokens
+        node = (metadata or {}).get("langgraph_node", "")
+        prompt_tokens = sum(message_tokens(m) for m in messages[0])
+        self._started[run_id] = ("llm", node, time.perf_counter(), parent_run_id, prompt_tokens)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if not started:
+            return
+        _, node, t0, parent, prompt_tokens = started
+        with self._lock:
+            if parent is not None and parent in self._llm_parents:
+                return  # hedge 로 중복된 호출 중 늦게 끝난 쪽
+            self._llm_parents.add(parent)
+            self.llm.append({
+                "node": node, "prompt_tokens": prompt_tokens, "seconds": time.perf_counter() - t0,
+                "response": message_to_dict(response.generations[0][0].message),
+            })
+
+    # ── 도구 ──
+    def on_tool_start(self, serialized, input_str: str, *, run_id: UUID, inputs: Optional[dict] = None,
+                      **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        self._started[run_id] = ("tool", name, time.perf_counter(), inputs if inputs is not None else input_str)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started:
+            _, name, t0, tool_input = started
+            with self._lock:
+                self.tools.append({"name": name, "input": tool_input, "output": _tool_output(output),
+                                   "seconds": time.perf_counter() - t0})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.on_tool_end(f"Error: {error}", run_id=run_id)
+
+    def turn(self, user_input: str, memory_summary: Optional[str], seconds: float) -> dict:
+        return {"input": user_input, "memory_summary": memory_summary, "seconds": seconds,
+                "nodes": self.nodes, "llm": self.llm, "tools": self.tools}
+
+
+class CassetteWriter:
+    """세션 카세트 (턴마다 gzip member 하나를 이어 붙임 → 중간에 죽어도 앞 턴은 읽힘)."""
+
+    def __init__(self, session_id: str, root: str = AGENT_RECORD_DIR):
+        from .util.util import is_valid_session_id
+        if not is_valid_session_id(session_id):
+            raise ValueError(f"Invalid session_id for cassette: {session_id!r}")  # AGENT_RECORD_DIR 밖 쓰기 방지
+        self.path = Path(root) / f"{session_id}.jsonl.gz"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        if not self.path.exists():
+            self._append({"version": CASSETTE_VERSION, "session_id": session_id, "created": time.time()})
+
+    def _append(self, record: dict) -> None:
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def write_turn(self, recorder: TurnRecorder, user_input: str, memory_summary: Optional[str],
+                   seconds: float) -> None:
+        self._append(recorder.turn(user_input, memory_summary, seconds))
+
+
+def load(path: str) -> List[dict]:
+    """카세트의 턴 목록 (헤더 제외)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records or records[0].get("version") != CASSETTE_VERSION:
+        raise ValueError(f"unsupported cassette: {path}")
+    return records[1:]
+
+
+# ─────────────────────────────────────────────
+# Replay
+# ─────────────────────────────────────────────
+class _Replay:
+    """현재 턴의 녹화된 LLM 응답 / 도구 출력 대기열."""
+
+    def __init__(self, realtime: bool):
+        self.realtime = realtime
+        self.llm: deque = deque()
+        self.tools: Dict[str, deque] = defaultdict(deque)
+        self.misses: List[str] = []
+
+    def load_turn(self, turn: dict) -> None:
+        self.llm = deque(turn["llm"])
+        self.tools = defaultdict(deque)
+        for t in turn["tools"]:
+            self.tools[t["name"]].append(t)
+        self.misses = []
+
+    def next_llm(self):
+        from langchain_core.messages import AIMessage
+        if not self.llm:
+            self.misses.append("llm")
+            return AIMessage(content="[replay] no recorded LLM response")
+        call = self.llm.popleft()
+        if self.realtime:
+            time.sleep(call["seconds"])
+        return messages_from_dict([call["response"]])[0]
+
+    def next_tool(self, name: str) -> str:
+        if not self.tools[name]:
+            self.misses.append(name)
+            return f"[replay] no recorded output for {name}"
+        call = self.tools[name].popleft()
+        if self.realtime:
+            time.sleep(call["seconds"])
+        return call["output"]
+
+
+_UNSET = object()
+
+
+def _replay_model(replay: _Replay):
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ReplayChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "cassette-replay"
+
+        def bind_tools(self, tools, **kwargs):
+            return self.bind(**kwargs)
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            return ChatResult(generations=[ChatGeneration(message=replay.next_llm())])
+
+    return ReplayChatModel()
+
+def _replay_tool(tool, replay: _Replay):
+    from langchain_core.tools import StructuredTool
+    return StructuredTool.from_function(
+        name=tool.name, description=tool.description, args_schema=tool.args_schema,
+        func=lambda **kwargs: replay.next_tool(tool.name),
+    )
+
+@contextmanager
+def _replaying(replay: _Replay):
+    """그래프가 쓰는 모델/도구를 녹화 재생본으로 교체 (build_graph 전에 적용해야 ToolNode 에도 반영)."""
+    from . import llm, tools
+    model = _replay_model(replay)
+    patches = {(llm, "llm_with_tools"): model, (llm, "llm_light_with_tools"): model}
+    for attr in ("tavilysearch", "rag_search_tool", "code_usage_search_tool", "save_text_tool", "slack_notify_tool"):
+        patches[(tools, attr)] = _replay_tool(getattr(tools, attr), replay)
+    # 지연 생성 속성(llm_with_tools 등)은 모듈 dict 에 없을 수 있음 → 복원 시 삭제
+    saved = {(mod, attr): vars(mod).get(attr, _UNSET) for mod, attr in patches}
+    for (mod, attr), value in patches.items():
+        setattr(mod, attr, value)
+    try:
+        yield
+    finally:
+        for (mod, attr), value in saved.items():
+            if value is _UNSET:
+                delattr(mod, attr)
+            else:
+                setattr(mod, attr, value)
+
+
+def replay(path: str, realtime: bool = False) -> bool:
+    """카세트 재생 후 보고. 모든 턴의 도구 호출 흐름이 같으면 True."""
+    os.environ.setdefault("AGENT_OFFLINE", "1")  # 재생 중 실제 API 키/클라이언트 불필요
+    import tempfile
+    from . import make_graph
+    from .tool_result_store import ToolResultStore
+
+    turns = load(path)
+    state = _Replay(realtime)
+    node_times: Dict[str, List[float]] = defaultdict(list)
+    ok = True
+    with _replaying(state), tempfile.TemporaryDirectory() as tmp:
+        graph = make_graph.build_graph()
+        store = ToolResultStore("replay", root=Path(tmp))
+        messages: List[BaseMessage] = []
+        print(f"{'turn':>4} {'flow':<5} {'llm rec/rep':>11} {'prompt tok rec → rep':>22} {'turn s rec → rep':>18}  input")
+        for i, turn in enumerate(turns, 1):
+            state.load_turn(turn)
+            recorder = TurnRecorder()
+            graph_state = {"user_input": turn["input"], "messages": messages}
+            if turn.get("memory_summary"):
+                graph_state["memory_summary"] = turn["memory_summary"]
+            started = time.perf_counter()
+            out = graph.invoke(graph_state, config={"callbacks": [recorder]})
+            seconds = time.perf_counter() - started
+            messages = store.compact(out["messages"])  # AgentFlowManager 와 같은 히스토리 처리
+
+            replayed = recorder.turn(turn["input"], turn.get("memory_summary"), seconds)
+            same = _flow(turn) == _flow(replayed) and len(turn["llm"]) == len(replayed["llm"]) and not state.misses
+            ok &= same
+            rec_tok = sum(c["prompt_tokens"] for c in turn["llm"])
+            rep_tok = sum(c["prompt_tokens"] for c in replayed["llm"])
+            print(f"{i:>4} {'ok' if same else 'DIFF':<5} {len(turn['llm']):>5}/{len(replayed['llm']):<5} "
+                  f"{rec_tok:>9} → {rep_tok:<6}({rep_tok - rec_tok:+d}) {turn['seconds']:>7.2f} → {seconds:<7.2f}"
+                  f"  {turn['input'][:40]}")
+            if not same:
+                print(f"       recorded: {_flow(turn)}\n       replayed: {_flow(replayed)}"
+                      + (f"\n       missing recordings: {state.misses}" if state.misses else ""))
+            for n in turn["nodes"]:
+                node_times[("rec", n["node"])].append(n["seconds"])
+            for n in replayed["nodes"]:
+                node_times[("rep", n["node"])].append(n["seconds"])
+
+    print(f"\n{'node':<18} {'rec ms':>9} {'rep ms':>9} {'delta':>9}")
+    for name in sorted({n for _, n in node_times}):
+        rec, rep = node_times[("rec", name)], node_times[("rep", name)]
+        rec_ms = 1000 * sum(rec) / len(rec) if rec else float("nan")
+        rep_ms = 1000 * sum(rep) / len(rep) if rep else float("nan")
+        print(f"{name:<18} {rec_ms:>9.1f} {rep_ms:>9.1f} {rep_ms - rec_ms:>+9.1f}")
+    print("\n✅ tool-call flow identical" if ok else "\n❌ tool-call flow differs from recording")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Replay a recorded /agent session cassette")
+    parser.add_argument("cassette")
+    parser.add_argument("--realtime", action="store_true", help="녹화된 LLM/도구 지연만큼 기다림")
+    args = parser.parse_args()
+    sys.exit(0 if replay(args.cassette, args.realtime) else 1)
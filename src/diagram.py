@@ -0,0 +1,137 @@
+# new_src/diagram.py
+"""
+LangGraph 그래프 다이어그램 (명시적 명령, 구조 해시 캐시)
+
+run_cli 가 시작할 때마다 draw_mermaid_png() (원격 mermaid.ink 렌더러) 로 graph.png 를 만들어
+네트워크가 느리거나 막혀 있으면 시작이 몇 초씩 늦어졌습니다. 이제 다이어그램은 이 명령으로만 만듭니다.
+
+- 컴파일된 그래프의 노드/엣지 구조 해시로 DIAGRAM_DIR/graph_<hash>.<ext> 에 캐시 (구조가 같으면 다시 그리지 않음)
+- 텍스트(.mmd Mermaid, .dot Graphviz)는 항상 로컬에서 생성
+- 이미지(png/svg)는 로컬 렌더러 순서: Graphviz `dot` → mermaid-cli `mmdc` → (--remote 일 때만) mermaid.ink
+
+    uv run python -m src.main --mode diagram
+    uv run python -m src.diagram [--format png|svg|mermaid|dot] [--no-fanout] [--remote] [--out graph.png]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+DIAGRAM_DIR = Path(os.getenv("DIAGRAM_DIR", "data/diagrams"))
+FORMATS = ("png", "svg", "mermaid", "dot")
+_EXT = {"png": "png", "svg": "svg", "mermaid": "mmd", "dot": "dot"}
+RENDER_TIMEOUT_S = 30
+
+
+def structure_hash(drawable) -> str:
+    """노드 id / 엣지(source, target, 조건부 여부, 라벨) 기준 해시 — 노드 함수 구현이 바뀌어도 구조가 같으면 같은 값."""
+    nodes = sorted(drawable.nodes)
+    edges = sorted((e.source, e.target, bool(e.conditional), str(e.data or "")) for e in drawable.edges)
+    payload = json.dumps({"nodes": nodes, "edges": edges}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def to_dot(drawable) -> str:
+    """pygraphviz 없이 DOT 텍스트 생성 (조건부 엣지는 점선)."""
+    lines = ["digraph agent {", '  rankdir=TB; node [shape=box, style="rounded,filled", fillcolor="#f2f0ff"];']
+    for node_id in drawable.nodes:
+        shape = ', shape=ellipse, fillcolor="#dddddd"' if node_id in ("__start__", "__end__") else ""
+        label = node_id.strip("_")
+        lines.append(f'  "{node_id}" [label="{label}"{shape}];')
+    for e in drawable.edges:
+        attrs = ["style=dashed"] if e.conditional else []
+        if e.data:
+            attrs.append(f'label="{e.data}"')
+        lines.append(f'  "{e.source}" -> "{e.target}"' + (f" [{', '.join(attrs)}]" if attrs else "") + ";")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _run(cmd: list) -> bool:
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, timeout=RENDER_TIMEOUT_S)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[diagram] {cmd[0]} failed: {e}")
+        return False
+
+def _render_image(drawable, fmt: str, path: Path, remote: bool) -> Optional[str]:
+    """로컬 렌더러 → (허용 시) 원격 순서로 시도, 성공한 렌더러 이름 반환."""
+    if shutil.which("dot"):
+        with tempfile.NamedTemporaryFile("w", suffix=".dot", delete=False, encoding="utf-8") as f:
+            f.write(to_dot(drawable))
+        try:
+            if _run(["dot", f"-T{fmt}", f.name, "-o", str(path)]):
+                return "graphviz"
+        finally:
+            os.unlink(f.name)
+    if shutil.which("mmdc"):
+        with tempfile.NamedTemporaryFile("w", suffix=".mmd", delete=False, encoding="utf-8") as f:
+            f.write(drawable.draw_mermaid())
+        try:
+            if _run(["mmdc", "-i", f.name, "-o", str(path)]):
+                return "mermaid-cli"
+        finally:
+            os.unlink(f.name)
+    if remote and fmt == "png":
+        try:
+            path.write_bytes(drawable.draw_mermaid_png())  # mermaid.ink (네트워크)
+            return "mermaid.ink"
+        except Exception as e:
+            print(f"[diagram] remote render failed: {e}")
+    path.unlink(missing_ok=True)  # 실패한 렌더러가 남긴 파일이 캐시로 쓰이지 않도록
+    return None
+
+
+def render(graph, fmt: str = "png", out_dir: Path = DIAGRAM_DIR, remote: bool = False) -> Path:
+    """
+    컴파일된 그래프의 다이어그램 파일 경로 (캐시 적중이면 그대로).
+    이미지 렌더러가 하나도 없으면 Mermaid 텍스트(.mmd)로 대체.
+    """
+    drawable = graph.get_graph()
+    digest = structure_hash(drawable)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"graph_{digest}.{_EXT[fmt]}"
+    if path.exists():
+        print(f"📦 cached diagram ({digest}) → {path}")
+        return path
+
+    if fmt == "mermaid":
+        path.write_text(drawable.draw_mermaid(), encoding="utf-8")
+        renderer = "mermaid-text"
+    elif fmt == "dot":
+        path.write_text(to_dot(drawable), encoding="utf-8")
+        renderer = "dot-text"
+    else:
+        renderer = _render_image(drawable, fmt, path, remote)
+        if renderer is None:
+            print(f"⚠️ no local {fmt} renderer (install graphviz or mermaid-cli, or pass --remote) → Mermaid text")
+            return render(graph, "mermaid", out_dir, remote)
+    print(f"🖼️ rendered diagram ({digest}, {renderer}) → {path}")
+    return path
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Render the agent graph diagram (cached by graph structure)")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--no-fanout", action="store_true", help="TOOL_PREFETCH=0 구성(순차 tools 루프)의 그래프")
+    parser.add_argument("--remote", action="store_true", help="로컬 렌더러가 없으면 mermaid.ink 사용 (네트워크)")
+    parser.add_argument("--out", help="결과를 이 경로로도 복사 (예: graph.png)")
+    args = parser.parse_args(argv)
+
+    from .make_graph import build_graph, TOOL_PREFETCH
+    graph = build_graph(fanout=TOOL_PREFETCH and not args.no_fanout)
+    path = render(graph, args.format, remote=args.remote)
+    if args.out:
+        out = Path(args.out).with_suffix(path.suffix)  # Mermaid 텍스트로 대체된 경우 확장자도 맞춤
+        shutil.copyfile(path, out)
+        print(f"copied → {out}")
+
+
+if __name__ == "__main__":
+    main()
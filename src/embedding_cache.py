@@ -0,0 +1,171 @@
+# new_src/embedding_cache.py
+"""
+업로드 파일 chunk 임베딩의 content-addressed 디스크 캐시 (세션 간 공유)
+
+key = sha256(파일 내용 해시 + splitter 설정 + 임베딩 모델)
+같은 파일(예: 경진대회 baseline 노트북)을 다른 세션이 다시 올리면
+추출/분할/임베딩 없이 캐시된 벡터로 바로 retriever 를 만듭니다.
+
+    data/upload_cache/<key>.json   # texts, metadatas
+    data/upload_cache/<key>.npy    # float32 vectors
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .providers import AGENT_OFFLINE
+
+CACHE_DIR = Path(os.getenv("UPLOAD_EMBED_CACHE_DIR", "data/upload_cache"))
+EMBED_MODEL = "text-embedding-3-small"
+
+CachedChunks = Tuple[List[str], List[Dict], np.ndarray]
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_key(content_hash: str, settings: Dict) -> str:
+    model = "offline-fake" if AGENT_OFFLINE else EMBED_MODEL  # 가짜 벡터가 실제 캐시를 덮지 않도록
+    payload = json.dumps({"content": content_hash, "settings": settings, "model": model}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def chunk_ids(texts: List[str], seen: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    chunk 내용 해시 기반 id (같은 내용이 반복되면 순번을 붙여 구분).
+    배치로 나눠 호출할 때는 같은 seen 을 넘겨 파일 전체 기준으로 순번을 매깁니다.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for t in texts:
+        h = hashlib.sha256(t.encode("utf-8")).hexdigest()[:24]
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(h if n == 0 else f"{h}-{n}")
+    return ids
+
+def load(key: str) -> Optional[CachedChunks]:
+    meta_path, vec_path = CACHE_DIR / f"{key}.json", CACHE_DIR / f"{key}.npy"
+    if not (meta_path.exists() and vec_path.exists()):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(vec_path, mmap_mode="r")  # 큰 파일도 행 단위로만 읽힘
+    except Exception:
+        return None
+    if len(meta["texts"]) != len(vectors):
+        return None
+    return meta["texts"], meta["metadatas"], vectors
+
+def _atomic_write(path: Path, write) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def save(key: str, texts: List[str], metadatas: List[Dict], vectors) -> None:
+    """벡터(.npy)를 먼저, 메타(.json)를 나중에 원자적으로 기록 — 다른 세션이 반쯤 쓴 캐시를 읽지 않도록."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    arr = np.asarray(vectors, dtype=np.float32)
+
+    def write_vec(tmp: Path):
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+
+    def write_meta(tmp: Path):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"texts": texts, "metadatas": metadatas}, f, ensure_ascii=False)
+
+    _atomic_write(CACHE_DIR / f"{key}.npy", write_vec)
+    _atomic_write(CACHE_DIR / f"{key}.json", write_meta)
+
+
+class CacheWriter:
+    """
+    save() 의 스트리밍 버전: 색인 배치마다 append() 로 임시 파일에 이어 쓰고 commit() 에서 최종 캐시 파일로 조립.
+    파일 전체의 texts / metadatas / vectors 를 메모리에 모으지 않습니다 (메모리는 배치 크기 기준).
+    commit() 전에는 캐시에 보이지 않고, abort() 하면 임시 파일만 지워집니다.
+    """
+
+    def __init__(self, key: str):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        tag = uuid.uuid4().hex[:8]
+        self._parts = {name: CACHE_DIR / f".{key}.{tag}.{name}.part" for name in ("vec", "texts", "metadatas")}
+        self._vec = open(self._parts["vec"], "wb")
+        self._texts = open(self._parts["texts"], "w", encoding="utf-8")
+        self._metadatas = open(self._parts["metadatas"], "w", encoding="utf-8")
+        self.n = 0
+        self.dim: Optional[int] = None
+
+    def append(self, texts: List[str], metadatas: List[Dict], vectors) -> None:
+        arr = np.asarray(vectors, dtype=np.float32)
+        if len(arr) != len(texts) or len(texts) != len(metadatas):
+            raise ValueError("texts / metadatas / vectors length mismatch")
+        if not len(arr):
+            return
+        if self.dim is None:
+            self.dim = arr.shape[1]
+        elif arr.shape[1] != self.dim:
+            raise ValueError(f"vector dim changed: {self.dim} → {arr.shape[1]}")
+        arr.tofile(self._vec)
+        for t in texts:
+            self._texts.write(json.dumps(t, ensure_ascii=False) + "\n")
+        for m in metadatas:
+            self._metadatas.write(json.dumps(m, ensure_ascii=False) + "\n")
+        self.n += len(arr)
+
+    def _close_parts(self) -> None:
+        for f in (self._vec, self._texts, self._metadatas):
+            f.close()
+
+    def commit(self) -> None:
+        """save() 와 같은 순서(벡터 → 메타)로 원자적 기록."""
+        self._close_parts()
+        try:
+            if not self.n:
+                return
+
+            def write_vec(tmp: Path):
+                with open(tmp, "wb") as out, open(self._parts["vec"], "rb") as raw:
+                    np.lib.format.write_array_header_1_0(
+                        out, {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                              "fortran_order": False, "shape": (self.n, self.dim)})
+                    shutil.copyfileobj(raw, out, 1 << 20)
+
+            def write_meta(tmp: Path):
+                # {"texts": [...], "metadatas": [...]} 를 줄 단위로 조립 (load() 형식 그대로)
+                with open(tmp, "w", encoding="utf-8") as out:
+                    for i, name in enumerate(("texts", "metadatas")):
+                        out.write(("{" if i == 0 else ", ") + f'"{name}": [')
+                        with open(self._parts[name], "r", encoding="utf-8") as part:
+                            for j, line in enumerate(part):
+                                out.write(("," if j else "") + line.rstrip("\n"))
+                        out.write("]")
+                    out.write("}")
+
+            _atomic_write(CACHE_DIR / f"{self.key}.npy", write_vec)
+            _atomic_write(CACHE_DIR / f"{self.key}.json", write_meta)
+        finally:
+            self._remove_parts()
+
+    def abort(self) -> None:
+        self._close_parts()
+        self._remove_parts()
+
+    def _remove_parts(self) -> None:
+        for path in self._parts.values():
+            path.unlink(missing_ok=True)
@@ -0,0 +1,154 @@
+# new_src/hedged_llm.py
+"""
+지연 꼬리(p99) 제어용 LLM 래퍼: hedged request + fallback 모델
+
+chatbot 의 llm_with_tools.invoke() 는 한 번의 블로킹 호출이라, 느린 응답 하나가 p99 를 결정합니다.
+
+- 1차 호출이 HEDGE_PERCENTILE 분위 지연(최근 관측값, metrics.percentile)을 넘기면
+  두 번째 요청을 보냄 (fallback 모델이 있으면 그 모델로, 없으면 같은 모델로 중복 요청)
+- 1차 호출이 오류면 기다리지 않고 바로 두 번째 요청
+- 먼저 성공한 응답을 사용하고 나머지는 취소 (이미 전송된 sync HTTP 요청은 중단할 수 없어 결과만 버림)
+- Runnable 이므로 .bind(tool_choice=...) / invoke(..., timeout=...) 는 두 요청에 그대로 전달
+
+메트릭: llm_call_seconds{model}, llm_primary_seconds{model}, llm_hedge_total{model,reason=slow|error},
+        llm_hedge_wins_total{model,winner=primary|hedge}
+
+    uv run python -m src.hedged_llm   # 가짜 모델(주입 지연)로 hedge 유무 p50/p99 비교
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from . import metrics
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # 이보다 관측이 적으면 기본 지연 사용
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("HEDGE_DEFAULT_DELAY_S", "8"))
+HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", "1"))  # 너무 이른 hedge 로 요청이 두 배가 되지 않게
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "16")), thread_name_prefix="llm")
+
+
+class HedgedChatModel(Runnable):
+    def __init__(self, primary: Runnable, fallback: Optional[Runnable] = None, name: str = "chat",
+                 percentile: float = HEDGE_PERCENTILE, enabled: bool = LLM_HEDGE):
+        self.primary = primary
+        self.fallback = fallback  # None 이면 primary 로 중복 요청
+        self.name = name
+        self.percentile = percentile
+        self.enabled = enabled
+
+    def hedge_delay(self) -> float:
+        """1차 호출을 기다리는 시간 = 최근 1차 호출 지연의 percentile 분위 (관측이 적으면 기본값)."""
+        if metrics.count("llm_primary_seconds", model=self.name) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_S
+        p = metrics.percentile("llm_primary_seconds", self.percentile, model=self.name)
+        return max(HEDGE_MIN_DELAY_S, p if p is not None else HEDGE_DEFAULT_DELAY_S)
+
+    def _submit(self, model: Runnable, input: Any, config: Optional[RunnableConfig], kwargs: dict) -> Future:
+        # 작업 스레드에서도 콜백/트레이싱 context 유지
+        return _executor.submit(contextvars.copy_context().run, model.invoke, input, config, **kwargs)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        if not self.enabled:
+            result = self.primary.invoke(input, config, **kwargs)
+            metrics.observe("llm_call_seconds", time.perf_counter() - started, model=self.name)
+            return result
+
+        primary = self._submit(self.primary, input, config, kwargs)
+
+        def _record_primary(f: Future) -> None:
+            # 진 경우에도 1차 지연을 기록해야 분위수가 느린 쪽으로 치우치지 않음
+            if not f.cancelled() and f.exception() is None:
+                metrics.observe("llm_primary_seconds", time.perf_counter() - started, model=self.name)
+        primary.add_done_callback(_record_primary)
+
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            metrics.observe("llm_call_seconds", time.perf_counter() - started, model=self.name)
+            return primary.result()
+
+        reason = "error" if done else "slow"
+        metrics.inc("llm_hedge_total", model=self.name, reason=reason)
+        hedge = self._submit(self.fallback or self.primary, input, config, kwargs)
+
+        pending = {hedge} if done else {primary, hedge}
+        error: Optional[BaseException] = primary.exception() if done else None
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in finished:
+                if f.exception() is not None:
+                    error = error or f.exception()
+                    continue
+                for other in pending:
+                    other.cancel()
+                metrics.inc("llm_hedge_wins_total", model=self.name, winner="primary" if f is primary else "hedge")
+                metrics.observe("llm_call_seconds", time.perf_counter() - started, model=self.name)
+                return f.result()
+        raise error
+
+
+# 가짜 모델(주입 지연)로 hedge 효과 확인
+#   uv run python -m src.hedged_llm [--calls 200]
+class FakeDelayModel(Runnable):
+    """
+    delays() 가 돌려주는 초만큼 기다린 뒤 AIMessage 를 반환하는 로컬 모델.
+    error 를 주면 기다린 뒤 그 예외를 던짐. 받은 kwargs 는 calls 에 기록 (tests/test_hedged_llm.py).
+    """
+
+    def __init__(self, delays, name: str = "fake", error: Optional[BaseException] = None):
+        self.delays = delays
+        self.name = name
+        self.error = error
+        self.calls: list = []
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        from langchain_core.messages import AIMessage
+        self.calls.append(kwargs)
+        time.sleep(self.delays())
+        if self.error is not None:
+            raise self.error
+        return AIMessage(content=f"answer from {self.name}")
+
+
+def bench(calls: int = 200) -> None:
+    import random
+    import statistics
+
+    # 95% 는 50ms 내외, 5% 는 1초 지연되는 upstream
+    def tail():
+        return 1.0 if random.random() < 0.05 else random.uniform(0.03, 0.07)
+
+    global HEDGE_MIN_DELAY_S, HEDGE_DEFAULT_DELAY_S
+    HEDGE_MIN_DELAY_S, HEDGE_DEFAULT_DELAY_S = 0.05, 0.2
+    models = {
+        "single": HedgedChatModel(FakeDelayModel(tail), name="bench_single", enabled=False),
+        "hedged": HedgedChatModel(FakeDelayModel(tail), name="bench_hedged", percentile=0.9),
+        "fallback": HedgedChatModel(FakeDelayModel(tail), FakeDelayModel(lambda: 0.05, "fallback"),
+                                    name="bench_fallback", percentile=0.9),
+    }
+    print(f"{'mode':<9} {'p50 ms':>7} {'p99 ms':>7} {'hedges':>7}")
+    for mode, model in models.items():
+        latencies = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            model.invoke("q")
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        hedges = sum(v for k, v in metrics.snapshot()["counters"].get("llm_hedge_total", {}).items()
+                     if f'model="{model.name}"' in k)
+        print(f"{mode:<9} {statistics.median(latencies):>7.0f} {latencies[int(0.99 * len(latencies))]:>7.0f} "
+              f"{hedges:>7.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    bench(parser.parse_args().calls)
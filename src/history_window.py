@@ -0,0 +1,78 @@
+# new_src/history_window.py
+"""
+토큰 예산 기반 대화 히스토리 창 (모델 입력용)
+
+메시지 개수(max_turns * 2 + 2)로 자르면 Tavily 결과가 든 ToolMessage 하나가 수천 토큰이어도 그대로 들어가고,
+AIMessage(tool_calls) 와 그 ToolMessage 가 갈라져 API 오류가 날 수 있습니다.
+
+- 메시지별 토큰 수는 실제 토크나이저(util.tokens)로 한 번만 세어 msg.response_metadata["token_count"] 에 캐시
+- AIMessage(tool_calls) + 뒤따르는 ToolMessage 들은 하나의 블록으로 함께 넣거나 함께 뺌
+- 마지막 HumanMessage 이후(현재 턴)는 예산을 넘어도 항상 유지
+- 앞쪽 SystemMessage(정책/요약)는 예산과 별개로 항상 유지
+"""
+import json
+import os
+from typing import List, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from .util.tokens import count_tokens
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+_MESSAGE_OVERHEAD = 4  # role/구분자 등 메시지당 고정 토큰 (OpenAI chat format 근사)
+
+
+def _content_text(m: BaseMessage) -> str:
+    if isinstance(m.content, str):
+        return m.content
+    return " ".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in m.content)
+
+def message_tokens(m: BaseMessage) -> int:
+    """메시지 토큰 수 (처음 한 번만 세고 response_metadata 에 캐시)."""
+    cached = m.response_metadata.get("token_count")
+    if cached is not None:
+        return cached
+    n = _MESSAGE_OVERHEAD + count_tokens(_content_text(m))
+    for call in getattr(m, "tool_calls", None) or []:
+        n += count_tokens(call.get("name", "") + json.dumps(call.get("args", {}), ensure_ascii=False))
+    m.response_metadata["token_count"] = n
+    return n
+
+def _blocks(messages: Sequence[BaseMessage]) -> List[Tuple[int, int]]:
+    """[start, end) 구간 목록. tool_calls 가 있는 AIMessage 는 뒤따르는 ToolMessage 와 한 블록."""
+    blocks: List[Tuple[int, int]] = []
+    i = 0
+    while i < len(messages):
+        j = i + 1
+        if isinstance(messages[i], AIMessage) and messages[i].tool_calls:
+            while j < len(messages) and isinstance(messages[j], ToolMessage):
+                j += 1
+        blocks.append((i, j))
+        i = j
+    return blocks
+
+def window_start(messages: Sequence[BaseMessage], budget: int = HISTORY_TOKEN_BUDGET) -> int:
+    """예산 안에 들어가는 최근 구간의 시작 index (블록 경계, ToolMessage 로 시작하지 않음)."""
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=len(messages))
+    start, used = len(messages), 0
+    for b_start, b_end in reversed(_blocks(messages)):
+        tokens = sum(message_tokens(m) for m in messages[b_start:b_end])
+        if b_start < last_human and used + tokens > budget:
+            break
+        used += tokens
+        start = b_start
+    # 앞에 짝 없는 ToolMessage 가 남으면 제외 (tool_call 없이 tool 결과만 보내면 API 오류)
+    while start < len(messages) and isinstance(messages[start], ToolMessage):
+        start += 1
+    return start
+
+def window_by_tokens(messages: Sequence[BaseMessage],
+                     budget: int = HISTORY_TOKEN_BUDGET) -> Tuple[List[BaseMessage], int]:
+    """(모델 입력용 메시지, 잘라내서 절약한 토큰 수). 앞쪽 SystemMessage 는 항상 유지."""
+    prefix = 0
+    while prefix < len(messages) and isinstance(messages[prefix], SystemMessage):
+        prefix += 1
+    history = list(messages[prefix:])
+    start = window_start(history, budget)
+    saved = sum(message_tokens(m) for m in history[:start])
+    return list(messages[:prefix]) + history[start:], saved
@@ -0,0 +1,150 @@
+# new_src/http_pool.py
+"""
+프로세스 공용 HTTP 연결 풀 (OpenAI chat / embeddings)
+
+ChatOpenAI 4개(main / fallback / light / summary)와 세션마다 새로 만드는 OpenAIEmbeddings 가
+각자 httpx 클라이언트를 가지고 있어, 부하가 걸리면 TLS 핸드셰이크와 연결 생성/폐기가 반복되었습니다.
+providers.chat_model() / embeddings() 가 여기 sync/async 클라이언트 하나씩을 주입합니다.
+
+- keep-alive 유지, HTTP/2 (h2 패키지가 있을 때), 최대 연결 수 / 타임아웃은 환경 변수로
+- 메트릭
+  http_requests_total{host}, http_request_seconds, http_connections_opened_total{host}
+  http_connection_reuse_ratio (1 - 새 연결 / 요청), http_pool_{sync|async}_{active|idle}_connections
+
+TavilySearch 는 내부에서 requests 로 호출해 httpx 클라이언트를 받지 않으므로 이 풀에 포함되지 않습니다.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from . import metrics
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "60"))
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "10"))
+HTTP2 = os.getenv("HTTP2", "1") == "1"
+
+_requests = 0
+_opened = 0
+_counter_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+def _settings() -> dict:
+    return {
+        "limits": httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                               max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                               keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT_S, connect=HTTP_CONNECT_TIMEOUT_S),
+        "http2": HTTP2 and _http2_available(),
+    }
+
+
+# ── 이벤트 훅: 요청 수 / 지연 / 새 연결 (httpcore trace 의 TCP 연결 이벤트) ──
+def _count_request(host: str) -> None:
+    global _requests
+    with _counter_lock:
+        _requests += 1
+    metrics.inc("http_requests_total", host=host)
+
+def _count_connection(host: str) -> None:
+    global _opened
+    with _counter_lock:
+        _opened += 1
+    metrics.inc("http_connections_opened_total", host=host)
+
+def _on_request(request: httpx.Request) -> None:
+    host = request.url.host
+    _count_request(host)
+    request.extensions["started"] = time.perf_counter()
+
+    def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            _count_connection(host)
+    request.extensions["trace"] = trace
+
+def _on_response(response: httpx.Response) -> None:
+    started = response.request.extensions.get("started")
+    if started is not None:
+        metrics.observe("http_request_seconds", time.perf_counter() - started)
+
+async def _on_request_async(request: httpx.Request) -> None:
+    host = request.url.host
+    _count_request(host)
+    request.extensions["started"] = time.perf_counter()
+
+    async def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            _count_connection(host)
+    request.extensions["trace"] = trace
+
+async def _on_response_async(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+_sync: Optional[httpx.Client] = None
+_async: Optional[httpx.AsyncClient] = None
+_client_lock = threading.Lock()
+
+
+def sync_client() -> httpx.Client:
+    global _sync
+    with _client_lock:
+        if _sync is None:
+            _sync = httpx.Client(event_hooks={"request": [_on_request], "response": [_on_response]},
+                                 **_settings())
+        return _sync
+
+def async_client() -> httpx.AsyncClient:
+    global _async
+    with _client_lock:
+        if _async is None:
+            _async = httpx.AsyncClient(
+                event_hooks={"request": [_on_request_async], "response": [_on_response_async]},
+                **_settings())
+        return _async
+
+
+def _pool_connections(client) -> list:
+    """httpcore 연결 풀의 연결 목록 (내부 구조가 바뀌면 빈 목록)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return list(getattr(pool, "connections", []) or [])
+
+def stats() -> dict:
+    out = {}
+    with _counter_lock:
+        requests_, opened = _requests, _opened
+    if requests_:
+        out["http_connection_reuse_ratio"] = max(0.0, 1.0 - opened / requests_)
+    for name, client in (("sync", _sync), ("async", _async)):
+        if client is None:
+            continue
+        conns = _pool_connections(client)
+        idle = sum(1 for c in conns if c.is_idle())
+        out[f"http_pool_{name}_active_connections"] = len(conns) - idle
+        out[f"http_pool_{name}_idle_connections"] = idle
+    return out
+
+metrics.register_collector(stats)
+
+
+async def aclose() -> None:
+    """FastAPI shutdown 에서 호출 (열린 keep-alive 연결 정리)."""
+    global _sync, _async
+    with _client_lock:
+        client, aclient, _sync, _async = _sync, _async, None, None
+    if client is not None:
+        client.close()
+    if aclient is not None:
+        await aclient.aclose()
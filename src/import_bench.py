@@ -0,0 +1,79 @@
+# new_src/import_bench.py
+"""
+진입점별 cold import 시간 측정 (python -X importtime)
+
+CLI / API 서버 / Streamlit UI 가 처음 import 하는 모듈을 새 인터프리터에서 불러와
+벽시계 시간과 -X importtime 합계, 최상위 패키지별 비용을 출력합니다.
+
+    uv run python -m src.import_bench                          # 측정
+    uv run python -m src.import_bench --save data/import_bench.json
+    uv run python -m src.import_bench --compare data/import_bench.json   # 저장한 기준과 비교
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+TARGETS = {
+    "cli": "import src.main; import src.make_graph",  # run_cli 가 프롬프트 전에 불러오는 것
+    "api": "import src.web.main",
+    "ui": "from src.libraries import DEFAULT_DOCS",  # streamlit_app.py 가 src 에서 가져오는 것
+}
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def measure(stmt: str, repeat: int = 3) -> dict:
+    """새 프로세스에서 stmt 실행 (repeat 회 중 가장 빠른 결과)."""
+    best: Optional[dict] = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt],
+                              capture_output=True, text=True, env=os.environ.copy())
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(f"{stmt!r} failed:\n{proc.stderr[-2000:]}")
+        per_package: Dict[str, int] = defaultdict(int)
+        modules = 0
+        for line in proc.stderr.splitlines():
+            m = _LINE.match(line)
+            if m:
+                modules += 1
+                per_package[m.group(4).split(".")[0]] += int(m.group(1))  # self 시간 (us)
+        result = {"wall_s": wall, "import_s": sum(per_package.values()) / 1e6, "modules": modules,
+                  "packages": {k: v / 1e6 for k, v in per_package.items()}}
+        if best is None or wall < best["wall_s"]:
+            best = result
+    return best
+
+
+def run(targets: Dict[str, str], repeat: int, top: int, compare: Optional[dict]) -> Dict[str, dict]:
+    results = {}
+    for name, stmt in targets.items():
+        r = results[name] = measure(stmt, repeat)
+        line = f"{name:<4} wall {r['wall_s']:6.2f}s  import {r['import_s']:6.2f}s  {r['modules']:>5} modules"
+        if compare and name in compare:
+            line += f"  (baseline wall {compare[name]['wall_s']:.2f}s → {r['wall_s'] - compare[name]['wall_s']:+.2f}s)"
+        print(f"{line}   [{stmt}]")
+        heaviest = sorted(r["packages"].items(), key=lambda kv: -kv[1])[:top]
+        print("     " + ", ".join(f"{pkg} {secs * 1000:.0f}ms" for pkg, secs in heaviest))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of the CLI / API / UI entry points")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=6, help="표시할 최상위 패키지 수")
+    parser.add_argument("--save", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="이전에 --save 한 결과와 비교")
+    args = parser.parse_args()
+    baseline = json.load(open(args.compare, encoding="utf-8")) if args.compare else None
+    out = run(TARGETS, args.repeat, args.top, baseline)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,101 @@
+# new_src/index_store.py
+"""
+버전별 인덱스 디렉토리 + 원자적 포인터 교체(atomic swap)
+
+    data/index/
+      ├── CURRENT                 # 현재 공개된 버전 이름 (한 줄 텍스트)
+      └── versions/
+          ├── v20251105-101500-123456-1a2b/   # Chroma persist dir + manifest.json
+          └── v20251106-093000-654321-3c4d/
+
+- rag_build 는 항상 새 버전 디렉토리에 쓰고, 다 만든 뒤 CURRENT 를 os.replace 로 교체합니다.
+- rag_search 는 매 호출마다 CURRENT 를 읽어 재시작 없이 새 버전을 사용합니다.
+- 오래된 버전은 gc_versions() 로 정리합니다.
+"""
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from .providers import AGENT_OFFLINE
+
+# 오프라인(가짜 임베딩) 인덱스는 실제 인덱스와 섞이지 않도록 별도 디렉토리
+INDEX_DIR = Path("data") / ("index_offline" if AGENT_OFFLINE else "index")
+VERSIONS_DIR = INDEX_DIR / "versions"
+POINTER_PATH = INDEX_DIR / "CURRENT"
+
+# 현재 버전 외에 남겨둘 이전 버전 수 (교체 직후 아직 이전 버전을 읽고 있는 요청 보호용)
+KEEP_PREVIOUS = int(os.getenv("RAG_INDEX_KEEP_PREVIOUS", "2"))
+
+# 포인터 도입 이전(data/index 에 바로 persist)의 인덱스 판별용
+_LEGACY_MARKER = "chroma.sqlite3"
+
+
+def current_version() -> Optional[str]:
+    """CURRENT 포인터가 가리키는 버전 이름 (없으면 None)."""
+    try:
+        name = POINTER_PATH.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def current_index_dir() -> Optional[Path]:
+    """읽기용 인덱스 디렉토리. 포인터가 없으면 레거시 경로(data/index)를 반환합니다."""
+    name = current_version()
+    if name and (VERSIONS_DIR / name).is_dir():
+        return VERSIONS_DIR / name
+    if (INDEX_DIR / _LEGACY_MARKER).exists():
+        return INDEX_DIR
+    return None
+
+
+def new_version_dir(base: Optional[Path] = None) -> Path:
+    """
+    새 버전 디렉토리를 만들어 반환합니다.
+    base 가 주어지면 그 내용을 복사해 두고 증분 빌드를 이어갈 수 있게 합니다.
+    """
+    name = f"v{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:4]}"
+    path = VERSIONS_DIR / name
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    if base is not None and base.is_dir():
+        # 레거시 경로를 복사할 때 versions/ 와 포인터는 제외
+        shutil.copytree(base, path, ignore=shutil.ignore_patterns("versions", "CURRENT*"))
+    else:
+        path.mkdir(parents=True)
+    return path
+
+
+def publish_version(path: Path) -> None:
+    """CURRENT 포인터를 path 로 원자적으로 교체합니다 (임시 파일 작성 후 os.replace)."""
+    tmp = POINTER_PATH.with_name(f"CURRENT.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(path.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, POINTER_PATH)
+
+
+def list_versions() -> List[Path]:
+    if not VERSIONS_DIR.exists():
+        return []
+    return sorted(p for p in VERSIONS_DIR.iterdir() if p.is_dir())
+
+
+def gc_versions(keep_previous: int = KEEP_PREVIOUS) -> List[Path]:
+    """현재 버전과 직전 keep_previous 개를 제외한 나머지 버전을 삭제하고, 삭제한 경로를 반환합니다."""
+    current = current_version()
+    older = [p for p in list_versions() if p.name != current]
+    # 이름이 타임스탬프로 시작하므로 정렬 순서 == 생성 순서
+    stale = older[:-keep_previous] if keep_previous > 0 else older
+    removed = []
+    for p in stale:
+        try:
+            shutil.rmtree(p)
+            removed.append(p)
+        except OSError:
+            # 다른 프로세스가 아직 잡고 있으면 다음 빌드 때 다시 시도
+            pass
+    return removed
@@ -0,0 +1,83 @@
+# new_src/libraries.py
+"""
+지원 문서(DEFAULT_DOCS) 단위의 라이브러리 정의
+
+- rag_build: chunk 가 import/사용하는 모듈 → 라이브러리 태그(lib_<key>=True) 메타데이터
+- rag_search: 질문에서 대상 라이브러리 추론 → Chroma where 필터
+"""
+import re
+from typing import Dict, Iterable, List
+
+DEFAULT_DOCS = {
+    "python": "https://docs.python.org/3/",
+    "git": "https://git-scm.com/docs",
+    "LangChain": "https://python.langchain.com/docs",
+    "Matplotlib": "https://matplotlib.org/stable/api/index.html",
+    "NumPy": "https://numpy.org/doc/stable/",
+    "pandas": "https://pandas.pydata.org/docs/",
+    "PyTorch": "https://docs.pytorch.org/docs/stable/index.html",
+    "Hugging Face": "https://huggingface.co/docs",
+    "FastAPI": "https://fastapi.tiangolo.com/reference/",
+    "BeautifulSoup": "https://www.crummy.com/software/BeautifulSoup/bs4/doc/",
+    "streamlit": "https://docs.streamlit.io/",
+    "gradio": "https://www.gradio.app/docs",
+    "scikit-learn": "https://scikit-learn.org/stable/api/index.html",
+    "Pydantic": "https://docs.pydantic.dev/latest/api/base_model/",
+}
+
+# DEFAULT_DOCS key → 최상위 import 모듈 (python/git 은 모든 노트북에 해당하거나 import 대상이 아니라 제외)
+LIBRARY_MODULES: Dict[str, List[str]] = {
+    "LangChain": ["langchain", "langchain_core", "langchain_community", "langchain_openai", "langgraph"],
+    "Matplotlib": ["matplotlib", "seaborn"],  # seaborn 은 matplotlib 기반이라 같은 그룹으로 취급
+    "NumPy": ["numpy"],
+    "pandas": ["pandas"],
+    "PyTorch": ["torch", "torchvision", "torchaudio"],
+    "Hugging Face": ["transformers", "datasets", "huggingface_hub", "tokenizers", "peft", "accelerate"],
+    "FastAPI": ["fastapi"],
+    "BeautifulSoup": ["bs4"],
+    "streamlit": ["streamlit"],
+    "gradio": ["gradio"],
+    "scikit-learn": ["sklearn"],
+    "Pydantic": ["pydantic"],
+}
+
+# 질문 → 라이브러리 추론 패턴 (한글 조사가 바로 붙는 경우가 많아 \b 대신 영문자 경계만 검사)
+_A = r"(?<![A-Za-z_])"
+_Z = r"(?![A-Za-z_])"
+LIBRARY_QUERY_PATTERNS: Dict[str, str] = {
+    "LangChain": rf"{_A}(langchain|langgraph){_Z}|랭체인|랭그래프",
+    "Matplotlib": rf"{_A}(matplotlib|pyplot|seaborn|plt\.|sns\.)|맷플롯립|시본",
+    "NumPy": rf"{_A}(numpy|np\.)|넘파이",
+    "pandas": rf"{_A}(pandas|dataframe){_Z}|{_A}pd\.|판다스|데이터프레임",
+    "PyTorch": rf"{_A}(pytorch|torch){_Z}|파이토치",
+    "Hugging Face": rf"{_A}(hugging\s*face|transformers|huggingface_hub){_Z}|허깅\s*페이스",
+    "FastAPI": rf"{_A}fastapi{_Z}",
+    "BeautifulSoup": rf"{_A}(beautiful\s*soup|bs4){_Z}|뷰티풀\s*수프",
+    "streamlit": rf"{_A}streamlit{_Z}|스트림릿",
+    "gradio": rf"{_A}gradio{_Z}|그라디오",
+    "scikit-learn": rf"{_A}(scikit-learn|sklearn|scikit){_Z}|사이킷런",
+    "Pydantic": rf"{_A}pydantic{_Z}|파이단틱",
+}
+
+_MODULE_TO_LIBRARY = {m: key for key, mods in LIBRARY_MODULES.items() for m in mods}
+
+
+def lib_tag(key: str) -> str:
+    """Chroma 메타데이터 키 (값은 scalar 만 허용되어 라이브러리마다 bool 플래그로 저장)."""
+    return "lib_" + re.sub(r"[^a-z0-9]+", "_", key.lower()).strip("_")
+
+def libraries_for_symbols(symbols: Iterable[str]) -> List[str]:
+    """'pandas.concat', 'seaborn.histplot' … → ['Matplotlib', 'pandas']"""
+    found = {_MODULE_TO_LIBRARY.get(s.split(".")[0]) for s in symbols}
+    found.discard(None)
+    return sorted(found)
+
+def infer_libraries(query: str) -> List[str]:
+    return [key for key, p in LIBRARY_QUERY_PATTERNS.items() if re.search(p, query, flags=re.I)]
+
+def library_filter(libraries: List[str]) -> Dict:
+    """추론된 라이브러리 → Chroma where 절."""
+    if not libraries:
+        return {}
+    clauses = [{lib_tag(k): True} for k in libraries]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
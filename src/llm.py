@@ -1,29 +1,81 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 
-# Load environment and validate required keys
+# Load environment (AGENT_OFFLINE=1 이면 가짜 모델 사용, 키 검사 생략)
 load_dotenv()
-assert os.getenv("OPENAI_API_KEY"), "Missing OPENAI_API_KEY"
-assert os.getenv("TAVILY_API_KEY"), "Missing TAVILY_API_KEY"
+from .providers import chat_model, require_keys
 # assert os.getenv("LANGSMITH_API_KEY"), "Missing LANGSMITH_API_KEY"
 
-from .tools import tools  # relative import assumes package-style usage
-
-# LLMs and bindings
-llm = ChatOpenAI(model="gpt-4.1-mini")
-llm_with_tools = llm.bind_tools(tools)
+# 모델은 처음 사용할 때 생성합니다 (import 만으로 클라이언트 생성/키 검사를 하지 않음).
+# llm.llm_with_tools 처럼 모듈 속성으로 접근하면 아래 __getattr__ 가 접근자를 호출합니다.
 
 # Verbosity flag used by main loop
 VERBOSE = True
 
+# 1차 호출이 느리거나 실패하면 보조 모델로 hedge (hedged_llm 참고)
+FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "gpt-4o-mini")
+# 잡담/단순 후속 요청용 작은 모델 (model_router 의 light 경로, 저장/슬랙 도구만). 느리거나 실패하면 메인 모델로
+LIGHT_MODEL = os.getenv("LIGHT_MODEL", "gpt-4.1-nano")
 # 요약 전용 llm
 SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
-llm_summarizer = ChatOpenAI(
-    model=SUMMARY_MODEL,
-    temperature=0,     # 요약은 사실 중심/결정론적으로
-    max_tokens=250,    # 4~5줄 목표
-    timeout=60,
-    max_retries=2,
-    verbose=VERBOSE,   # 필요 시 내부 로그 확인
-)
\ No newline at end of file
+
+
+def _model(name: str, **kwargs):
+    require_keys("OPENAI_API_KEY", "TAVILY_API_KEY")
+    return chat_model(name, **kwargs)
+
+# LLMs and bindings
+@lru_cache(maxsize=None)
+def get_llm():
+    return _model("gpt-4.1-mini")
+
+@lru_cache(maxsize=None)
+def get_llm_fallback():
+    return _model(FALLBACK_MODEL)
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools():
+    from .hedged_llm import HedgedChatModel
+    from .tools import get_tools
+    tools = get_tools()
+    return HedgedChatModel(get_llm().bind_tools(tools), get_llm_fallback().bind_tools(tools), name="chat")
+
+@lru_cache(maxsize=None)
+def get_llm_light():
+    return _model(LIGHT_MODEL)
+
+@lru_cache(maxsize=None)
+def get_llm_light_with_tools():
+    from .hedged_llm import HedgedChatModel
+    from .tools import save_text_tool, slack_notify_tool
+    light_tools = [save_text_tool, slack_notify_tool]
+    return HedgedChatModel(get_llm_light().bind_tools(light_tools), get_llm().bind_tools(light_tools), name="light")
+
+@lru_cache(maxsize=None)
+def get_llm_summarizer():
+    from .hedged_llm import HedgedChatModel
+    return HedgedChatModel(_model(
+        SUMMARY_MODEL,
+        temperature=0,     # 요약은 사실 중심/결정론적으로
+        max_tokens=250,    # 4~5줄 목표
+        timeout=60,
+        max_retries=2,
+        verbose=VERBOSE,   # 필요 시 내부 로그 확인
+    ), name="summary")     # 보조 모델 없이 같은 모델로 중복 요청
+
+
+_LAZY = {
+    "llm": get_llm,
+    "llm_fallback": get_llm_fallback,
+    "llm_with_tools": get_llm_with_tools,
+    "llm_light": get_llm_light,
+    "llm_light_with_tools": get_llm_light_with_tools,
+    "llm_summarizer": get_llm_summarizer,
+}
+
+def __getattr__(name: str):
+    # from .llm import llm_summarizer 같은 기존 import 는 그대로 동작 (그 시점에 생성)
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+# new_src/loadtest.py
+"""
+/agent 부하 테스트 (open-loop, 목표 RPS)
+
+서버를 오프라인 모드(가짜 LLM/임베딩/검색, providers.py)로 띄우면 API 사용량 없이 스택 전체를 측정할 수 있습니다.
+
+    AGENT_OFFLINE=1 OFFLINE_LLM_LATENCY_S=0.3 uv run uvicorn src.web.main:app --port 8000
+    uv run python -m src.loadtest --rps 5 --duration 60 --sessions 20
+
+- 응답을 기다리지 않고 1/RPS 간격으로 요청 발사 (느려져도 도착률 유지 → 대기열/지연 증가가 그대로 보임)
+- 지연은 예정 발사 시각(began + i/RPS)부터 측정 → 세션 잠금 대기(같은 세션의 이전 턴이 끝나길 기다림)도 포함
+  (coordinated omission 방지). 잠금 대기와 서버 응답 시간은 따로도 출력
+  → lock wait 가 크면 세션 수가 적어 서버에 목표 RPS 가 도달하지 않은 것 (--sessions 를 늘림)
+- 세션마다 질문 시나리오(검색 → 예제 → 저장 후속 → 잡담)를 순서대로 보냄 (멀티턴 히스토리 포함)
+- 결과: 처리량, 지연 p50/p90/p99/max, 오류 수, 서버 RSS(GET /metrics 의 process_resident_memory_bytes) 시작/최대/종료
+"""
+import argparse
+import itertools
+import re
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+
+SCENARIO = [
+    "pandas concat 공식 문서 사용법 알려줘",
+    "seaborn histplot 예제 코드 보여줘",
+    "저장해줘",
+    "sklearn train_test_split 매개변수 설명해줘",
+    "고마워",
+]
+
+
+def server_rss(url: str) -> Optional[float]:
+    try:
+        text = requests.get(f"{url}/metrics", timeout=5).text
+    except requests.RequestException:
+        return None
+    m = re.search(r"^process_resident_memory_bytes (\S+)$", text, flags=re.M)
+    return float(m.group(1)) if m else None
+
+def _pct(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run(url: str, rps: float, duration: float, sessions: int, timeout: float) -> None:
+    session_ids = [f"loadtest-{uuid.uuid4().hex[:8]}" for _ in range(sessions)]
+    turns = {sid: itertools.cycle(SCENARIO) for sid in session_ids}
+    locks = {sid: threading.Lock() for sid in session_ids}  # 같은 세션의 턴은 순서대로 (실제 클라이언트처럼)
+    latencies: List[float] = []      # 예정 발사 시각 → 응답
+    lock_waits: List[float] = []     # 예정 발사 시각 → 세션 잠금 획득 (클라이언트 쪽 대기열)
+    service: List[float] = []        # 실제 전송 → 응답 (서버 시간)
+    errors: List[str] = []
+    results_lock = threading.Lock()
+    rss_samples: List[float] = []
+    stop = threading.Event()
+
+    def one(sid: str, scheduled: float) -> None:
+        with locks[sid]:
+            started = time.perf_counter()
+            try:
+                resp = requests.post(f"{url}/agent", json={"query": next(turns[sid]), "session_id": sid},
+                                     timeout=timeout)
+                ok, detail = resp.status_code == 200, f"HTTP {resp.status_code}"
+            except requests.RequestException as e:
+                ok, detail = False, type(e).__name__
+            finished = time.perf_counter()
+        with results_lock:
+            if ok:
+                latencies.append(finished - scheduled)
+                lock_waits.append(started - scheduled)
+                service.append(finished - started)
+            else:
+                errors.append(detail)
+
+    def sample_rss() -> None:
+        while not stop.is_set():
+            v = server_rss(url)
+            if v is not None:
+                rss_samples.append(v)
+            stop.wait(1.0)
+
+    rss_start = server_rss(url)
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+
+    n_requests = int(rps * duration)
+    print(f"▶ {n_requests} requests @ {rps} rps over {duration:.0f}s, {sessions} sessions → {url}/agent")
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(8, int(rps * timeout))) as pool:
+        for i in range(n_requests):
+            # open-loop: 예정 시각까지 기다렸다가 응답과 무관하게 발사
+            scheduled = began + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, session_ids[i % sessions], scheduled)
+    wall = time.perf_counter() - began
+    stop.set()
+    sampler.join()
+    rss_end = server_rss(url)
+
+    for sid in session_ids:
+        try:
+            requests.delete(f"{url}/session/{sid}", timeout=5)
+        except requests.RequestException:
+            pass
+
+    print(f"completed   {len(latencies)} ok / {len(errors)} errors in {wall:.1f}s "
+          f"→ throughput {len(latencies) / wall:.2f} req/s")
+    if errors:
+        print(f"errors      {dict((e, errors.count(e)) for e in set(errors))}")
+    for label, values in (("latency s", latencies), ("  lock wait", lock_waits), ("  server", service)):
+        if values:
+            values.sort()
+            print(f"{label:<11} p50 {_pct(values, 0.5):.2f}  p90 {_pct(values, 0.9):.2f}  "
+                  f"p99 {_pct(values, 0.99):.2f}  max {values[-1]:.2f}  mean {statistics.mean(values):.2f}")
+    mb = lambda v: f"{v / 2**20:.0f} MB" if v is not None else "n/a"
+    print(f"server RSS  start {mb(rss_start)}  peak {mb(max(rss_samples, default=None))}  end {mb(rss_end)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/agent load generator")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    run(args.url, args.rps, args.duration, args.sessions, args.timeout)
@@ -1,35 +1,27 @@
-print(">>> running main from:", __file__)
-
 import sys
 import os
+import time
 import argparse
 import subprocess
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, AIMessage
 
-from .make_graph import build_graph
-from .llm import VERBOSE
-from .tools import save_text_to_file
 from .util.util import get_project_root_path
 
-def maybe_save_mermaid_png(graph):
-    try:
-        png_bytes = graph.get_graph().draw_mermaid_png()
-        with open("graph.png", "wb") as f:
-            f.write(png_bytes)
-        print("Saved graph to graph.png")
-    except Exception:
-        # Might fail if mermaid/graphviz backends aren't installed
-        pass
-
 def run_cli():
+    # 그래프/모델 관련 import 는 cli 모드에서만 (startweb/stopweb 은 바로 실행)
     from langchain_core.messages import AIMessage
+    from .make_graph import build_graph
+    from .llm import VERBOSE
+    from .summary_memory import SummaryMemory
+    from . import model_router
+    from .tool_result_store import ToolResultStore
     load_dotenv()
-    graph = build_graph()
-    maybe_save_mermaid_png(graph)
+    graph = build_graph()  # 다이어그램은 --mode diagram 으로 따로 (시작 시 렌더링 없음)
     
     # 멀티턴을 위한 전체 메시지 저장 변수
     messages = []
+    memory = SummaryMemory()  # 오래된 대화 요약 (응답 출력 후 백그라운드에서 갱신)
+    tool_results = ToolResultStore("cli")  # 지난 턴 도구 결과 전문 (히스토리에는 참조만)
 
     while True:
         try:
@@ -43,11 +35,17 @@ def run_cli():
                 "user_input": user_input,
                 "messages": messages  # 이전 대화 전달
             }
+            summary, _ = memory.current()
+            if summary:
+                state["memory_summary"] = summary
 
+            started = time.perf_counter()
             response = graph.invoke(state)
+            model_router.record(response.get("route"), response.get("route_reason"), time.perf_counter() - started)
             
-            # 결과 메시지 업데이트
-            messages = response["messages"]
+            # 결과 메시지 업데이트 (출력은 이번 턴 전문 그대로, 다음 턴 히스토리는 compact)
+            messages = tool_results.compact(response["messages"])
+            memory.schedule(messages)
 
             if VERBOSE:
                 for msg in response["messages"]:
@@ -128,18 +126,26 @@ if __name__ == "__main__":
     WebService 실행 명령어:
         uv run python -m src.main --mode startweb (웹서비스 시작)
         uv run python -m src.main --mode stopweb (웹서비스 종료)
+    그래프 다이어그램 (구조가 바뀐 경우에만 새로 렌더링, src/diagram.py):
+        uv run python -m src.main --mode diagram
     """
+    print(">>> running main from:", __file__)
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--mode", 
                         type=str, 
                         default="cli", 
-                        choices=['cli', 'startweb', 'stopweb'], 
-                        help="실행 모드를 지정합니다: 'web' (웹 서비스 시작), 'cli' (cli 실행)")
+                        choices=['cli', 'startweb', 'stopweb', 'diagram'], 
+                        help="실행 모드를 지정합니다: 'web' (웹 서비스 시작), 'cli' (cli 실행), 'diagram' (그래프 다이어그램)")
     
-    args = parser.parse_args()
-
-    if args.mode == 'startweb' or args.mode == 'stopweb':
+    args, rest = parser.parse_known_args()
+    if rest and args.mode != 'diagram':
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    if args.mode == 'diagram':
+        from .diagram import main as render_diagram
+        render_diagram(rest)  # 예: --mode diagram --format svg --out graph.svg
+    elif args.mode == 'startweb' or args.mode == 'stopweb':
         # 'web' 모드 선택 시, run_web_services 함수 호출
         run_web_service(args.mode)
     else:
@@ -1,12 +1,17 @@
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
 
-from .node import State, chatbot, add_user_message, summarize_old_messages
-from .tools import tavilysearch, rag_search_tool, save_text_tool, slack_notify_tool
+from .node import (
+    State, chatbot, add_user_message, route_fetch, fetch_docs, fetch_notebooks, fetch_uploads, budgeted_tools,
+    quick_action, TOOL_PREFETCH,
+)
+from . import tools as agent_tools
 from .edge import wire_tool_edges
 
+FETCH_BRANCHES = {"fetch_docs": fetch_docs, "fetch_notebooks": fetch_notebooks, "fetch_uploads": fetch_uploads}
 
-def build_graph():
+
+def build_graph(fanout: bool = TOOL_PREFETCH):
     # LangGraph 생성 (State 구조 기반)
     builder = StateGraph(State)
 
@@ -14,19 +19,33 @@ def build_graph():
     builder.add_node("add_user_message", add_user_message)
     builder.set_entry_point("add_user_message")  # START → add_user_message
 
-    # 오래된 메시지를 4~5줄로 요약하고 state를 '최근 6턴'으로 정리
-    builder.add_node("summarize_old_messages", summarize_old_messages)
-    
     # GPT 응답 생성 노드 등록
     builder.add_node("chatbot", chatbot)
-    
-    # 흐름: add_user_message → summarize_old_messages → chatbot
-    builder.add_edge("add_user_message", "summarize_old_messages")
-    builder.add_edge("summarize_old_messages", "chatbot")
 
-    # ✅ 세 개의 툴(TavilySearch, RAGSearch, SaveText)을 단일 ToolNode에 연결
-    tool_node = ToolNode(tools=[tavilysearch, rag_search_tool, save_text_tool, slack_notify_tool])
-    builder.add_node("tools", tool_node)
+    # deterministic 경로: 이전 답변 저장/슬랙 전송을 LLM 없이 처리하고 종료
+    builder.add_node("quick_action", quick_action)
+    builder.add_edge("quick_action", END)
+
+    if fanout:
+        # 흐름: add_user_message → (fetch_docs | fetch_notebooks | fetch_uploads 병렬) → chatbot
+        # 공식 문서 / 로컬 노트북 / 업로드 파일 검색을 동시에 실행하고 chatbot 앞에서 합류 → 합성 LLM 호출 1회
+        for name, fn in FETCH_BRANCHES.items():
+            builder.add_node(name, fn)
+            builder.add_edge(name, "chatbot")
+        builder.add_conditional_edges("add_user_message", route_fetch, [*FETCH_BRANCHES, "quick_action", "chatbot"])
+    else:
+        # 흐름: add_user_message → chatbot (검색은 모델이 tools 루프에서 순차 호출)
+        builder.add_conditional_edges(
+            "add_user_message",
+            lambda state: "quick_action" if state.get("route") == "deterministic" else "chatbot",
+            ["quick_action", "chatbot"],
+        )
+    # (오래된 대화 요약은 응답 경로 밖에서 SummaryMemory 가 처리하고, state["memory_summary"] 로 전달)
+
+    # ✅ 툴(TavilySearch, RAGSearch, CodeUsageSearch, SaveText, SlackNotify)을 단일 ToolNode에 연결
+    tool_node = ToolNode(tools=[agent_tools.tavilysearch, agent_tools.rag_search_tool, agent_tools.code_usage_search_tool,
+                                agent_tools.save_text_tool, agent_tools.slack_notify_tool])
+    builder.add_node("tools", budgeted_tools(tool_node))  # 턴 마감(turn_budget) 안에서만 실행
 
     # 모델이 툴 호출이 필요하면 tools로, 아니면 종료
     builder.add_conditional_edges("chatbot", tools_condition, {"tools": "tools", END: END})
@@ -36,3 +55,41 @@ def build_graph():
 
     # LangGraph 앱 완성
     return builder.compile()
+
+
+# 복합 질문(공식 문서 + 노트북 예제) 지연 측정: 순차(tools 루프) vs fan-out
+#   uv run python -m src.make_graph [--repeat 3]
+BENCH_QUESTIONS = [
+    "pandas concat 공식 문서 설명이랑 우리 노트북 예제 코드 같이 보여줘",
+    "seaborn histplot 매개변수 공식 문서와 이전 실습 코드 예제를 비교해줘",
+    "sklearn train_test_split 사용법을 공식 문서와 노트북 예제로 알려줘",
+]
+
+def bench(repeat: int = 3) -> None:
+    import statistics
+    import time
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    graphs = {"sequential": build_graph(fanout=False), "fanout": build_graph(fanout=True)}
+    print(f"{'mode':<11} {'p50 s':>7} {'mean s':>7} {'LLM calls':>10}")
+    for mode, graph in graphs.items():
+        latencies, llm_calls = [], []
+        for _ in range(repeat):
+            for q in BENCH_QUESTIONS:
+                started = time.perf_counter()
+                out = graph.invoke({"user_input": q, "messages": []})
+                latencies.append(time.perf_counter() - started)
+                turn = out["messages"][next(i for i, m in enumerate(out["messages"]) if isinstance(m, HumanMessage)):]
+                # prefetch 로 만든 AIMessage(tool_call id 가 prefetch_) 는 LLM 호출이 아님
+                llm_calls.append(sum(
+                    1 for m in turn if isinstance(m, AIMessage)
+                    and not any(c["id"].startswith("prefetch_") for c in m.tool_calls)
+                ))
+        print(f"{mode:<11} {statistics.median(latencies):>7.2f} {statistics.mean(latencies):>7.2f} "
+              f"{statistics.mean(llm_calls):>10.2f}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    bench(parser.parse_args().repeat)
@@ -0,0 +1,129 @@
+# new_src/metrics.py
+"""
+프로세스 내 경량 메트릭 레지스트리 (외부 의존성 없음)
+
+- counter: inc("upload_pool_evictions_total")
+- gauge:   set_gauge("...", value)  또는 register_collector(fn) 로 조회 시점에 계산
+- summary: observe("agent_turn_seconds", 1.23)  → count/sum + 최근 구간 분위수(p50/p90/p99)
+
+FastAPI 의 GET /metrics 가 render_prometheus() 결과(Prometheus text format)를 그대로 내보냅니다.
+"""
+import os
+import sys
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUMMARY_WINDOW = 1024  # 분위수 계산에 쓰는 최근 관측값 개수
+QUANTILES = (0.5, 0.9, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+_summaries: Dict[str, Dict[LabelKey, dict]] = {}
+_collectors: List[Callable[[], Dict[str, float]]] = []  # 기본: _process_stats (아래에서 등록)
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    with _lock:
+        series = _counters.setdefault(name, {})
+        k = _key(labels)
+        series[k] = series.get(k, 0.0) + value
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    with _lock:
+        _gauges.setdefault(name, {})[_key(labels)] = float(value)
+
+def observe(name: str, value: float, **labels) -> None:
+    with _lock:
+        s = _summaries.setdefault(name, {}).setdefault(
+            _key(labels), {"count": 0, "sum": 0.0, "window": deque(maxlen=SUMMARY_WINDOW)}
+        )
+        s["count"] += 1
+        s["sum"] += value
+        s["window"].append(value)
+
+def percentile(name: str, q: float, **labels) -> Optional[float]:
+    """최근 관측값 기준 분위수 (관측값이 없으면 None)."""
+    with _lock:
+        s = _summaries.get(name, {}).get(_key(labels))
+        values = sorted(s["window"]) if s else []
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def count(name: str, **labels) -> int:
+    """summary 관측 횟수."""
+    with _lock:
+        s = _summaries.get(name, {}).get(_key(labels))
+        return s["count"] if s else 0
+
+def register_collector(fn: Callable[[], Dict[str, float]]) -> None:
+    """조회 시점에 {gauge 이름: 값} 을 돌려주는 함수 등록 (예: 풀 상태)."""
+    with _lock:
+        _collectors.append(fn)
+
+def _process_stats() -> Dict[str, float]:
+    """프로세스 RSS (Linux 는 /proc 현재값, 그 외는 최대 RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource  # Windows 에는 없음 → /proc 가 없는 유닉스에서만 사용
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {"process_resident_memory_bytes": rss}
+
+def snapshot() -> Dict[str, dict]:
+    """JSON 으로 직렬화 가능한 현재 값."""
+    with _lock:
+        collectors = list(_collectors)
+        out = {
+            "counters": {n: {_fmt_labels(k): v for k, v in s.items()} for n, s in _counters.items()},
+            "gauges": {n: {_fmt_labels(k): v for k, v in s.items()} for n, s in _gauges.items()},
+        }
+    for fn in collectors:
+        for n, v in fn().items():
+            out["gauges"].setdefault(n, {})[""] = v
+    out["summaries"] = {}
+    with _lock:
+        items = [(n, k, s["count"], s["sum"]) for n, series in _summaries.items() for k, s in series.items()]
+    for n, k, count, total in items:
+        labels = dict(k)
+        out["summaries"].setdefault(n, {})[_fmt_labels(k)] = {
+            "count": count,
+            "sum": total,
+            **{f"p{int(q * 100)}": percentile(n, q, **labels) for q in QUANTILES},
+        }
+    return out
+
+def _fmt_labels(k: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(k) + list((extra or {}).items())
+    return "{" + ",".join(f'{a}="{b}"' for a, b in pairs) + "}" if pairs else ""
+
+def render_prometheus() -> str:
+    snap = snapshot()
+    lines: List[str] = []
+    for kind, type_name in (("counters", "counter"), ("gauges", "gauge")):
+        for name, series in snap[kind].items():
+            lines.append(f"# TYPE {name} {type_name}")
+            lines += [f"{name}{labels} {value}" for labels, value in series.items()]
+    for name, series in snap["summaries"].items():
+        lines.append(f"# TYPE {name} summary")
+        for labels, s in series.items():
+            base = labels[1:-1] if labels else ""
+            for q in QUANTILES:
+                v = s[f"p{int(q * 100)}"]
+                if v is not None:
+                    ql = f'{base},quantile="{q}"' if base else f'quantile="{q}"'
+                    lines.append(f"{name}{{{ql}}} {v}")
+            lines.append(f"{name}_count{labels} {s['count']}")
+            lines.append(f"{name}_sum{labels} {s['sum']}")
+    return "\n".join(lines) + "\n"
+
+
+register_collector(_process_stats)
@@ -0,0 +1,88 @@
+# new_src/model_router.py
+"""
+턴 복잡도 기반 모델 라우팅 (chatbot 앞단)
+
+"저장해줘", "슬랙으로 보내줘" 같은 후속 요청도 모든 도구가 묶인 메인 모델을 거쳤습니다.
+add_user_message 가 턴마다 한 번 분류해 state["route"] 에 넣고, 이후 노드가 경로에 맞게 처리합니다.
+
+- deterministic: 이전 답변을 저장/슬랙 전송만 하는 후속 요청 → LLM 없이 도구 직접 호출 (node.quick_action)
+- light: 저장+슬랙 복합 후속 요청, 인사/감사 같은 잡담 → 작은 모델 (LIGHT_MODEL, 저장/슬랙 도구만)
+- main: 그 외 지식 질문 → 메인 모델 (모든 도구)
+
+메트릭: agent_route_total{route,reason}, agent_route_seconds{route}
+"""
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from . import metrics
+from .prompts import needs_save, needs_slack
+
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "1") == "1"
+
+# 후속 요청의 모든 단어가 이 조각들로만 이루어져 있으면 '이전 답변 그대로 처리' 로 봄 (단어 단위 fullmatch)
+_FOLLOWUP_WORD = re.compile(
+    r"(?:저장|내보내|텍스트|txt|파일|슬랙|slack|디엠|dm|채널|channel|보내|전송|공유|올려|"
+    r"방금|위|이전|앞|마지막|지금|답변|대답|내용|응답|결과|그거|이거|그것|이것|거|전부|전체|좀|그리고|하고|또|"
+    r"해|하|주세요|주라|줄래|줘|으로|로|에게|에|을|를|이|가|도|의|서|고|기|랑|요|"
+    r"please|save|export|write|send|post|share|it|this|that|the|answer|to|as|a|file|and|me)+",
+    re.I,
+)
+_SLACK_CHANNEL = re.compile(r"\b([CGD][A-Z0-9]{8,})\b")
+_SLACK_USER = re.compile(r"\b(U[A-Z0-9]{8,})\b")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+SMALL_TALK_PATTERNS = [
+    r"^(안녕|하이|반가워)", r"^(hi|hello|hey)\b",
+    r"^(고마워|고맙|감사|땡큐|ㄳ|ㄱㅅ)", r"^(thanks|thank you)\b",
+    r"^(오케이|알겠|좋아|굿|ㅇㅋ)", r"^(ok|okay|네|응)\b",
+]
+_SMALL_TALK_MAX_CHARS = 20
+
+
+def previous_answer(msgs: Sequence[BaseMessage]) -> Optional[str]:
+    """직전 턴의 최종 답변 (도구 호출이 없는 마지막 AIMessage)."""
+    for m in reversed(msgs):
+        if isinstance(m, AIMessage) and m.content and not m.tool_calls:
+            return m.content
+    return None
+
+def slack_target(text: str) -> dict:
+    """요청 문장에 적힌 Slack 대상 (없으면 빈 dict → 도구가 환경변수 기본값 사용)."""
+    if m := _SLACK_CHANNEL.search(text):
+        return {"channel_id": m.group(1)}
+    if m := _SLACK_USER.search(text):
+        return {"user_id": m.group(1)}
+    if m := _EMAIL.search(text):
+        return {"email": m.group(0)}
+    return {}
+
+def _is_bare_followup(text: str) -> bool:
+    rest = _EMAIL.sub(" ", _SLACK_USER.sub(" ", _SLACK_CHANNEL.sub(" ", text)))
+    words = re.sub(r"[^\w\s]+", " ", rest).split()
+    return all(_FOLLOWUP_WORD.fullmatch(w) for w in words)
+
+def classify(text: str, history: List[BaseMessage]) -> Tuple[str, str]:
+    """(route, reason). history 는 이번 사용자 메시지 이전까지의 대화."""
+    text = text.strip()
+    if not MODEL_ROUTING:
+        return "main", "routing_disabled"
+    save, slack = needs_save(text), needs_slack(text)
+    if (save or slack) and previous_answer(history) and _is_bare_followup(text):
+        if save and slack:
+            return "light", "save_and_slack_followup"
+        return "deterministic", "save_followup" if save else "slack_followup"
+    if len(text) <= _SMALL_TALK_MAX_CHARS and not (save or slack) and any(
+        re.search(p, text, flags=re.I) for p in SMALL_TALK_PATTERNS
+    ):
+        return "light", "small_talk"
+    return "main", "knowledge"
+
+def record(route: Optional[str], reason: Optional[str], seconds: float) -> None:
+    """턴 단위 라우팅 결정/지연 기록."""
+    route, reason = route or "main", reason or "unknown"
+    metrics.inc("agent_route_total", route=route, reason=reason)
+    metrics.observe("agent_route_seconds", seconds, route=route)
+    print(f"[route] {route} ({reason}) {seconds:.2f}s")
@@ -1,11 +1,22 @@
-from typing import Annotated, Any, Optional, List
+import os
+import json
+import time
+import uuid
+from typing import Annotated, Any, Optional, List, Set
 from typing_extensions import TypedDict
 
 from langgraph.graph import add_messages
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, AIMessage, ToolMessage, BaseMessage
 
 from .prompts import SYS_POLICY, needs_search, needs_save, needs_rag, needs_slack
-from .llm import llm_with_tools, VERBOSE, llm_summarizer
+from . import llm as llms  # 모델/도구는 첫 호출 시 생성 (llm / tools 의 지연 접근자)
+from . import tools as agent_tools
+from .llm import VERBOSE
+from .history_window import window_by_tokens, HISTORY_TOKEN_BUDGET
+from . import metrics
+from . import turn_budget
+from . import model_router
 
 # # FastAPI 실행 상태에서 로그 확인을 위해 추가
 # import logging
@@ -16,7 +27,12 @@ class State(TypedDict, total=False):
     user_input: str                                      # 현재 사용자 입력
     final_answer: Optional[str]                          # (선택) 응답 텍스트
     retriever: Optional[Any]                             # (선택) 세션별 벡터검색기
-    memory_summary: Optional[str]                        # 이전 대화 요약(4~5줄)
+    memory_summary: Optional[str]                        # 이전 대화 요약(4~5줄, SummaryMemory 가 턴 밖에서 갱신)
+    upload_context: Optional[str]                        # fetch_uploads 분기가 찾은 업로드 파일 구문 (턴 내 재사용)
+    deadline: Optional[float]                            # 이번 턴 마감 시각(epoch 초, turn_budget.start)
+    max_tool_iterations: Optional[int]                   # 이번 턴 모델의 도구 호출 반복 상한
+    route: Optional[str]                                 # model_router 분류: deterministic | light | main
+    route_reason: Optional[str]                          # 분류 근거 (로그/메트릭용)
 
 
 SAVE_HINT = "(사용자가 응답 저장을 요청했습니다. 최종 '응답 전문'을 content에 담아 'save_text' 도구를 한 번만 호출하세요.)"
@@ -25,24 +41,24 @@ RAG_HINT = "(이 요청은 로컬 노트북/예제 기반 지식 검색이 필
 SLACK_HINT = "(사용자가 Slack 전송을 요청했습니다. 최종 답변을 'slack_notify' 도구로 보내세요. "\
              "가능하면 channel_id 또는 user_id/email 인자를 채워주세요.)"
 
+# 의도 라우터(needs_*)가 확실하면 첫 LLM 호출 전에 검색을 병렬 분기로 미리 실행 (LLM 왕복 절약)
+TOOL_PREFETCH = os.getenv("TOOL_PREFETCH", "1") == "1"
+
 def _has_hint(msgs, marker: str) -> bool:
     return any(isinstance(m, SystemMessage) and marker in m.content for m in msgs)
 
-def _inject_uploaded_context_if_any(state: State, msgs: list[AnyMessage]) -> list[AnyMessage]:
-    """If a session retriever exists, fetch short snippets for the last user query and inject as context."""
+def _upload_context(state: State) -> Optional[str]:
+    """If a session retriever exists, fetch short snippets for the last user query."""
     retriever = state.get("retriever")
-    if not retriever:
-        return msgs
-
-    last_user = next((m for m in reversed(msgs) if isinstance(m, HumanMessage)), None)
-    if not last_user or not last_user.content.strip():
-        return msgs
+    query = (state.get("user_input") or "").strip()
+    if not retriever or not query:
+        return None
 
     try:
         # docs = retriever.get_relevant_documents(last_user.content) 
-        docs = retriever.invoke(last_user.content) # 최신 버전에서는 invoke 사용
+        docs = retriever.invoke(query) # 최신 버전에서는 invoke 사용
         if not docs:
-            return msgs
+            return None
         lines = []
         for d in docs[:4]:
             src = d.metadata.get("source", "uploaded")
@@ -50,83 +66,137 @@ def _inject_uploaded_context_if_any(state: State, msgs: list[AnyMessage]) -> lis
             if len(snippet) > 500:
                 snippet = snippet[:500] + " …"
             lines.append(f"- {snippet}\n  [◆ 업로드 파일] {src}")
-        context_block = "아래는 사용자가 업로드한 파일에서 검색된 관련 구문입니다. 가능한 한 이를 우선 참고해 답변하세요:\n" + "\n".join(lines)
-        msgs = msgs + [SystemMessage(content=context_block)]
+        return "아래는 사용자가 업로드한 파일에서 검색된 관련 구문입니다. 가능한 한 이를 우선 참고해 답변하세요:\n" + "\n".join(lines)
     except Exception as e:
         # logger.info(f"[test] exception: {e}")
         print(f"[test] exception: {e}")
-        pass
-    return msgs
+        return None
+
+def _inject_uploaded_context_if_any(state: State, msgs: list[AnyMessage]) -> list[AnyMessage]:
+    """업로드 구문을 모델 입력에 추가 (fan-out 분기가 이미 찾았으면 재검색하지 않음)."""
+    context_block = state["upload_context"] if "upload_context" in state else _upload_context(state)
+    if not context_block:
+        return msgs
+    return msgs + [SystemMessage(content=context_block)]
 
 def add_user_message(state: State) -> State:
     msgs = state.get("messages", [])
+    # 턴 복잡도 분류 (이번 메시지 이전 대화 기준) → route_fetch / chatbot 이 경로에 맞는 모델·도구 사용
+    state["route"], state["route_reason"] = model_router.classify(state["user_input"], msgs)
     msgs.append(HumanMessage(content=state["user_input"]))
     state["messages"] = msgs
-    return state
+    return turn_budget.start(state)  # 마감/반복 예산 (이후 모든 노드가 같은 값을 사용)
 
-def _keep_recent_messages(messages: List[BaseMessage], max_turns: int = 6) -> List[BaseMessage]:
-    """
-    Human+AI 한 쌍을 '1턴'으로 보고, 모델 입력용으로 최근 max_turns 턴만 유지
-    - state['messages'] 자체는 건드리지 않습니다. (전체 히스토리는 유지)
-    - 모델 호출 직전에 **입력 복사본**에만 트리밍을 적용합니다.
-    - 간단히 길이 기준(2*턴 + 2)로 자릅니다. (System 1 + 여유분 1 가정)
-    - 필요하면 턴 페어링/토큰 카운트 기반으로 정교화할 수 있습니다.
-    """
-    if not messages:
-        return messages
-    window_size = max_turns * 2 + 2  # System 1개 + (Human/AI) * N + 여유
-    return messages[-window_size:]
-
-"""
-오래된 대화를 4~5줄로 요약해 memory_summary에 누적 + state를 최근 N턴으로 정리
-* 팀 로직을 건드리지 않기 위해 node 내부에서만 수행
-* make_graph에서 add_user_message 다음에 이 노드를 한번 거치게 연결
-"""
-_SUMMARY_SYS = (
-    "너는 회의록 비서다. 아래 대화의 핵심을 **한국어 4~5줄**로 요약하라.\n"
-    "- 주제/결론/결정/중요한 코드/버전/URL만 유지\n"
-    "- 중복/군더더기 제거, 불확실하면 명시\n"
-)
-
-def summarize_old_messages(state: State, max_turns: int = 6) -> State:
-    """
-    전체 messages 길이가 '최근 N턴 윈도우'보다 길어졌을 때만:
-      - 오래된 구간만 요약하여 memory_summary에 누적
-      - state['messages']는 최근 N턴만 남김 (상태 자체를 가볍게 유지)
-    """
-    msgs: List[BaseMessage] = state.get("messages", [])
-    recent_window = _keep_recent_messages(msgs, max_turns=max_turns)
-    if len(recent_window) == len(msgs):
-        # 아직 짧으면 요약 불필요
-        return state
-
-    # 오래된 구간(old)과 최근 구간(recent) 분리
-    cutoff = len(msgs) - len(recent_window)
-    old = msgs[:cutoff]
-    recent = msgs[cutoff:]
-
-    # 오래된 구간만 요약 시도
+def _tools_run_this_turn(msgs: List[BaseMessage]) -> Set[str]:
+    """마지막 사용자 메시지 이후 실행된 도구 이름 (prefetch 포함)."""
+    names: Set[str] = set()
+    for m in reversed(msgs):
+        if isinstance(m, HumanMessage):
+            break
+        if isinstance(m, ToolMessage):
+            names.add(m.name)
+    return names
+
+def _has_side_effects(names) -> bool:
+    """파일 저장 / Slack 전송처럼 되돌릴 수 없는 도구 — 마감이 지나도 버리지 않고 끝까지 실행."""
+    side_effect = {agent_tools.save_text_tool.name, agent_tools.slack_notify_tool.name}
+    return any(n in side_effect for n in names)
+
+def _timeout_message(call: dict) -> ToolMessage:
+    return ToolMessage(content="Error: tool timed out (turn deadline reached)",
+                       tool_call_id=call["id"], name=call["name"], status="error")
+
+def _run_prefetch(state: State, tool, args: dict) -> dict:
+    """도구를 모델이 호출한 것처럼 실행 → AIMessage(tool_calls) + ToolMessage 한 쌍."""
+    call = {"name": tool.name, "args": args, "id": f"prefetch_{uuid.uuid4().hex[:12]}"}
+    started = time.perf_counter()
     try:
-        summary = llm_summarizer.invoke(
-            [SystemMessage(content=_SUMMARY_SYS)] + old
-        ).content.strip()
+        # ToolCall 형태로 invoke → ToolNode 와 같은 형식의 ToolMessage 반환 (최종 답변 시간은 남겨 둠)
+        timeout_msg = _timeout_message(call)
+        msg = turn_budget.call_with_deadline(
+            lambda: tool.invoke({**call, "type": "tool_call"}), state,
+            on_timeout=lambda: timeout_msg, reserve=turn_budget.FINAL_ANSWER_RESERVE_S,
+            abandon=not _has_side_effects([tool.name]),
+        )
+        metrics.inc("tool_prefetch_total", tool=tool.name, result="timeout" if msg is timeout_msg else "ok")
     except Exception as e:
-        if VERBOSE:
-            print(f"[summary] failed: {e}")
-        # 요약 실패해도 최근만 유지(서비스 지속)
-        state["messages"] = recent
-        return state
+        msg = ToolMessage(content=f"Error: {e}", tool_call_id=call["id"], name=tool.name, status="error")
+        metrics.inc("tool_prefetch_total", tool=tool.name, result="error")
+    metrics.observe("tool_prefetch_seconds", time.perf_counter() - started, tool=tool.name)
+    return {"messages": [AIMessage(content="", tool_calls=[call]), msg]}
+
+def fetch_docs(state: State):
+    """[fan-out 분기] 공식 문서 검색 (tavilysearch)."""
+    return _run_prefetch(state, agent_tools.tavilysearch, {"query": state["user_input"]})
 
-    # 이전 요약이 있으면 이어붙임(누적)
-    prev = (state.get("memory_summary") or "").strip()
-    merged = (prev + ("\n" if prev else "") + summary).strip()
+def fetch_notebooks(state: State):
+    """[fan-out 분기] 로컬 노트북 검색 (rag_search)."""
+    return _run_prefetch(state, agent_tools.rag_search_tool, {"query": state["user_input"]})
 
-    state["memory_summary"] = merged          # 4~5줄 요약 누적
-    state["messages"] = recent                # 상태는 최근 N턴만 보존 (메모리/비용 절감)
-    if VERBOSE:
-        print(f"[summary] merged ({cutoff} msgs -> 4~5 lines)")
+def fetch_uploads(state: State):
+    """[fan-out 분기] 세션 업로드 파일 검색 (retriever)."""
+    return {"upload_context": _upload_context(state)}
+
+def route_fetch(state: State) -> List[str]:
+    """
+    add_user_message 다음 분기 선택. 여러 개면 LangGraph 가 병렬로 실행하고 chatbot 앞에서 합류합니다.
+    저장/슬랙 요청은 '이전 답변'을 다루는 경우가 많아 의도가 불분명 → 검색 분기 없음.
+    """
+    text = state.get("user_input", "")
+    if state.get("route") == "deterministic":
+        return ["quick_action"]
+    branches = []
+    if TOOL_PREFETCH and text.strip() and not (needs_save(text) or needs_slack(text)):
+        if needs_search(text):
+            branches.append("fetch_docs")
+        if needs_rag(text):
+            branches.append("fetch_notebooks")
+    if state.get("retriever") and text.strip():
+        branches.append("fetch_uploads")
+    return branches or ["chatbot"]
+
+def quick_action(state: State):
+    """
+    [deterministic 경로] 이전 답변을 그대로 저장/슬랙 전송 — LLM 호출 없이 도구만 실행하고 짧게 확인.
+    (model_router 가 이전 답변이 있고 다른 요청 내용이 없는 후속 요청만 이 경로로 보냄)
+    """
+    text = state["user_input"]
+    answer = model_router.previous_answer(state["messages"][:-1])
+    if state.get("route_reason") == "save_followup":
+        out = _run_prefetch(state, agent_tools.save_text_tool, {"content": answer})
+        result = out["messages"][-1]
+        if result.status == "error":
+            ack = f"저장에 실패했습니다: {result.content}"
+        else:
+            ack = f"이전 답변을 저장했습니다. ({json.loads(result.content).get('message')})"
+    else:
+        out = _run_prefetch(state, agent_tools.slack_notify_tool, {"text": answer, **model_router.slack_target(text)})
+        try:
+            result = json.loads(out["messages"][-1].content)
+        except json.JSONDecodeError:
+            result = {"status": "error", "error": out["messages"][-1].content}
+        if result.get("status") == "ok":
+            ack = f"이전 답변을 Slack({result.get('target_type')})으로 보냈습니다."
+        else:
+            ack = f"Slack 전송에 실패했습니다: {result.get('reason') or result.get('error')}"
+    final = AIMessage(content=ack, response_metadata={"route": "deterministic"})
+    return {"messages": out["messages"] + [final]}
 
-    return state
+def budgeted_tools(tool_node):
+    """
+    ToolNode 를 턴 마감 안에서만 실행하는 노드로 감쌈.
+    마감을 넘기면 기다리지 않고 각 tool_call 에 오류 ToolMessage 를 돌려줌 → chatbot 이 최종 답변으로 마무리.
+    (save_text / slack_notify 가 포함되면 버리지 않고 끝까지 실행 — 실패로 보고한 뒤 실제로는 저장/전송되는 일 방지)
+    """
+    def tools(state: State, config: RunnableConfig):
+        calls = state["messages"][-1].tool_calls
+        return turn_budget.call_with_deadline(
+            lambda: tool_node.invoke(state, config), state,
+            on_timeout=lambda: {"messages": [_timeout_message(c) for c in calls]},
+            reserve=turn_budget.FINAL_ANSWER_RESERVE_S,
+            abandon=not _has_side_effects(c["name"] for c in calls),
+        )
+    return tools
 
 def chatbot(state: State):
     # 방어적 시작: messages가 없을 수도 있으므로 get 사용
@@ -143,20 +213,24 @@ def chatbot(state: State):
     if state.get("memory_summary"):
         model_msgs = [model_msgs[0], SystemMessage(content=f"[이전 요약]\n{state['memory_summary']}")] + model_msgs[1:]
 
-    # 모델 입력에 한해 최근 N턴만 반영
+    # 모델 입력에 한해 토큰 예산 안의 최근 구간만 반영 (tool_call/ToolMessage 쌍은 함께 유지)
     before = len(model_msgs)
-    model_msgs = _keep_recent_messages(model_msgs, max_turns=6)
+    model_msgs, saved_tokens = window_by_tokens(model_msgs, HISTORY_TOKEN_BUDGET)
     after = len(model_msgs)
+    metrics.observe("history_tokens_saved", saved_tokens)
     if VERBOSE and before != after:
-        print(f"[trim] messages for model input: {before} -> {after}")
+        print(f"[trim] messages for model input: {before} -> {after} (saved {saved_tokens} prompt tokens)")
 
     # Look at the most recent user message (트리밍 이후 기준으로 판단)
     last_user = next((m for m in reversed(model_msgs) if isinstance(m, HumanMessage)), None)
     if last_user:
         content = last_user.content
-        if needs_search(content) and not _has_hint(model_msgs, SEARCH_HINT):
+        already_run = _tools_run_this_turn(model_msgs)  # prefetch 로 이미 실행된 도구는 다시 유도하지 않음
+        # 검색 도구 이름은 구현마다 다름 (TavilySearch 는 'tavily_search') → 실제 도구의 name 으로 비교
+        search_done = agent_tools.tavilysearch.name in already_run
+        if needs_search(content) and not search_done and not _has_hint(model_msgs, SEARCH_HINT):
             model_msgs.append(SystemMessage(content=SEARCH_HINT))
-        if needs_rag(content) and not _has_hint(model_msgs, RAG_HINT):
+        if needs_rag(content) and "rag_search" not in already_run and not _has_hint(model_msgs, RAG_HINT):
             model_msgs.append(SystemMessage(content=RAG_HINT))
         if needs_save(content) and not _has_hint(model_msgs, SAVE_HINT):
             model_msgs.append(SystemMessage(content=SAVE_HINT))
@@ -174,8 +248,27 @@ def chatbot(state: State):
 
     model_msgs = _inject_uploaded_context_if_any(state, model_msgs)
 
+    # light 경로(잡담/단순 후속 요청)는 작은 모델, 나머지는 메인 모델
+    model = llms.llm_light_with_tools if state.get("route") == "light" else llms.llm_with_tools
+
+    # 반복/마감 예산이 바닥나면 도구 없이 최종 답변을 강제 (recursion limit / 클라이언트 타임아웃 대신)
+    exhausted = turn_budget.exhausted(state, msgs)
+    if exhausted:
+        metrics.inc("agent_budget_exhausted_total", reason=exhausted)
+        if VERBOSE:
+            print(f"[budget] {exhausted} budget exhausted → forcing final answer")
+        model_msgs.append(SystemMessage(content=turn_budget.FINAL_ANSWER_HINT))
+        model = model.bind(tool_choice="none")  # 도구 정의는 유지(이전 tool_call 이력 호환), 호출만 금지
+
+    # LLM 호출도 남은 시간 안에서 (openai 요청 timeout)
+    left = turn_budget.remaining(state)
+    kwargs = {"timeout": max(left, 1.0)} if left is not None else {}
+
     # invoke에는 잘라낸 입력 복사본(model_msgs)을 사용, 원본 msgs는 그대로 보존
-    response: AIMessage = llm_with_tools.invoke(model_msgs)
+    response: AIMessage = model.invoke(model_msgs, **kwargs)
+    response.response_metadata["history_tokens_saved"] = saved_tokens
+    if not response.tool_calls:
+        metrics.observe("agent_tool_iterations", turn_budget.tool_iterations(msgs))
     return {"messages": [response]}
 
     # upload branch
@@ -0,0 +1,204 @@
+# new_src/notebook_splitter.py
+"""
+노트북 셀 / Python AST 경계를 존중하는 splitter
+
+- 셀을 자르지 않고, 코드 셀은 최상위 AST 단위(함수, 클래스, 최상위 문장)로만 나눕니다.
+- 작은 셀/단위는 토큰 예산(max_tokens)까지 이어 붙여 하나의 chunk 로 만듭니다.
+- overlap 이 없으므로 같은 토큰을 두 번 임베딩하지 않습니다.
+- 예산을 넘는 단일 단위(거대한 함수 등)만 줄 단위로 나눕니다.
+
+비교 리포트 (기존 RecursiveCharacterTextSplitter 대비 chunk/임베딩 토큰 수):
+    uv run python -m src.notebook_splitter [notebook.ipynb ...]
+"""
+import ast
+import glob
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+from .util.tokens import count_tokens
+
+NOTEBOOK_CHUNK_TOKENS = 300   # rag_build (기존 1000자 ≈ 250~350 토큰)
+UPLOAD_CHUNK_TOKENS = 240     # 업로드 파일 (SessionUploadIndex, 기존 800자)
+# 분할 규칙이 바뀌면 올림 → rag_build 가 manifest 의 값과 다르면 전체 노트북을 다시 분할 (1 = 기존 1000/150 문자 splitter)
+SPLITTER_VERSION = 2
+
+# content-defined 경계: 단위 내용 해시가 이 값으로 나누어떨어지면 (예산 절반 이상일 때) chunk 를 끊음
+CDC_MODULUS = 4
+
+# (text, cell_index) — 더 이상 쪼개지 않는 최소 단위
+Unit = Tuple[str, int]
+
+
+# -------------------------------
+# Cell → units
+# -------------------------------
+def mask_magics(src: str) -> str:
+    """IPython 매직/셸 명령(%, !)은 ast.parse 가 실패하므로 같은 줄 수의 주석으로 치환."""
+    lines = src.split("\n")
+    return "\n".join("#" + ln if ln.lstrip().startswith(("%", "!")) else ln for ln in lines)
+
+def _code_segments(src: str) -> List[str]:
+    """최상위 AST 노드 시작 줄을 경계로 코드 셀을 나눕니다 (데코레이터/선행 주석은 다음 노드에 포함)."""
+    try:
+        tree = ast.parse(mask_magics(src))
+    except SyntaxError:
+        # 파싱 불가 코드는 빈 줄 단위 문단으로 대체
+        return [p for p in src.split("\n\n") if p.strip()]
+
+    lines = src.split("\n")
+    starts: List[int] = []
+    for node in tree.body:
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        # 바로 위에 붙은 주석은 해당 노드와 같은 단위로
+        while first > 0 and lines[first - 1].lstrip().startswith("#"):
+            first -= 1
+        starts.append(first)
+    if not starts:
+        return [src] if src.strip() else []
+
+    # 첫 노드 앞의 주석/빈 줄은 첫 segment 에 포함
+    starts[0] = 0
+    bounds = starts + [len(lines)]
+    segments = ["\n".join(lines[a:b]).strip("\n") for a, b in zip(bounds, bounds[1:])]
+    return [s for s in segments if s.strip()]
+
+def _split_lines(text: str, max_tokens: int) -> List[str]:
+    """예산을 넘는 단일 단위를 줄 경계로 나눕니다 (overlap 없음)."""
+    pieces, buf, buf_tokens = [], [], 0
+    for line in text.split("\n"):
+        t = count_tokens(line) + 1
+        if buf and buf_tokens + t > max_tokens:
+            pieces.append("\n".join(buf))
+            buf, buf_tokens = [], 0
+        buf.append(line)
+        buf_tokens += t
+    if buf:
+        pieces.append("\n".join(buf))
+    return pieces
+
+def _paragraph_units(text: str, idx: int, max_tokens: int) -> Iterator[Unit]:
+    for para in (p for p in text.split("\n\n") if p.strip()):
+        if count_tokens(para) <= max_tokens:
+            yield para.strip("\n"), idx
+        else:
+            yield from ((piece, idx) for piece in _split_lines(para, max_tokens))
+
+def iter_cell_units(cells: Iterable[Dict], max_tokens: int) -> Iterator[Unit]:
+    """nbformat 셀을 하나씩 최소 단위로 변환합니다 (셀 단위 스트리밍)."""
+    for idx, cell in enumerate(cells):
+        cell_type = cell.get("cell_type")
+        if cell_type not in {"code", "markdown"}:
+            continue
+        src = str(cell.get("source") or "")
+        if not src.strip():
+            continue
+        if count_tokens(src) <= max_tokens:
+            yield src.strip("\n"), idx
+            continue
+        if cell_type != "code":
+            yield from _paragraph_units(src, idx, max_tokens)
+            continue
+        for seg in _code_segments(src):
+            if count_tokens(seg) <= max_tokens:
+                yield seg, idx
+            else:
+                yield from ((piece, idx) for piece in _split_lines(seg, max_tokens))
+
+def iter_page_units(pages: Iterable[str], max_tokens: int) -> Iterator[Unit]:
+    """PDF 등 페이지 텍스트를 문단 단위로 변환합니다 (페이지 단위 스트리밍, idx = 페이지 번호)."""
+    for idx, text in enumerate(pages):
+        if text and text.strip():
+            yield from _paragraph_units(text, idx, max_tokens)
+
+
+# -------------------------------
+# Units → chunks
+# -------------------------------
+def iter_pack_units(units: Iterable[Unit], source: str, max_tokens: int,
+                    content_defined: bool = False, unit_name: str = "cell") -> Iterator[Document]:
+    """
+    연속된 단위를 토큰 예산까지 이어 붙여 Document 로 내보냅니다 (입력/출력 모두 스트리밍).
+    content_defined=True 면 경계를 단위 내용으로도 정해, 앞쪽 셀이 수정되어도
+    뒤쪽 chunk 경계가 밀리지 않습니다 (재업로드 시 바뀐 chunk 만 재임베딩하기 위함).
+    """
+    buf: List[Unit] = []
+    buf_tokens = 0
+
+    def make_doc() -> Document:
+        first, last = buf[0][1], buf[-1][1]
+        return Document(
+            page_content="\n\n".join(text for text, _ in buf),
+            metadata={"source": source, f"{unit_name}_start": first, f"{unit_name}_end": last},
+        )
+
+    for text, idx in units:
+        t = count_tokens(text)
+        if buf and buf_tokens + t > max_tokens:
+            yield make_doc()
+            buf, buf_tokens = [], 0
+        buf.append((text, idx))
+        buf_tokens += t
+        if content_defined and buf_tokens >= max_tokens // 2 and zlib.crc32(text.encode("utf-8")) % CDC_MODULUS == 0:
+            yield make_doc()
+            buf, buf_tokens = [], 0
+    if buf:
+        yield make_doc()
+
+def pack_units(units: Iterable[Unit], source: str, max_tokens: int, content_defined: bool = False) -> List[Document]:
+    """연속된 단위를 토큰 예산까지 이어 붙여 Document 로 만듭니다."""
+    return list(iter_pack_units(units, source, max_tokens, content_defined))
+
+def split_notebook(path: str, max_tokens: int = NOTEBOOK_CHUNK_TOKENS, content_defined: bool = False) -> List[Document]:
+    import nbformat
+    nb = nbformat.read(path, as_version=4)
+    return pack_units(iter_cell_units(nb.cells, max_tokens), path, max_tokens, content_defined)
+
+
+# -------------------------------
+# Report: 기존 splitter 대비 절감량
+# -------------------------------
+def _legacy_chunks(path: str) -> List[str]:
+    """rag_build 의 기존 방식 (NotebookLoader + RecursiveCharacterTextSplitter 1000/150)."""
+    from langchain_community.document_loaders import NotebookLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    docs = NotebookLoader(path, include_outputs=False, max_output_length=0).load()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    return [d.page_content for d in splitter.split_documents(docs)]
+
+def compare(paths: List[str], max_tokens: int = NOTEBOOK_CHUNK_TOKENS) -> Dict[str, int]:
+    old_chunks = old_tokens = new_chunks = new_tokens = 0
+    for p in paths:
+        old = _legacy_chunks(p)
+        new = split_notebook(p, max_tokens=max_tokens)
+        old_chunks += len(old)
+        old_tokens += sum(count_tokens(c) for c in old)
+        new_chunks += len(new)
+        new_tokens += sum(count_tokens(d.page_content) for d in new)
+    return {
+        "notebooks": len(paths),
+        "old_chunks": old_chunks, "new_chunks": new_chunks,
+        "old_tokens": old_tokens, "new_tokens": new_tokens,
+    }
+
+def _pct(saved: int, base: int) -> str:
+    return f"{(saved / base * 100):.1f}%" if base else "-"
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if not paths:
+        for root in [Path("data"), Path("uploads")]:
+            paths += glob.glob(str(root / "**" / "*.ipynb"), recursive=True)
+    if not paths:
+        print("No notebooks found under data/ or uploads/.")
+        sys.exit(1)
+
+    r = compare(sorted(paths))
+    print(f"🗂️  Notebooks        : {r['notebooks']}")
+    print(f"🔹 Chunks           : {r['old_chunks']} → {r['new_chunks']} "
+          f"(saved {r['old_chunks'] - r['new_chunks']}, {_pct(r['old_chunks'] - r['new_chunks'], r['old_chunks'])})")
+    print(f"🔹 Embedding tokens : {r['old_tokens']} → {r['new_tokens']} "
+          f"(saved {r['old_tokens'] - r['new_tokens']}, {_pct(r['old_tokens'] - r['new_tokens'], r['old_tokens'])})")
@@ -0,0 +1,171 @@
+# new_src/providers.py
+"""
+외부 모델/검색 공급자 선택 (온라인 / 오프라인)
+
+llm.py / tools.py 가 ChatOpenAI · OpenAIEmbeddings · TavilySearch 를 직접 만들고 import 시점에 API 키를 검사해서
+OpenAI/Tavily 사용량 없이는 FastAPI + LangGraph 스택을 부하 테스트할 수 없었습니다.
+
+AGENT_OFFLINE=1 이면
+- chat_model(): ScriptedChatModel — 의도 라우터(needs_*)로 도구 호출을 흉내내고, 도구 결과가 오면 최종 답변 (지연 주입 가능)
+- embeddings(): DeterministicFakeEmbedding — 텍스트 해시 기반 (같은 텍스트 → 같은 벡터)
+- search_tool(): 고정 결과를 돌려주는 'tavily_search' 도구 (TavilySearch 와 같은 이름 / JSON 형식)
+- save_text_func(): 파일을 쓰지 않는 save_text (부하 테스트가 output/save_text 를 채우지 않도록, 결과 형식은 같음)
+  slack_notify 는 SLACK_BOT_TOKEN 이 없으면 원래 전송하지 않음 (status=skipped)
+- require_keys(): 키 검사 생략
+
+온라인 모드의 OpenAI chat / embeddings 클라이언트는 http_pool 의 공용 연결 풀을 사용합니다.
+
+    AGENT_OFFLINE=1 uv run uvicorn src.web.main:app --port 8000
+    uv run python -m src.loadtest --rps 5 --duration 60
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+AGENT_OFFLINE = os.getenv("AGENT_OFFLINE", "0") == "1"
+# 가짜 LLM 호출 지연: 평균 ± jitter (초)
+OFFLINE_LLM_LATENCY_S = float(os.getenv("OFFLINE_LLM_LATENCY_S", "0.3"))
+OFFLINE_LLM_JITTER_S = float(os.getenv("OFFLINE_LLM_JITTER_S", "0.1"))
+OFFLINE_SEARCH_LATENCY_S = float(os.getenv("OFFLINE_SEARCH_LATENCY_S", "0.2"))
+EMBED_DIM = 1536  # text-embedding-3-small 과 같은 차원
+SEARCH_TOOL_NAME = "tavily_search"  # langchain_tavily.TavilySearch 의 도구 이름 (오프라인 도구도 같은 이름)
+
+
+def require_keys(*names: str) -> None:
+    """온라인 모드에서만 API 키 검사."""
+    if AGENT_OFFLINE:
+        return
+    for name in names:
+        assert os.getenv(name), f"Missing {name} in environment (.env not loaded or key not set)."
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    오프라인 가짜 chat 모델.
+    - 이번 턴에 아직 도구 결과가 없고, 바인딩된 도구 중 의도에 맞는 것이 있으면 tool_call 을 반환
+      (검색 → tavily_search, 예제 → rag_search, 저장 → save_text, 슬랙 → slack_notify)
+    - 도구 결과가 있거나 tool_choice="none" 이면 최종 답변
+    """
+
+    model_name: str = "scripted"
+    latency_s: float = OFFLINE_LLM_LATENCY_S
+    jitter_s: float = OFFLINE_LLM_JITTER_S
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _sleep(self) -> None:
+        delay = self.latency_s + random.uniform(-self.jitter_s, self.jitter_s)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        self._sleep()
+        tool_names = {t["function"]["name"] for t in kwargs.get("tools") or []}
+        if kwargs.get("tool_choice") == "none":
+            tool_names = set()
+        message = self._respond(messages, tool_names)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _respond(self, messages: List[BaseMessage], tool_names: set) -> AIMessage:
+        from .prompts import needs_rag, needs_save, needs_search, needs_slack
+
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        question = messages[turn_start].content if messages else ""
+        turn = messages[turn_start + 1:]
+        used = {m.name for m in turn if isinstance(m, ToolMessage)}
+        answer = (f"[offline {self.model_name}] '{question[:60]}' 에 대한 답변입니다. "
+                  f"(참고한 도구: {', '.join(sorted(used)) or '없음'})")
+
+        wanted = []
+        if needs_search(question):
+            # 바인딩된 검색 도구의 실제 이름으로 호출 (온라인과 같은 도구 흐름)
+            search = next((n for n in tool_names if "search" in n and n not in ("rag_search", "code_usage_search")),
+                          SEARCH_TOOL_NAME)
+            wanted.append((search, {"query": question}))
+        if needs_rag(question):
+            wanted.append(("rag_search", {"query": question}))
+        if needs_save(question):
+            wanted.append(("save_text", {"content": answer}))
+        if needs_slack(question):
+            wanted.append(("slack_notify", {"text": answer}))
+        calls = [{"name": name, "args": args, "id": f"call_{random.getrandbits(48):012x}"}
+                 for name, args in wanted if name in tool_names and name not in used]
+        if calls:
+            return AIMessage(content="", tool_calls=calls)
+        return AIMessage(content=answer)
+
+
+def chat_model(model: str, **kwargs: Any) -> BaseChatModel:
+    if AGENT_OFFLINE:
+        return ScriptedChatModel(model_name=model)
+    from langchain_openai import ChatOpenAI
+    from . import http_pool
+    return ChatOpenAI(model=model, http_client=http_pool.sync_client(),
+                      http_async_client=http_pool.async_client(), **kwargs)
+
+_embeddings: dict = {}  # {model: 임베딩 클라이언트} — 세션/색인마다 새로 만들지 않고 공유 (thread-safe)
+_embeddings_lock = threading.Lock()
+
+def embeddings(model: str = "text-embedding-3-small"):
+    with _embeddings_lock:
+        emb = _embeddings.get(model)
+        if emb is None:
+            emb = _embeddings[model] = _make_embeddings(model)
+        return emb
+
+def _make_embeddings(model: str):
+    if AGENT_OFFLINE:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=EMBED_DIM)
+    from langchain_openai import OpenAIEmbeddings
+    from . import http_pool
+    return OpenAIEmbeddings(model=model, http_client=http_pool.sync_client(),
+                            http_async_client=http_pool.async_client())
+
+
+def _canned_search(query: str) -> str:
+    time.sleep(OFFLINE_SEARCH_LATENCY_S)
+    return json.dumps({
+        "query": query,
+        "results": [
+            {"title": f"Offline result {i} for '{query[:40]}'",
+             "url": f"https://example.com/docs/{abs(hash((query, i))) % 10_000}",
+             "content": f"Canned documentation snippet {i} for: {query}"}
+            for i in range(1, 4)
+        ],
+    }, ensure_ascii=False)
+
+def search_tool(**kwargs: Any):
+    """공식 문서 검색 도구 (오프라인이면 같은 이름의 고정 결과 도구)."""
+    if AGENT_OFFLINE:
+        from langchain_core.tools import StructuredTool
+        return StructuredTool.from_function(
+            name=SEARCH_TOOL_NAME,
+            description="Search official documentation (offline canned results).",
+            func=_canned_search,
+        )
+    from langchain_tavily import TavilySearch
+    return TavilySearch(**kwargs)
+
+
+def _discard_text(content: str, filename_prefix: str = "response") -> dict:
+    filename = f"{filename_prefix}_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+    return {"message": f"Saved output to {filename} (offline: not written)", "file_path": ""}
+
+def save_text_func(func):
+    """save_text 도구 본체 (오프라인이면 디스크에 쓰지 않는 같은 형식의 함수)."""
+    return _discard_text if AGENT_OFFLINE else func
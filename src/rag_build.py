@@ -1,30 +1,35 @@
 # new_src/rag_build.py
 import os, glob, json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_community.document_loaders import NotebookLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 
+from .notebook_splitter import split_notebook, NOTEBOOK_CHUNK_TOKENS, SPLITTER_VERSION
+from . import symbol_index
+from .libraries import libraries_for_symbols, lib_tag
+from .vector_quant import build_sidecar, VECTOR_DTYPE
+from .index_store import INDEX_DIR, current_index_dir, new_version_dir, publish_version, gc_versions
+from .providers import embeddings as provider_embeddings
+
 # -------------------------------
 # Paths
 # -------------------------------
 DATA_DIR = Path("data")
 UPLOADS_DIR = Path("uploads")
-INDEX_DIR = DATA_DIR / "index"            # Chroma persist directory
-MANIFEST_PATH = INDEX_DIR / "manifest.json"
+MANIFEST_NAME = "manifest.json"           # 버전 디렉토리마다 하나씩 (인덱스와 항상 함께 이동)
+SPLITTER_KEY = "__splitter__"             # manifest 안의 예약 키 (나머지는 {path: mtime})
 
 # -------------------------------
 # Settings
 # -------------------------------
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 150
+CHUNK_TOKENS = NOTEBOOK_CHUNK_TOKENS  # 셀/AST 경계 기준 packing 예산 (overlap 없음)
 BATCH_SIZE = 256  # safe + fast
+# splitter 버전/예산이 manifest 와 다르면 mtime 과 상관없이 전부 다시 분할 (이전 chunk 와 섞이지 않게)
+SPLITTER_ID = f"notebook_splitter/v{SPLITTER_VERSION}/{CHUNK_TOKENS}"
 
 # -------------------------------
 # Helpers
@@ -37,38 +42,61 @@ def _notebook_paths() -> Dict[str, float]:
             paths += glob.glob(str(root / "**" / "*.ipynb"), recursive=True)
     return {p: os.path.getmtime(p) for p in sorted(paths)}
 
-def _load_manifest() -> Dict[str, float]:
-    if MANIFEST_PATH.exists():
+def _symbol_source_paths() -> Dict[str, float]:
+    """Notebooks plus uploaded .py files — inputs of the AST symbol index."""
+    paths = dict(_notebook_paths())
+    if UPLOADS_DIR.exists():
+        for p in sorted(glob.glob(str(UPLOADS_DIR / "**" / "*.py"), recursive=True)):
+            paths[p] = os.path.getmtime(p)
+    return paths
+
+def _load_manifest(index_dir: Optional[Path]) -> Dict[str, float]:
+    if index_dir is None:
+        return {}
+    manifest_path = index_dir / MANIFEST_NAME
+    if manifest_path.exists():
         try:
-            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            with open(manifest_path, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception:
             return {}
     return {}
 
-def _save_manifest(manifest: Dict[str, float]) -> None:
-    INDEX_DIR.mkdir(parents=True, exist_ok=True)
-    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+def _save_manifest(index_dir: Path, manifest: Dict[str, float]) -> None:
+    index_dir.mkdir(parents=True, exist_ok=True)
+    with open(index_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
         json.dump(manifest, f, ensure_ascii=False, indent=2)
 
-def _load_ipynb_docs(file_paths: List[str]):
-    docs = []
+def _tag_libraries(path: str, chunks) -> None:
+    """Tag each chunk with lib_<key>=True for the DEFAULT_DOCS libraries its cells import/use."""
+    try:
+        records, _ = symbol_index.extract_file(path)
+    except Exception:
+        return
+    symbols_by_cell: Dict[int, set] = {}
+    for r in records:
+        symbols_by_cell.setdefault(r["cell"], set()).add(r["symbol"])
+    for c in chunks:
+        cells = range(c.metadata.get("cell_start", 0), c.metadata.get("cell_end", 0) + 1)
+        symbols = set().union(*(symbols_by_cell.get(i, set()) for i in cells))
+        libs = libraries_for_symbols(symbols)
+        for key in libs:
+            c.metadata[lib_tag(key)] = True
+        c.metadata["libraries"] = ",".join(libs)  # 사람이 보기 위한 요약
+
+def _load_ipynb_chunks(file_paths: List[str]):
+    """Split notebooks on cell / AST boundaries (see notebook_splitter) and tag libraries."""
+    chunks = []
     for p in file_paths:
-        loader = NotebookLoader(p, include_outputs=False, max_output_length=0)
-        docs.extend(loader.load())
-    # normalize metadata
-    for d in docs:
-        d.metadata["source"] = d.metadata.get("source", d.metadata.get("path", "notebook"))
-    return docs
-
-def _split_docs(docs):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-    return splitter.split_documents(docs)
-
-def _ensure_chroma(embeddings) -> Chroma:
+        nb_chunks = split_notebook(p, max_tokens=CHUNK_TOKENS)
+        _tag_libraries(p, nb_chunks)
+        chunks.extend(nb_chunks)
+    return chunks
+
+def _ensure_chroma(embeddings, index_dir: Path) -> Chroma:
     return Chroma(
         embedding_function=embeddings,
-        persist_directory=str(INDEX_DIR),
+        persist_directory=str(index_dir),
         collection_name="notebooks",
     )
 
@@ -80,20 +108,38 @@ def main():
     if not DATA_DIR.exists() and not UPLOADS_DIR.exists():
         raise AssertionError("Neither data/ nor uploads/ folder found")
 
-    # 1) discover files and manifest
+    # 1) discover files and manifest (from the currently published version)
+    base_dir = current_index_dir()
     current = _notebook_paths()              # {path: mtime}
-    manifest = _load_manifest()              # {path: mtime}
+    manifest = _load_manifest(base_dir)      # {path: mtime}
+    indexed_splitter = manifest.pop(SPLITTER_KEY, None)  # 키가 없는 manifest = 기존 1000/150 문자 splitter
+    rechunk_all = indexed_splitter != SPLITTER_ID
 
-    to_add_or_update = [p for p, mt in current.items() if manifest.get(p) != mt]
+    to_add_or_update = [p for p, mt in current.items() if rechunk_all or manifest.get(p) != mt]
     to_delete = [p for p in manifest.keys() if p not in current]
 
+    if rechunk_all and manifest:
+        print(f"✂️  Splitter changed ({indexed_splitter or 'legacy'} → {SPLITTER_ID}): re-chunking all notebooks")
     print("🗂️  Found notebooks:", len(current))
     print("✅ Unchanged:", len(current) - len(to_add_or_update))
     print("✳️  To (re)index:", len(to_add_or_update))
     print("🗑️  To delete:", len(to_delete))
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    chroma = _ensure_chroma(embeddings)
+    symbol_sources = _symbol_source_paths()
+    sym_update, sym_delete = symbol_index.changed_files(symbol_index.load_raw(base_dir), symbol_sources)
+    print("🔎 Symbol index (re)extract:", len(sym_update), "/ delete:", len(sym_delete))
+
+    if base_dir is not None and not (to_add_or_update or to_delete or sym_update or sym_delete):
+        print("\n✅ Index is up to date. Nothing to publish.")
+        print(f"   Current version: {base_dir}")
+        return
+
+    # 읽기 중인 버전은 건드리지 않고, 복사본(새 버전)에만 증분 반영
+    version_dir = new_version_dir(base=base_dir)
+    print(f"📦 Building new index version: {version_dir}")
+
+    embeddings = provider_embeddings("text-embedding-3-small")
+    chroma = _ensure_chroma(embeddings, version_dir)
 
     # 2) delete removed/changed files from index
     if to_delete:
@@ -107,8 +153,7 @@ def main():
             chroma.delete(where={"source": p})
 
         # 3) load + split
-        docs = _load_ipynb_docs(to_add_or_update)
-        chunks = _split_docs(docs)
+        chunks = _load_ipynb_chunks(to_add_or_update)
 
         # 4) batch add
         total = len(chunks)
@@ -125,13 +170,33 @@ def main():
     # 6) drop deleted files from manifest and save
     for p in to_delete:
         manifest.pop(p, None)
-    _save_manifest(manifest)
+    manifest[SPLITTER_KEY] = SPLITTER_ID
+    _save_manifest(version_dir, manifest)
+
+    # 6-1) AST symbol index (code_usage_search 용, 임베딩 없음)
+    raw = symbol_index.update_raw(symbol_index.load_raw(version_dir), symbol_sources, sym_update, sym_delete)
+    symbol_index.save_raw(version_dir, raw)
+    n_records = sum(len(f["records"]) for f in raw["files"].values())
+    print(f"🔎 Symbol index: {len(raw['files'])} files, {n_records} usages")
 
     # 7) materialize/sync to disk
     chroma.get()
+
+    # 7-1) optional quantized sidecar (RAG_VECTOR_DTYPE=float16|int8)
+    qdir = build_sidecar(chroma, version_dir)
+    if qdir is not None:
+        print(f"🧮 Quantized vectors ({VECTOR_DTYPE}) written to {qdir}")
+
+    # 8) publish: CURRENT 포인터 교체 → 실행 중인 rag_search 가 다음 호출부터 새 버전 사용
+    publish_version(version_dir)
+    removed = gc_versions()
+
     print("\n✅ Incremental index build complete.")
     print(f"   Indexed folders: data/  uploads/")
-    print(f"   Persisted at   : {INDEX_DIR}")
+    print(f"   Published      : {version_dir}")
+    print(f"   Pointer        : {INDEX_DIR / 'CURRENT'}")
+    if removed:
+        print(f"   GC'd versions  : {', '.join(p.name for p in removed)}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,126 @@
+# new_src/summary_memory.py
+"""
+대화 요약(memory_summary)을 응답 경로 밖에서 만드는 세션 메모리
+
+기존에는 그래프의 summarize_old_messages 노드가 chatbot 앞에서 llm_summarizer 를 호출해
+히스토리가 6턴 창을 넘는 턴마다 사용자가 요약 LLM 왕복을 기다렸습니다.
+이제는 턴 응답을 돌려준 뒤 백그라운드에서 요약하고, 다음 턴은 준비된 요약만 가져다 씁니다.
+
+- 토큰 예산 창(history_window) 밖으로 밀려난 메시지가 있으면 요약 (overflow)
+- 창에 가까워지면 다음 턴에 밀려날 메시지를 미리 요약 (speculative, SUMMARY_LOOKAHEAD_TOKENS)
+- 요약이 아직 안 끝났으면 다음 턴은 기다리지 않고 이전 요약으로 진행
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from . import metrics
+from .history_window import HISTORY_TOKEN_BUDGET, window_start
+
+# 다음 턴에 추가될 토큰 예측 (예산에서 이만큼 뺀 창 밖은 미리 요약)
+SUMMARY_LOOKAHEAD_TOKENS = int(os.getenv("SUMMARY_LOOKAHEAD_TOKENS", "1000"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+_TOOL_RESULT_CHARS = 300  # 요약 입력에서 도구 결과는 앞부분만
+
+_SUMMARY_SYS = (
+    "너는 회의록 비서다. [이전 요약]과 아래 대화를 합쳐 핵심을 **한국어 4~5줄**로 요약하라.\n"
+    "- 주제/결론/결정/중요한 코드/버전/URL만 유지\n"
+    "- 중복/군더더기 제거, 불확실하면 명시\n"
+)
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    """
+    요약 입력을 평문 대화록으로 변환.
+    (구간이 tool_call/ToolMessage 쌍 중간에서 잘려도 API 오류가 나지 않도록 메시지 객체를 그대로 넘기지 않음)
+    """
+    lines = []
+    for m in messages:
+        if isinstance(m, HumanMessage):
+            lines.append(f"사용자: {m.content}")
+        elif isinstance(m, AIMessage):
+            if m.content:
+                lines.append(f"AI: {m.content}")
+            for call in m.tool_calls or []:
+                lines.append(f"AI → 도구 호출 {call.get('name')}({call.get('args')})")
+        elif isinstance(m, ToolMessage):
+            content = str(m.content)
+            if len(content) > _TOOL_RESULT_CHARS:
+                content = content[:_TOOL_RESULT_CHARS] + " …"
+            lines.append(f"[도구 {m.name} 결과] {content}")
+    return "\n".join(lines)
+
+
+class SummaryMemory:
+    """세션 하나의 누적 요약. summary 는 messages[:upto] 를 요약한 것."""
+
+    def __init__(self, summarizer=None, budget: int = HISTORY_TOKEN_BUDGET,
+                 lookahead_tokens: int = SUMMARY_LOOKAHEAD_TOKENS):
+        self._summarizer = summarizer  # None 이면 llm.llm_summarizer (지연 import)
+        self.budget = budget  # chatbot 의 모델 입력 창과 같은 예산
+        self.lookahead_tokens = lookahead_tokens
+        self.summary = ""
+        self.upto = 0
+        self._future: Optional[Future] = None
+        self._generation = 0  # reset() 마다 증가 → 이전 대화의 늦게 끝난 요약은 버림
+        self._lock = threading.Lock()
+
+    @property
+    def summarizer(self):
+        if self._summarizer is None:
+            from .llm import llm_summarizer
+            self._summarizer = llm_summarizer
+        return self._summarizer
+
+    def current(self) -> Tuple[str, int]:
+        """다음 턴에 쓸 (요약, 요약된 메시지 수) — 진행 중인 요약은 기다리지 않음."""
+        with self._lock:
+            return self.summary, self.upto
+
+    def reset(self) -> None:
+        with self._lock:
+            self.summary, self.upto = "", 0
+            self._generation += 1
+
+    def schedule(self, messages: List[BaseMessage]) -> Optional[Future]:
+        """
+        턴이 끝난 뒤 호출. 창 밖(또는 다음 턴에 창 밖이 될) 구간이 아직 요약되지 않았으면
+        백그라운드 요약을 시작합니다. 이미 진행 중이면 건너뜀 (다음 턴에 다시 판단).
+        """
+        msgs = list(messages)
+        overflow = window_start(msgs, self.budget)
+        cutoff = window_start(msgs, max(0, self.budget - self.lookahead_tokens))
+        with self._lock:
+            if cutoff <= self.upto or (self._future is not None and not self._future.done()):
+                return None
+            start, prev = self.upto, self.summary
+            mode = "overflow" if overflow > self.upto else "speculative"
+            self._future = _executor.submit(self._summarize, msgs[start:cutoff], prev, cutoff, mode,
+                                            self._generation)
+            return self._future
+
+    def _summarize(self, segment: List[BaseMessage], prev: str, cutoff: int, mode: str, generation: int) -> None:
+        started = time.perf_counter()
+        try:
+            prompt = [SystemMessage(content=_SUMMARY_SYS)]
+            if prev:
+                prompt.append(SystemMessage(content=f"[이전 요약]\n{prev}"))
+            prompt.append(HumanMessage(content=_transcript(segment)))
+            summary = self.summarizer.invoke(prompt).content.strip()
+        except Exception as e:
+            metrics.inc("summary_runs_total", mode=mode, result="error")
+            print(f"[summary] failed: {e}")
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.summary, self.upto = summary, cutoff
+        metrics.inc("summary_runs_total", mode=mode, result="ok")
+        metrics.observe("summary_seconds", time.perf_counter() - started)
+        print(f"[summary] {mode}: merged {len(segment)} msgs (upto={cutoff})")
@@ -0,0 +1,250 @@
+# new_src/symbol_index.py
+"""
+AST 기반 심볼 사용 인덱스 (임베딩/벡터 검색 없음)
+
+노트북/업로드 .py 의 import 별칭을 해석해서 호출 함수와 속성 체인을 풀네임으로 기록합니다.
+    import pandas as pd; pd.concat(...)          → pandas.concat
+    from seaborn import histplot; histplot(...)  → seaborn.histplot
+
+rag_build 가 인덱스 버전 디렉토리에 symbols.json 으로 저장하고,
+code_usage_search 도구가 dict 조회만으로 "어디서 X 를 썼는지" 에 답합니다.
+"""
+import ast
+import bisect
+import json
+import os
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .notebook_splitter import mask_magics
+
+SYMBOLS_NAME = "symbols.json"
+
+# 코퍼스에서 본 별칭이 없을 때 쓰는 관용 별칭
+COMMON_ALIASES = {
+    "pd": "pandas",
+    "np": "numpy",
+    "plt": "matplotlib.pyplot",
+    "sns": "seaborn",
+    "tf": "tensorflow",
+    "nn": "torch.nn",
+    "F": "torch.nn.functional",
+    "st": "streamlit",
+    "gr": "gradio",
+}
+
+_MAX_CODE_LEN = 200
+
+Record = Dict[str, object]
+
+
+# -------------------------------
+# Extraction
+# -------------------------------
+class _UsageVisitor(ast.NodeVisitor):
+    """import 별칭을 따라가며 호출/속성 체인을 기록합니다. 별칭 맵은 셀 간에 공유됩니다."""
+
+    def __init__(self, aliases: Dict[str, str], lines: List[str], source: str, cell: int):
+        self.aliases = aliases
+        self.lines = lines
+        self.source = source
+        self.cell = cell
+        self.records: List[Record] = []
+
+    def _add(self, symbol: str, node: ast.AST, kind: str):
+        lineno = getattr(node, "lineno", 0)
+        code = self.lines[lineno - 1].strip() if 0 < lineno <= len(self.lines) else ""
+        self.records.append({
+            "symbol": symbol, "kind": kind, "source": self.source,
+            "cell": self.cell, "line": lineno, "code": code[:_MAX_CODE_LEN],
+        })
+
+    def visit_Import(self, node: ast.Import):
+        for a in node.names:
+            # import a.b → 로컬 이름은 a, import a.b as c → c 가 a.b
+            local = a.asname or a.name.split(".")[0]
+            self.aliases[local] = a.name if a.asname else local
+            self._add(a.name, node, "import")
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.level or not node.module:
+            return  # 상대 import 는 외부 라이브러리가 아님
+        for a in node.names:
+            if a.name == "*":
+                continue
+            full = f"{node.module}.{a.name}"
+            self.aliases[a.asname or a.name] = full
+            self._add(full, node, "import")
+
+    def _resolve(self, node: ast.AST) -> Optional[str]:
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name) or node.id not in self.aliases:
+            return None
+        return ".".join([self.aliases[node.id]] + parts[::-1])
+
+    def visit_Call(self, node: ast.Call):
+        symbol = self._resolve(node.func)
+        if symbol:
+            self._add(symbol, node, "call")
+            # func 쪽 체인은 이미 기록했으므로 체인 안의 Call 만 방문
+            inner = node.func
+            while isinstance(inner, ast.Attribute):
+                inner = inner.value
+            self.visit(inner)
+        else:
+            self.visit(node.func)
+        for arg in node.args:
+            self.visit(arg)
+        for kw in node.keywords:
+            self.visit(kw.value)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        symbol = self._resolve(node)
+        if symbol:
+            self._add(symbol, node, "attr")  # e.g. np.nan, torch.float32
+        else:
+            self.generic_visit(node)
+
+
+def extract_cells(cells: List[Dict], source: str) -> Tuple[List[Record], Dict[str, str]]:
+    """nbformat 셀 목록 → (사용 레코드, 최종 별칭 맵)."""
+    aliases: Dict[str, str] = {}
+    records: List[Record] = []
+    for idx, cell in enumerate(cells):
+        if cell.get("cell_type") != "code":
+            continue
+        src = str(cell.get("source") or "")
+        try:
+            tree = ast.parse(mask_magics(src))
+        except SyntaxError:
+            continue
+        v = _UsageVisitor(aliases, src.split("\n"), source, idx)
+        v.visit(tree)
+        records.extend(v.records)
+    return records, aliases
+
+def extract_file(path: str) -> Tuple[List[Record], Dict[str, str]]:
+    if path.lower().endswith(".ipynb"):
+        import nbformat
+        cells = nbformat.read(path, as_version=4).cells
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            cells = [{"cell_type": "code", "source": f.read()}]
+    return extract_cells(cells, path)
+
+
+# -------------------------------
+# Persistence (incremental, per-file mtime)
+# -------------------------------
+def load_raw(index_dir: Optional[Path]) -> Dict:
+    if index_dir is None or not (index_dir / SYMBOLS_NAME).exists():
+        return {"files": {}}
+    try:
+        with open(index_dir / SYMBOLS_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {"files": {}}
+
+def changed_files(raw: Dict, current: Dict[str, float]) -> Tuple[List[str], List[str]]:
+    """(재추출 대상, 삭제 대상) — current 는 {path: mtime}."""
+    files = raw.get("files", {})
+    to_update = [p for p, mt in current.items() if files.get(p, {}).get("mtime") != mt]
+    to_delete = [p for p in files if p not in current]
+    return to_update, to_delete
+
+def update_raw(raw: Dict, current: Dict[str, float], to_update: List[str], to_delete: List[str]) -> Dict:
+    files = dict(raw.get("files", {}))
+    for p in to_delete:
+        files.pop(p, None)
+    for p in to_update:
+        try:
+            records, aliases = extract_file(p)
+        except Exception as e:
+            print(f"  ⚠️  symbol extraction failed for {p}: {e}")
+            records, aliases = [], {}
+        files[p] = {"mtime": current[p], "aliases": aliases, "records": records}
+    return {"files": files}
+
+def save_raw(index_dir: Path, raw: Dict) -> None:
+    with open(index_dir / SYMBOLS_NAME, "w", encoding="utf-8") as f:
+        json.dump(raw, f, ensure_ascii=False)
+
+
+# -------------------------------
+# Lookup
+# -------------------------------
+class SymbolIndex:
+    """symbols.json 을 메모리 dict 로 펼쳐 exact / prefix / suffix 조회를 제공합니다."""
+
+    def __init__(self, raw: Dict):
+        self.by_symbol: Dict[str, List[Record]] = defaultdict(list)
+        alias_votes: Dict[str, Counter] = defaultdict(Counter)
+        for entry in raw.get("files", {}).values():
+            for r in entry.get("records", []):
+                self.by_symbol[r["symbol"]].append(r)
+            for local, full in entry.get("aliases", {}).items():
+                alias_votes[local][full] += 1
+
+        # 별칭: 코퍼스 최빈값 우선, 없으면 관용 별칭
+        self.aliases = dict(COMMON_ALIASES)
+        self.aliases.update({k: c.most_common(1)[0][0] for k, c in alias_votes.items()})
+
+        # 끝부분 일치용 (e.g. "concat" → pandas.concat, "pyplot.hist" → matplotlib.pyplot.hist)
+        self.by_suffix: Dict[str, List[str]] = defaultdict(list)
+        for sym in self.by_symbol:
+            parts = sym.split(".")
+            for i in range(1, len(parts)):
+                self.by_suffix[".".join(parts[i:])].append(sym)
+        self.sorted_symbols = sorted(self.by_symbol)
+
+    def normalize(self, query: str) -> str:
+        q = query.strip().strip("`").strip()
+        if q.endswith("()"):
+            q = q[:-2]
+        head, _, rest = q.partition(".")
+        if head in self.aliases:
+            q = self.aliases[head] + ("." + rest if rest else "")
+        return q
+
+    def match_symbols(self, query: str) -> List[str]:
+        q = self.normalize(query)
+        exact = [q] if q in self.by_symbol else []
+        # 모듈/클래스 접두사 (e.g. "pandas" → pandas.concat, pandas.merge, ...)
+        prefix = q + "."
+        i = bisect.bisect_left(self.sorted_symbols, prefix)
+        children = []
+        while i < len(self.sorted_symbols) and self.sorted_symbols[i].startswith(prefix):
+            children.append(self.sorted_symbols[i])
+            i += 1
+        suffix = self.by_suffix.get(q, [])
+        seen, out = set(), []
+        for s in exact + suffix + children:
+            if s not in seen:
+                seen.add(s)
+                out.append(s)
+        return out
+
+    def search(self, query: str, k: int = 10) -> List[Record]:
+        hits: List[Record] = []
+        for sym in self.match_symbols(query):
+            # import 줄보다 실제 사용(call/attr)을 먼저 보여줌
+            hits.extend(sorted(self.by_symbol[sym], key=lambda r: r["kind"] == "import"))
+            if len(hits) >= k:
+                break
+        return hits[:k]
+
+
+_index_cache: Dict[str, SymbolIndex] = {}  # {index_dir: SymbolIndex}
+
+def get_symbol_index(index_dir: Path) -> SymbolIndex:
+    key = os.fspath(index_dir)
+    idx = _index_cache.get(key)
+    if idx is None:
+        idx = SymbolIndex(load_raw(index_dir))
+        _index_cache.clear()  # 포인터가 바뀌면 이전 버전은 버림
+        _index_cache[key] = idx
+    return idx
@@ -0,0 +1,162 @@
+# new_src/tool_result_store.py
+"""
+도구 결과(ToolMessage) out-of-line 저장소
+
+Tavily JSON 전문 / rag_search 스니펫 블록이 AgentFlowManager.messages 에 ToolMessage 로 그대로 남아
+세션 메모리를 차지하고, 창 밖으로 밀려날 때까지 다음 턴마다 모델 입력으로 다시 전송되었습니다.
+
+- 턴이 끝나면 COMPACT_MIN_CHARS 보다 긴 도구 결과를 세션 디렉터리(TOOL_RESULT_DIR/<session>/<sha>.txt)로 옮기고
+  히스토리에는 짧은 참조 + 요약(제목/URL, 출처 경로)만 남김
+- 결과를 만든 턴 안에서는 전문을 그대로 사용 (compact 는 graph.invoke 이후에만 호출)
+- 같은 내용은 한 번만 저장 (content-addressed), 세션 종료 시 디렉터리 삭제
+
+메트릭: tool_results_compacted_total{tool}, tool_result_bytes_saved, tool_result_tokens_saved
+
+    uv run python -m src.tool_result_store   # 전/후 세션 메모리와 다음 턴 프롬프트 크기 비교
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from . import metrics
+from .history_window import message_tokens
+
+TOOL_RESULT_DIR = Path(os.getenv("TOOL_RESULT_DIR", "data/tool_results"))
+COMPACT_MIN_CHARS = int(os.getenv("COMPACT_MIN_CHARS", "600"))
+_SUMMARY_ITEMS = 5
+_REF_KEY = "tool_result_ref"
+
+
+def summarize_tool_result(name: str, content: str) -> str:
+    """히스토리에 남길 짧은 요약: 검색 결과 제목/URL, 로컬 예제 출처, 그 외는 앞부분."""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        items = [f"- {r.get('title', '')} ({r.get('url', '')})" for r in data["results"][:_SUMMARY_ITEMS]
+                 if isinstance(r, dict)]
+        return "\n".join(items)
+    sources = re.findall(r"\[◆ [^\]]+\] (.+)", content)
+    if sources:
+        return "\n".join(f"- {s.strip()}" for s in sources[:_SUMMARY_ITEMS])
+    return content[:200].replace("\n", " ") + " …"
+
+
+class ToolResultStore:
+    def __init__(self, session_id: str, root: Path = TOOL_RESULT_DIR,
+                 min_chars: int = COMPACT_MIN_CHARS):
+        self.root = Path(root).resolve()
+        self.dir = (self.root / session_id).resolve()
+        if not self._owns(self.dir):
+            raise ValueError(f"Invalid session_id for tool result store: {session_id!r}")
+        self.min_chars = min_chars
+        self.n_results = 0
+        self.bytes = 0  # 디스크로 옮긴 전문 크기 합계
+        self._lock = threading.Lock()
+
+    def put(self, content: str) -> str:
+        ref = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        path = self.dir / f"{ref}.txt"
+        with self._lock:
+            if not path.exists():
+                self.dir.mkdir(parents=True, exist_ok=True)
+                path.write_text(content, encoding="utf-8")
+                self.n_results += 1
+                self.bytes += len(content.encode("utf-8"))
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """참조의 전문 (세션이 정리되었으면 None)."""
+        path = self.dir / f"{ref}.txt"
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        긴 ToolMessage 를 참조 메시지로 바꾼 새 목록을 반환 (원본 메시지 객체는 수정하지 않음).
+        tool_call_id / name / id 는 유지 → AIMessage(tool_calls) 와의 짝과 히스토리 창 블록이 그대로.
+        """
+        out: List[BaseMessage] = []
+        for m in messages:
+            content = m.content if isinstance(m, ToolMessage) else None
+            if (not isinstance(content, str) or len(content) < self.min_chars
+                    or _REF_KEY in m.additional_kwargs):
+                out.append(m)
+                continue
+            ref = self.put(content)
+            compact = ToolMessage(
+                content=(f"[{m.name} 결과 {len(content)}자 → 세션 저장소 ref:{ref}, 이전 턴 결과 요약]\n"
+                         + summarize_tool_result(m.name, content)),
+                tool_call_id=m.tool_call_id, name=m.name, id=m.id, status=m.status,
+                additional_kwargs={_REF_KEY: ref},
+            )
+            metrics.inc("tool_results_compacted_total", tool=m.name or "unknown")
+            metrics.observe("tool_result_bytes_saved",
+                            len(content.encode("utf-8")) - len(compact.content.encode("utf-8")))
+            metrics.observe("tool_result_tokens_saved", message_tokens(m) - message_tokens(compact))
+            out.append(compact)
+        return out
+
+    def _owns(self, path: Path) -> bool:
+        """root 바로 아래의 세션 디렉터리인지 ('..' / 절대 경로 / 심볼릭 링크로 밖을 가리키면 False)."""
+        return path.parent == self.root and path != self.root
+
+    def clear(self) -> None:
+        with self._lock:
+            if not self._owns(self.dir.resolve()):
+                print(f"[tool_result_store] refusing to remove {self.dir} (outside {self.root})")
+                return
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.n_results, self.bytes = 0, 0
+
+
+# 전/후 비교: 5턴 대화(턴마다 Tavily 검색 + rag_search)의 세션 히스토리 크기와 6번째 턴 모델 입력 토큰
+#   uv run python -m src.tool_result_store
+def bench(turns: int = 5) -> None:
+    import tempfile
+    from langchain_core.messages import AIMessage, HumanMessage
+    from .history_window import window_by_tokens, HISTORY_TOKEN_BUDGET
+
+    def turn(i: int) -> List[BaseMessage]:
+        tavily = json.dumps({"query": f"q{i}", "results": [
+            {"title": f"pandas doc {i}.{j}", "url": f"https://pandas.pydata.org/docs/{i}/{j}",
+             "content": "DataFrame.merge 설명 " * 120} for j in range(5)
+        ]}, ensure_ascii=False)
+        rag = "\n".join(f"{j}. {'df.merge(left, right, on=key) ' * 15}\n   [◆ 로컬 예제] notebooks/nb{i}_{j}.ipynb"
+                        for j in range(1, 5))
+        calls = [{"name": "tavily_search", "args": {"query": f"q{i}"}, "id": f"t{i}"},
+                 {"name": "rag_search", "args": {"query": f"q{i}"}, "id": f"r{i}"}]
+        return [HumanMessage(f"질문 {i}"), AIMessage("", tool_calls=calls),
+                ToolMessage(tavily, tool_call_id=f"t{i}", name="tavily_search"),
+                ToolMessage(rag, tool_call_id=f"r{i}", name="rag_search"),
+                AIMessage(f"답변 {i} " * 80)]
+
+    def size(msgs: List[BaseMessage]) -> int:
+        return sum(len(str(m.content).encode("utf-8")) for m in msgs)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ToolResultStore("bench", root=Path(root))
+        full: List[BaseMessage] = []
+        compacted: List[BaseMessage] = []
+        for i in range(turns):
+            msgs = turn(i)
+            full += msgs
+            compacted = store.compact(compacted + msgs)
+        nxt = [HumanMessage("다음 질문")]
+        for label, history in (("full", full), ("compacted", compacted)):
+            model_input, _ = window_by_tokens(history + nxt, HISTORY_TOKEN_BUDGET)
+            tokens = sum(message_tokens(m) for m in model_input)
+            print(f"{label:<10} history {size(history) / 1024:>7.1f} KB   "
+                  f"next-turn prompt {tokens:>6} tokens ({len(model_input)} msgs)")
+        print(f"store      {store.n_results} results, {store.bytes / 1024:.1f} KB on disk")
+
+
+if __name__ == "__main__":
+    bench()
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -7,15 +8,15 @@ from dotenv import load_dotenv, find_dotenv
 # ─────────────────────────────────────────────
 # 🔹 LangChain / External dependencies
 # ─────────────────────────────────────────────
-from langchain_tavily import TavilySearch
 from langchain_core.tools import StructuredTool
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-
-from slack_sdk.web import WebClient
 from slack_sdk.errors import SlackApiError
 
 from src.util.util import get_save_text_output_dir 
+from src.index_store import current_index_dir
+from src.symbol_index import get_symbol_index
+from src.libraries import DEFAULT_DOCS, infer_libraries, library_filter
+from src.vector_quant import get_quantized_index
+from src.providers import embeddings, require_keys, save_text_func, search_tool
 
 # ─────────────────────────────────────────────
 # 1. Environment setup
@@ -26,35 +27,28 @@ TAVILY_KEY = os.getenv("TAVILY_API_KEY")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 
-assert TAVILY_KEY, "Missing TAVILY_API_KEY in environment (.env not loaded or key not set)."
-assert OPENAI_KEY, "Missing OPENAI_API_KEY in environment (.env not loaded or key not set)."
+# 외부 클라이언트(Tavily / Slack / Chroma)는 처음 사용할 때 생성 → import 는 가볍게 (Streamlit, uvicorn reload)
+# tools.tavilysearch / tools.tools / tools.slack_client 는 아래 __getattr__ 로 접근자를 거칩니다.
 
-slack_client = WebClient(token=SLACK_BOT_TOKEN) if SLACK_BOT_TOKEN else None
+@lru_cache(maxsize=None)
+def get_slack_client():
+    if not SLACK_BOT_TOKEN:
+        return None
+    from slack_sdk.web import WebClient
+    return WebClient(token=SLACK_BOT_TOKEN)
 
 # ─────────────────────────────────────────────
 # 2. TavilySearch configuration
 # ─────────────────────────────────────────────
-DEFAULT_DOCS = {
-    "python": "https://docs.python.org/3/",
-    "git": "https://git-scm.com/docs",
-    "LangChain": "https://python.langchain.com/docs",
-    "Matplotlib": "https://matplotlib.org/stable/api/index.html",
-    "NumPy": "https://numpy.org/doc/stable/",
-    "pandas": "https://pandas.pydata.org/docs/",
-    "PyTorch": "https://docs.pytorch.org/docs/stable/index.html",
-    "Hugging Face": "https://huggingface.co/docs",
-    "FastAPI": "https://fastapi.tiangolo.com/reference/",
-    "BeautifulSoup": "https://www.crummy.com/software/BeautifulSoup/bs4/doc/",
-    "streamlit": "https://docs.streamlit.io/",
-    "gradio": "https://www.gradio.app/docs",
-    "scikit-learn": "https://scikit-learn.org/stable/api/index.html",
-    "Pydantic": "https://docs.pydantic.dev/latest/api/base_model/",
-}
-
-tavilysearch = TavilySearch(
-    max_results=3,
-    include_domains=list(DEFAULT_DOCS.values()),
-)
+# 지원 문서 목록은 src/libraries.py 에서 관리 (rag_build 의 라이브러리 태그와 공유)
+
+@lru_cache(maxsize=None)
+def get_tavilysearch():
+    require_keys("TAVILY_API_KEY", "OPENAI_API_KEY")  # AGENT_OFFLINE=1 이면 생략
+    return search_tool(
+        max_results=3,
+        include_domains=list(DEFAULT_DOCS.values()),
+    )
 
 # ─────────────────────────────────────────────
 # 3. Save-to-text tool
@@ -95,30 +89,54 @@ save_text_tool = StructuredTool.from_function(
         "Save the given final response text into a timestamped .txt file in the current directory. "
         "Call this at most ONCE per user request. If you already saved, do not call again."
     ),
-    func=save_text_to_file,
+    func=save_text_func(save_text_to_file),  # AGENT_OFFLINE=1 이면 파일을 쓰지 않음
     args_schema=SaveArgs,
 )
 
 # ─────────────────────────────────────────────
 # 4. RAG (Chroma) search tool
 # ─────────────────────────────────────────────
-INDEX_PATH = "data/index"
+# rag_build 가 CURRENT 포인터로 공개한 버전을 읽습니다 (빌드 중인 버전은 보이지 않음).
+_chroma_cache: dict = {}  # {index_dir: Chroma}
 
-def _load_chroma():
-    emb = OpenAIEmbeddings(model="text-embedding-3-small")
-    return Chroma(
-        embedding_function=emb,
-        persist_directory=INDEX_PATH,
-        collection_name="notebooks",
-    )
+def _load_chroma(index_dir: str):
+    db = _chroma_cache.get(index_dir)
+    if db is None:
+        from langchain_chroma import Chroma
+        emb = embeddings("text-embedding-3-small")
+        db = Chroma(
+            embedding_function=emb,
+            persist_directory=index_dir,
+            collection_name="notebooks",
+        )
+        # 포인터가 바뀌면 이전 버전 핸들은 버리고 새 버전만 유지
+        _chroma_cache.clear()
+        _chroma_cache[index_dir] = db
+    return db
 
 def rag_search(query: str, k: int = 4) -> str:
     """Search local .ipynb notebooks and return relevant snippets with sources."""
-    if not os.path.isdir(INDEX_PATH):
+    index_dir = current_index_dir()
+    if index_dir is None:
         return "RAG index not found. Please build it first (python -m src.rag_build)."
 
-    db = _load_chroma()
-    docs = db.similarity_search(query, k=k)
+    db = _load_chroma(str(index_dir))
+
+    # 질문에서 라이브러리를 추론할 수 있으면 해당 태그가 붙은 chunk 로 후보를 좁힘
+    libraries = infer_libraries(query)
+    query_vec = db.embeddings.embed_query(query)  # 필터/보충 검색에서 재사용 (임베딩 1회)
+    quant = get_quantized_index(index_dir)
+    if quant is not None:
+        # 양자화 사이드카로 후보 선정 → float32 재점수 (RAG_VECTOR_DTYPE)
+        search = lambda n, libs: quant.search(db, query_vec, k=n, libraries=libs)
+    else:
+        search = lambda n, libs: db.similarity_search_by_vector(query_vec, k=n, filter=library_filter(libs) or None)
+
+    docs = search(k, libraries) if libraries else []
+    if len(docs) < k:
+        # 태그가 없는 (이전 버전) 인덱스거나 결과가 모자라면 전체 검색으로 보충
+        seen = {d.page_content for d in docs}
+        docs += [d for d in search(k, []) if d.page_content not in seen][:k - len(docs)]
     if not docs:
         return "No relevant passages found in local notebooks."
 
@@ -146,13 +164,51 @@ rag_search_tool = StructuredTool.from_function(
 )
 
 # ─────────────────────────────────────────────
-# 5. Slack Notify tool
+# 5. Code usage (AST symbol index) search tool
+# ─────────────────────────────────────────────
+def code_usage_search(symbol: str, k: int = 10) -> str:
+    """Look up where a library function/attribute is used in local notebooks and uploads (no embeddings)."""
+    index_dir = current_index_dir()
+    if index_dir is None:
+        return "Symbol index not found. Please build it first (python -m src.rag_build)."
+
+    index = get_symbol_index(index_dir)
+    hits = index.search(symbol, k=k)
+    if not hits:
+        return f"No usages of '{symbol}' found in local notebooks."
+
+    lines = []
+    for i, r in enumerate(hits, 1):
+        lines.append(
+            f"{i}. [{r['symbol']}] {r['code']}\n"
+            f"   [◆ 로컬 예제] {r['source']} (cell {r['cell']}, line {r['line']})"
+        )
+    return "\n".join(lines)
+
+class CodeUsageArgs(BaseModel):
+    symbol: str = Field(description="Function/attribute to look up, e.g. 'pandas.concat', 'sns.histplot', 'concat'.")
+    k: int = Field(default=10, ge=1, le=50, description="Maximum number of usages to return.")
+
+code_usage_search_tool = StructuredTool.from_function(
+    name="code_usage_search",
+    description=(
+        "Find exact places where a library API (e.g. pandas.concat, sns.histplot) is called in local "
+        "notebooks and uploaded .py/.ipynb files, using a prebuilt AST symbol index. "
+        "Prefer this over rag_search for 'where/how did we use X' questions about a specific function."
+    ),
+    func=code_usage_search,
+    args_schema=CodeUsageArgs,
+)
+
+# ─────────────────────────────────────────────
+# 6. Slack Notify tool
 # ─────────────────────────────────────────────
 
 def _resolve_user_id(user_id: Optional[str], email: Optional[str]) -> Optional[str]:
     """우선순위: user_id → email → 환경변수 기본값"""
     if user_id and user_id.startswith("U"):
         return user_id
+    slack_client = get_slack_client()
     if email and slack_client:
         try:
             r = slack_client.users_lookupByEmail(email=email)
@@ -170,6 +226,7 @@ def _resolve_user_id(user_id: Optional[str], email: Optional[str]) -> Optional[s
     return None
 
 def _open_dm_channel(uid: str) -> Optional[str]:
+    slack_client = get_slack_client()
     if not slack_client:
         return None
     try:
@@ -194,6 +251,7 @@ def slack_notify(text: str,
     Slack 메시지 전송 (DM/채널/그룹).
     모델이 호출하는 Tool. 성공 시 channel_id/target_type/status를 반환.
     """
+    slack_client = get_slack_client()
     if not slack_client:
         return {"status": "skipped", "reason": "SLACK_BOT_TOKEN not set"}
 
@@ -243,6 +301,15 @@ slack_notify_tool = StructuredTool.from_function(
 )
 
 # ─────────────────────────────────────────────
-# 6. Export
+# 7. Export
 # ─────────────────────────────────────────────
-tools = [tavilysearch, rag_search_tool, save_text_tool, slack_notify_tool]
\ No newline at end of file
+def get_tools() -> list:
+    return [get_tavilysearch(), rag_search_tool, code_usage_search_tool, save_text_tool, slack_notify_tool]
+
+_LAZY = {"tavilysearch": get_tavilysearch, "tools": get_tools, "slack_client": get_slack_client}
+
+def __getattr__(name: str):
+    # from src.tools import tavilysearch 같은 기존 import 는 그대로 동작 (그 시점에 생성)
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,130 @@
+# new_src/turn_budget.py
+"""
+턴 단위 예산 (마감 시각 + 도구 반복 횟수)
+
+chatbot ↔ tools 루프는 LangGraph recursion limit 외에는 상한이 없어서, 검색 도구를 계속 부르는 모델이
+한 턴에 LLM 왕복을 여러 번 쓰는 동안 Streamlit 클라이언트는 60초 뒤 포기합니다.
+
+- add_user_message 가 state["deadline"](epoch 초) / state["max_tool_iterations"] 를 채움 (호출자가 미리 넣으면 그 값 사용)
+- 모든 노드는 같은 state 값을 읽어 남은 시간 안에서만 LLM/도구를 호출
+- 예산이 바닥나면 chatbot 이 도구 없이 '지금까지 결과로 최종 답변' 호출을 강제 (타임아웃 대신 답변)
+- 마감을 넘긴 도구 스레드는 버려두지만(abandon) 전용 한도 안에서만: 버려진 작업이 TOOL_ABANDONED_MAX 개면
+  새 작업은 실행하지 않고 바로 시간 초과로 처리 → 살아 있는 요청용 TOOL_WORKERS 개 스레드는 항상 남음
+- 부수효과가 있는 도구(save_text / slack_notify)는 abandon=False 로 끝까지 기다림 (보고는 실패인데 실제로는 전송되는 일 방지)
+- 메트릭: agent_budget_exhausted_total{reason=iterations|deadline}, agent_tool_iterations,
+  agent_tool_abandoned_total, agent_tool_rejected_total, agent_tool_abandoned_inflight
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, List, Optional, TypeVar
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from . import metrics
+
+AGENT_DEADLINE_S = float(os.getenv("AGENT_DEADLINE_S", "50"))  # 클라이언트 타임아웃(60초)보다 짧게
+MAX_TOOL_ITERATIONS = int(os.getenv("MAX_TOOL_ITERATIONS", "4"))
+# 마감 직전에는 도구 루프를 멈추고 최종 답변 호출에 쓸 시간을 남김
+FINAL_ANSWER_RESERVE_S = float(os.getenv("FINAL_ANSWER_RESERVE_S", "10"))
+
+FINAL_ANSWER_HINT = (
+    "(이번 요청의 검색/도구 예산을 모두 사용했습니다. 더 이상 도구를 호출하지 말고, "
+    "지금까지의 대화와 도구 결과만으로 최종 답변을 작성하세요. 부족한 부분은 부족하다고 밝히세요.)"
+)
+
+T = TypeVar("T")
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+# 마감 후에도 계속 도는(버려진) 도구 스레드 상한 — 풀은 이만큼 더 크게 잡아 살아 있는 작업 몫을 침범하지 않음
+TOOL_ABANDONED_MAX = int(os.getenv("TOOL_ABANDONED_MAX", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS + TOOL_ABANDONED_MAX, thread_name_prefix="tool")
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def start(state: dict) -> dict:
+    """턴 시작 시 예산 기본값 채우기."""
+    state.setdefault("deadline", time.time() + AGENT_DEADLINE_S)
+    state.setdefault("max_tool_iterations", MAX_TOOL_ITERATIONS)
+    return state
+
+def remaining(state: dict) -> Optional[float]:
+    """마감까지 남은 초 (마감이 없으면 None)."""
+    deadline = state.get("deadline")
+    return None if deadline is None else deadline - time.time()
+
+def tool_iterations(msgs: List[BaseMessage]) -> int:
+    """마지막 사용자 메시지 이후 모델이 도구를 호출한 횟수 (prefetch 분기는 LLM 왕복이 아니므로 제외)."""
+    n = 0
+    for m in reversed(msgs):
+        if isinstance(m, HumanMessage):
+            break
+        if isinstance(m, AIMessage) and m.tool_calls and not all(
+            c["id"].startswith("prefetch_") for c in m.tool_calls
+        ):
+            n += 1
+    return n
+
+def exhausted(state: dict, msgs: List[BaseMessage]) -> Optional[str]:
+    """예산이 바닥났으면 이유("iterations" | "deadline"), 아니면 None."""
+    limit = state.get("max_tool_iterations")
+    if limit is not None and tool_iterations(msgs) >= limit:
+        return "iterations"
+    left = remaining(state)
+    if left is not None and left <= FINAL_ANSWER_RESERVE_S:
+        return "deadline"
+    return None
+
+def _release_abandoned(_future) -> None:
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+def _abandon(future) -> None:
+    """마감을 넘긴 작업: 아직 시작 전이면 취소, 이미 실행 중이면 끝날 때까지 버려진 작업으로 셈."""
+    global _abandoned
+    if future.cancel():
+        return
+    with _abandoned_lock:
+        _abandoned += 1
+    metrics.inc("agent_tool_abandoned_total")
+    future.add_done_callback(_release_abandoned)  # 이미 끝났으면 즉시 호출
+
+def abandoned_inflight() -> int:
+    with _abandoned_lock:
+        return _abandoned
+
+metrics.register_collector(lambda: {"agent_tool_abandoned_inflight": abandoned_inflight()})
+
+
+def call_with_deadline(fn: Callable[[], T], state: dict, on_timeout: Callable[[], T],
+                       reserve: float = 0.0, abandon: bool = True) -> T:
+    """
+    (마감 - reserve) 안에 fn() 을 실행. 넘기면 기다리지 않고 on_timeout() 결과를 반환합니다.
+    (늦게 끝난 작업의 결과는 버림)
+
+    abandon=False: 부수효과가 있는 작업 — 마감 전에 시작했으면 현재 스레드에서 끝까지 실행 (시작 전이면 on_timeout)
+    """
+    left = remaining(state)
+    if left is None:
+        return fn()
+    left -= reserve
+    if left <= 0:
+        return on_timeout()
+    if not abandon:
+        return fn()
+    if abandoned_inflight() >= TOOL_ABANDONED_MAX:
+        # 버려진 작업이 한도만큼 남아 있으면 새 작업도 제때 끝나기 어렵다고 보고 바로 거절
+        metrics.inc("agent_tool_rejected_total")
+        return on_timeout()
+    # 작업 스레드에서도 LangGraph/콜백 context 가 유지되도록 현재 context 복사
+    future = _executor.submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout=left)
+    except FutureTimeout:
+        _abandon(future)
+        return on_timeout()
@@ -1,39 +1,240 @@
 # new_src/upload_helpers.py
 import os
-from typing import List
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+import uuid
+import hashlib
+import threading
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
+from langchain_core.documents import Document
 
-def extract_text_from_py(path: str) -> str:
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma  # chromadb import 가 무거워 첫 업로드 때 불러옴
+
+from .notebook_splitter import (
+    iter_cell_units, iter_page_units, iter_pack_units, UPLOAD_CHUNK_TOKENS,
+)
+from . import embedding_cache
+from .providers import embeddings
+
+SUPPORTED_EXTENSIONS = (".py", ".ipynb", ".pdf")
+PY_BLOCK_CHARS = 16_000  # .py 는 이 크기를 넘으면 다음 최상위 문장 경계에서 끊어 읽음
+
+# -------------------------------
+# Streaming extraction (cell / page / block 단위)
+# -------------------------------
+def iter_py_cells(path: str) -> Iterator[Dict]:
+    """.py 를 줄 단위로 읽어 최상위 문장 경계에서 끊은 블록을 코드 셀처럼 내보냅니다."""
+    buf: List[str] = []
+    size = 0
     with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+        for line in f:
+            top_level = line[:1] not in ("", " ", "\t", "\n", ")", "]", "}", "#", "@")
+            if size >= PY_BLOCK_CHARS and top_level and not line.startswith(("else", "elif", "except", "finally")):
+                yield {"cell_type": "code", "source": "".join(buf)}
+                buf, size = [], 0
+            buf.append(line)
+            size += len(line)
+    if buf:
+        yield {"cell_type": "code", "source": "".join(buf)}
 
-def extract_text_from_ipynb(path: str) -> str:
+def iter_ipynb_cells(path: str) -> Iterator[Dict]:
     import nbformat
+    # nbformat 은 JSON 전체를 파싱하므로 원본은 한 번 메모리에 올라가지만, 이후 처리는 셀 단위
     nb = nbformat.read(path, as_version=4)
-    texts: List[str] = []
-    for cell in nb.cells:
-        if cell.get("cell_type") in {"code", "markdown"}:
-            src = cell.get("source") or ""
-            texts.append(str(src))
-    return "\n\n".join(texts)
-
-def extract_text(path: str) -> str:
+    yield from nb.cells
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)  # 페이지 객체는 접근할 때 파싱됨
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+def _check_supported(path: str) -> str:
     path_lower = path.lower()
-    if path_lower.endswith(".py"):
-        return extract_text_from_py(path)
-    if path_lower.endswith(".ipynb"):
-        return extract_text_from_ipynb(path)
-    raise ValueError("Unsupported file type (only .py or .ipynb).")
-
-# Web > RAG로 사용할 문서 업로드 경로를 전달하면 retriever를 리턴
-def build_temp_retriever(path: str, k: int = 4):
-    """Build a temporary in-memory Chroma retriever from a single uploaded file."""
-    text = extract_text(path)
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
-    docs = splitter.create_documents([text], metadatas=[{"source": path}])
-
-    emb = OpenAIEmbeddings(model="text-embedding-3-small")
-    db = Chroma.from_documents(docs, embedding=emb)  # in-memory (no persist_directory)
-    return db.as_retriever(search_kwargs={"k": k})
+    if not path_lower.endswith(SUPPORTED_EXTENSIONS):
+        raise ValueError("Unsupported file type (only .py, .ipynb or .pdf).")
+    return path_lower
+
+def iter_upload_chunks(path: str, max_tokens: int = UPLOAD_CHUNK_TOKENS,
+                       content_defined: bool = False) -> Iterator[Document]:
+    """Stream chunks of an uploaded file (notebook cells / AST units / PDF pages) into the splitter."""
+    path_lower = _check_supported(path)
+    if path_lower.endswith(".pdf"):
+        units = iter_page_units(iter_pdf_pages(path), max_tokens)
+        return iter_pack_units(units, path, max_tokens, content_defined, unit_name="page")
+    cells = iter_ipynb_cells(path) if path_lower.endswith(".ipynb") else iter_py_cells(path)
+    return iter_pack_units(iter_cell_units(cells, max_tokens), path, max_tokens, content_defined)
+
+EMBED_BATCH_SIZE = 64  # 배치마다 컬렉션에 추가 → 인덱싱 도중에도 부분 결과 검색 가능
+
+def new_upload_store(emb) -> "Chroma":
+    """in-memory (no persist_directory). 세션마다 컬렉션 이름을 달리해 서로 섞이지 않게 함"""
+    from langchain_chroma import Chroma
+    return Chroma(collection_name=f"upload_{uuid.uuid4().hex}", embedding_function=emb)
+
+def _load_chunks(path: str):
+    """(cache_key, cached) — cached 는 파일 단위 캐시 적중 시 (texts, metadatas, vectors)."""
+    key = embedding_cache.cache_key(
+        embedding_cache.file_sha256(path),
+        {"splitter": "notebook_splitter", "max_tokens": UPLOAD_CHUNK_TOKENS, "content_defined": True},
+    )
+    return key, embedding_cache.load(key)
+
+
+class SessionUploadIndex:
+    """
+    세션별 업로드 retriever (in-memory Chroma 하나).
+    파일(source)별로 chunk id(내용 해시)를 기억해 두었다가, 수정된 파일이 다시 올라오면
+    바뀐 chunk 만 임베딩하고 그대로인 chunk 는 기존 벡터를 유지합니다.
+    """
+
+    def __init__(self, k: int = 4):
+        self.emb = embeddings(embedding_cache.EMBED_MODEL)
+        self.db = new_upload_store(self.emb)
+        self.retriever = self.db.as_retriever(search_kwargs={"k": k})
+        self.files: Dict[str, List[str]] = {}  # {source: [chunk ids]}
+        self.n_vectors = 0                       # 컬렉션에 들어 있는 벡터 수 (색인 중 부분 결과 포함)
+        self.dim = 0
+        self.closed = False
+        self._lock = threading.Lock()            # 같은 세션의 색인 작업은 순서대로
+        self._generations: Dict[str, int] = {}   # {source: 마지막으로 추가를 요청한 작업 번호}
+        self._gen_lock = threading.Lock()        # 색인 중에도 바로 잡히도록 _lock 과 분리
+
+    @property
+    def vector_bytes(self) -> int:
+        """메모리에 올라가 있는 float32 벡터 크기 (풀의 메모리 상한 계산용)."""
+        return self.n_vectors * self.dim * 4
+
+    def close(self) -> None:
+        """in-memory 컬렉션을 삭제합니다 (RetrieverPool 이 해제/축출 시 호출)."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.files.clear()
+            self.n_vectors = 0
+            try:
+                self.db.delete_collection()
+            except Exception as e:
+                print(f"[upload-index] delete_collection failed: {e}")
+
+    @staticmethod
+    def _ids(path: str, texts: List[str], seen: Dict[str, int]) -> List[str]:
+        # 파일마다 prefix 를 붙여 서로 다른 파일의 같은 내용 chunk 가 충돌하지 않게 함
+        prefix = hashlib.sha256(path.encode("utf-8")).hexdigest()[:8]
+        return [f"{prefix}-{cid}" for cid in embedding_cache.chunk_ids(texts, seen)]
+
+    def _add(self, ids, texts, metadatas, vectors) -> None:
+        self.db._collection.add(
+            ids=ids,
+            embeddings=[list(map(float, v)) for v in vectors],
+            documents=texts,
+            metadatas=metadatas,
+        )
+        self.n_vectors += len(ids)
+        if vectors is not None and len(vectors) and not self.dim:
+            self.dim = len(vectors[0])
+
+    def _delete(self, ids: List[str]) -> None:
+        self.db._collection.delete(ids=ids)
+        self.n_vectors -= len(ids)
+
+    def claim(self, path: str) -> int:
+        """path 에 대한 새 작업 번호 (색인 작업 생성 시). 이전 번호로 요청된 제거는 무시됩니다."""
+        with self._gen_lock:
+            gen = self._generations.get(path, 0) + 1
+            self._generations[path] = gen
+            return gen
+
+    def generation(self, path: str) -> int:
+        with self._gen_lock:
+            return self._generations.get(path, 0)
+
+    def remove_file(self, path: str, generation: Optional[int] = None) -> int:
+        """
+        path 의 chunk 를 제거합니다. generation 을 주면 그 사이 같은 path 가 다시 추가(claim)되지 않았을 때만 제거
+        — 취소된 이전 작업이 새 작업의 chunk 를 지우지 않도록.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation(path):
+                return 0
+            ids = self.files.pop(path, [])
+            if ids and not self.closed:
+                self._delete(ids)
+            return len(ids)
+
+    def index_file(self, path: str, progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, int]:
+        """
+        path 를 색인(또는 재색인)하고 {"total", "embedded", "reused", "deleted"} 를 반환합니다.
+        - 추출 → 분할 → 임베딩을 EMBED_BATCH_SIZE 단위로 스트리밍 (큰 파일도 메모리 일정)
+        - 파일 단위 캐시 적중: 임베딩 0회
+        - 재업로드: 이전 버전과 chunk id 를 비교해 새 chunk 만 임베딩
+        progress(done, total) 는 배치마다 호출됩니다 (스트리밍 중 total 은 None).
+        """
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("upload index was released")
+            key, cached = _load_chunks(path)
+            if cached is not None:
+                texts, metadatas, vectors = cached
+                total: Optional[int] = len(texts)
+                # 캐시는 다른 세션 경로로 저장되었을 수 있으므로 현재 경로로 교체
+                stream = ((t, {**m, "source": path}, v) for t, m, v in zip(texts, metadatas, vectors))
+            else:
+                total = None
+                stream = ((d.page_content, d.metadata, None) for d in iter_upload_chunks(path, content_defined=True))
+
+            old_ids = set(self.files.get(path, []))
+            seen: Dict[str, int] = {}
+            all_ids: List[str] = []  # chunk id 만 유지 (remove_file 용) — 본문/벡터는 배치 단위로만 메모리에
+            writer = embedding_cache.CacheWriter(key) if cached is None else None  # 파일 단위 캐시를 배치마다 이어 씀
+            embedded = 0
+            if progress:
+                progress(0, total)
+
+            try:
+                while True:
+                    batch = list(islice(stream, EMBED_BATCH_SIZE))
+                    if not batch:
+                        break
+                    texts = [t for t, _, _ in batch]
+                    metadatas = [m for _, m, _ in batch]
+                    ids = self._ids(path, texts, seen)
+                    new = [i for i, cid in enumerate(ids) if cid not in old_ids]
+                    vecs = []
+                    if new:
+                        if cached is not None:
+                            vecs = [batch[i][2] for i in new]
+                        else:
+                            vecs = self.emb.embed_documents([texts[i] for i in new])
+                            embedded += len(new)
+                        self._add([ids[i] for i in new], [texts[i] for i in new], [metadatas[i] for i in new], vecs)
+                    if writer is not None:
+                        # 이전 버전에서 재사용한 chunk 의 벡터는 이 배치 것만 컬렉션에서 읽어 옴
+                        batch_vecs = dict(zip((ids[i] for i in new), vecs))
+                        reused = [cid for cid in ids if cid not in batch_vecs]
+                        if reused:
+                            r = self.db._collection.get(ids=reused, include=["embeddings"])
+                            batch_vecs.update(zip(r["ids"], r["embeddings"]))
+                        writer.append(texts, metadatas, [batch_vecs[cid] for cid in ids])
+                    all_ids.extend(ids)
+                    if progress:
+                        progress(len(all_ids), total)
+            except BaseException:
+                if writer is not None:
+                    writer.abort()
+                raise
+
+            # 새 버전에 없는 chunk 는 스트리밍이 끝난 뒤 한 번에 제거
+            current = set(all_ids)
+            stale = [i for i in old_ids if i not in current]
+            if stale:
+                self._delete(stale)
+            self.files[path] = all_ids
+            if progress:
+                progress(len(all_ids), len(all_ids))
+            if writer is not None:
+                writer.commit()
+
+            total = len(all_ids)
+            return {"total": total, "embedded": embedded, "reused": total - embedded, "deleted": len(stale)}
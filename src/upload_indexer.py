@@ -0,0 +1,120 @@
+# new_src/upload_indexer.py
+"""
+업로드 파일 백그라운드 색인
+
+파일이 도착하자마자 워커 풀에서 retriever 를 만들기 시작하고,
+채팅 턴은 기다리지 않고 진행합니다. 색인 중에도 이미 추가된 배치까지는 검색됩니다.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .upload_helpers import SessionUploadIndex
+
+UPLOAD_INDEX_WORKERS = int(os.getenv("UPLOAD_INDEX_WORKERS", "4"))
+
+
+class IndexJob:
+    """업로드 파일 하나의 색인 작업 상태 (pending → running → ready | failed | cancelled)."""
+
+    def __init__(self, store: SessionUploadIndex, path: str, on_done: Optional[Callable[[], None]] = None):
+        self.store = store
+        self.path = path
+        self.on_done = on_done  # 끝나면 호출 (RetrieverPool 참조 해제)
+        self.generation = store.claim(path)  # 취소 시 이 번호 이후 같은 path 가 다시 추가되었으면 제거하지 않음
+        self.state = "pending"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.stats: Dict[str, int] = {}  # embedded / reused / deleted chunk 수
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = False  # corpus 에서 파일이 빠지면 True (대기 중이면 실행하지 않음)
+        self._lock = threading.Lock()
+
+    def cancel(self) -> bool:
+        """아직 끝나지 않았으면 취소 표시 후 True (정리는 워커가 담당)."""
+        self.cancelled = True
+        return self.state in ("pending", "running")
+
+    def _progress(self, done: int, total: Optional[int]) -> None:
+        with self._lock:
+            self.done, self.total = done, total
+
+    def run(self) -> None:
+        try:
+            self._run()
+        finally:
+            self.finished_at = time.time()
+            if self.on_done:
+                self.on_done()
+
+    def _run(self) -> None:
+        if self.cancelled:
+            # 실행 전에 corpus 에서 빠진 파일: 이전 버전 chunk 만 정리
+            self.store.remove_file(self.path, generation=self.generation)
+            self.state = "cancelled"
+            return
+        self.state = "running"
+        try:
+            # 세션 store 의 retriever 는 색인 중에도 사용 가능 → 턴은 부분 결과로 진행
+            self.stats = self.store.index_file(self.path, progress=self._progress)
+            if self.cancelled:
+                # 색인 도중 corpus 에서 빠진 파일 (그 사이 다시 추가되었으면 새 작업의 chunk 는 유지)
+                self.store.remove_file(self.path, generation=self.generation)
+                self.state = "cancelled"
+            else:
+                self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"[upload-index] failed for {self.path}: {e}")
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def retriever(self) -> Any:
+        return self.store.retriever
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            done, total = self.done, self.total
+        elapsed = (self.finished_at or time.time()) - self.submitted_at
+        return {
+            "path": self.path,
+            "state": self.state,
+            "done": done,
+            "total": total,
+            "progress": (done / total) if total else (1.0 if self.state == "ready" else 0.0),
+            "elapsed_s": round(elapsed, 2),
+            "error": self.error,
+            **self.stats,
+        }
+
+
+class UploadIndexer:
+    """프로세스 전역 색인 워커 풀."""
+
+    def __init__(self, max_workers: int = UPLOAD_INDEX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-index")
+
+    def submit(self, store: SessionUploadIndex, path: str,
+               on_done: Optional[Callable[[], None]] = None) -> IndexJob:
+        job = IndexJob(store, path, on_done)
+        self._executor.submit(job.run)
+        return job
+
+    def remove(self, store: SessionUploadIndex, path: str):
+        """
+        세션 corpus 에서 파일 제거를 워커에서 실행 (Future 반환).
+        같은 세션의 다른 파일이 색인 중이면 store lock 을 기다려야 하므로 요청 스레드(채팅 턴)에서 하지 않음.
+        지금의 작업 번호로 제거 → 그 사이 같은 path 가 다시 추가되면 제거하지 않음.
+        """
+        return self._executor.submit(store.remove_file, path, store.generation(path))
+
+
+upload_indexer = UploadIndexer()
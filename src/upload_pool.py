@@ -0,0 +1,129 @@
+# new_src/upload_pool.py
+"""
+세션별 업로드 retriever(in-memory Chroma 컬렉션) 풀
+
+- 세션마다 SessionUploadIndex 하나를 풀이 소유하고, 세션 종료(release) 시 컬렉션을 삭제합니다.
+- 색인 작업 / 진행 중인 턴은 acquire ~ release 로 참조 카운트를 잡아 사용 중에는 삭제되지 않습니다.
+- 전체 벡터 메모리가 UPLOAD_POOL_MAX_BYTES 를 넘으면 사용 중이 아닌 세션부터 LRU 로 축출합니다.
+  축출된 세션은 다음 턴에 디스크(embedding_cache)에서 임베딩 호출 없이 다시 올라옵니다.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from . import metrics
+from .upload_helpers import SessionUploadIndex
+
+UPLOAD_POOL_MAX_BYTES = int(os.getenv("UPLOAD_POOL_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class _Entry:
+    def __init__(self, store: SessionUploadIndex):
+        self.store = store
+        self.refs = 0
+        self.released = False  # release 요청됨 → 마지막 참조가 풀리면 삭제
+        self.last_used = time.time()
+
+
+class RetrieverPool:
+    def __init__(self, max_bytes: int = UPLOAD_POOL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # LRU 순서 (앞쪽이 오래됨)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[SessionUploadIndex]:
+        """세션 store (없거나 축출되었으면 None)."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry.store if entry else None
+
+    def acquire(self, session_id: str) -> SessionUploadIndex:
+        """세션 store 를 (없으면 만들어) 참조 카운트를 올리고 반환합니다. 반드시 release_ref 와 짝."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = self._entries[session_id] = _Entry(SessionUploadIndex())
+                metrics.inc("upload_pool_collections_created_total")
+            entry.released = False
+            entry.refs += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(session_id)
+            return entry.store
+
+    def release_ref(self, session_id: str) -> None:
+        released = []
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.time()
+            if entry.refs == 0 and entry.released:
+                del self._entries[session_id]
+                released.append(entry.store)
+            evicted = self._evict_over_cap()
+        self._close(released, "released")
+        self._close(evicted, "evicted")
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[SessionUploadIndex]:
+        store = self.acquire(session_id)
+        try:
+            yield store
+        finally:
+            self.release_ref(session_id)
+
+    def release(self, session_id: str) -> None:
+        """세션 종료: 컬렉션 삭제 (사용 중이면 마지막 참조가 풀릴 때 삭제)."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            if entry.refs > 0:
+                entry.released = True
+                return
+            del self._entries[session_id]
+        self._close([entry.store], "released")
+
+    def _evict_over_cap(self) -> list:
+        """(lock 보유 상태에서 호출) 상한 초과 시 참조 없는 세션을 오래된 순으로 제거."""
+        evicted = []
+        total = sum(e.store.vector_bytes for e in self._entries.values())
+        for sid in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[sid]
+            if entry.refs == 0:
+                total -= entry.store.vector_bytes
+                del self._entries[sid]
+                evicted.append(entry.store)
+        return evicted
+
+    def _close(self, stores, reason: str) -> None:
+        for store in stores:
+            store.close()
+            metrics.inc("upload_pool_collections_closed_total", reason=reason)
+
+    def enforce_cap(self) -> int:
+        with self._lock:
+            evicted = self._evict_over_cap()
+        self._close(evicted, "evicted")
+        return len(evicted)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "upload_pool_collections": len(entries),
+            "upload_pool_collections_in_use": sum(1 for e in entries if e.refs > 0),
+            "upload_pool_vectors": sum(e.store.n_vectors for e in entries),
+            "upload_pool_vector_bytes": sum(e.store.vector_bytes for e in entries),
+            "upload_pool_max_bytes": self.max_bytes,
+        }
+
+
+upload_pool = RetrieverPool()
+metrics.register_collector(upload_pool.stats)
@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+# text-embedding-3-small / gpt-4.1 계열은 cl100k_base / o200k_base 를 사용
+_ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken  # langchain-openai 의존성으로 함께 설치됨
+        return tiktoken.get_encoding(_ENCODING_NAME)
+    except Exception:
+        # 오프라인 등으로 인코딩 파일을 받을 수 없으면 근사치 사용
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """실제 토크나이저 기준 토큰 수 (tiktoken 사용 불가 시 글자수/4 근사)."""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
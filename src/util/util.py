@@ -1,4 +1,5 @@
 import os
+import re
 from pathlib import Path
 
 _CURRENT_FILE_PATH = Path(__file__).resolve()
@@ -10,4 +11,10 @@ def get_project_root_path():
 def get_save_text_output_dir():
     root = get_project_root_path()
     path = os.path.join(root, 'output/save_text')
-    return path
\ No newline at end of file
+    return path
+
+# 세션 ID 는 업로드 폴더 / 도구 결과 저장소 / 카세트 파일 경로에 쓰이므로 영문/숫자/-/_ 만 허용 (경로 조작 방지)
+SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def is_valid_session_id(session_id) -> bool:
+    return isinstance(session_id, str) and SESSION_ID_RE.fullmatch(session_id) is not None
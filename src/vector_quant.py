@@ -0,0 +1,289 @@
+# new_src/vector_quant.py
+"""
+노트북 인덱스의 양자화(float16 / int8) 벡터 사이드카
+
+Chroma 는 float32(1536차원) 벡터를 그대로 들고 있어 워커 프로세스마다 메모리를 씁니다.
+RAG_VECTOR_DTYPE=float16|int8 이면:
+  - rag_build 가 인덱스 버전 디렉토리에 quant/ 사이드카(.npy, mmap 가능)를 함께 만들고
+  - rag_search 는 양자화 행렬로 후보(k * OVERSAMPLE)를 고른 뒤
+    Chroma 에서 후보의 float32 벡터만 가져와 정밀 재점수(re-scoring)합니다.
+mmap 으로 읽으므로 같은 버전을 쓰는 워커들은 페이지 캐시를 공유합니다.
+
+벤치마크 (recall@k, 모드별 워커 프로세스 RSS, 쿼리 지연 — API 호출 없음):
+    uv run python -m src.vector_quant [--k 4] [--queries 200]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .libraries import LIBRARY_MODULES, lib_tag
+
+VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32").lower()  # float32 | float16 | int8
+OVERSAMPLE = int(os.getenv("RAG_QUANT_OVERSAMPLE", "4"))
+QUANT_DIR_NAME = "quant"
+_BLOCK_ROWS = 4096  # 블록 단위로 upcast 해서 쿼리당 임시 메모리를 제한
+_LIB_KEYS = list(LIBRARY_MODULES)  # 비트 순서
+
+
+# -------------------------------
+# Quantization
+# -------------------------------
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(codes, scales). int8 은 벡터별 scale = max|v| / 127."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported RAG_VECTOR_DTYPE: {dtype}")
+
+def quantized_scores(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    q = np.asarray(query, dtype=np.float32)
+    out = np.empty(codes.shape[0], dtype=np.float32)
+    for i in range(0, codes.shape[0], _BLOCK_ROWS):
+        out[i:i + _BLOCK_ROWS] = codes[i:i + _BLOCK_ROWS].astype(np.float32) @ q
+    if scales is not None:
+        out *= scales
+    return out
+
+def _lib_bits(metadatas: List[Dict]) -> np.ndarray:
+    bits = np.zeros(len(metadatas), dtype=np.int32)
+    for b, key in enumerate(_LIB_KEYS):
+        tag = lib_tag(key)
+        bits |= np.array([(1 << b) if (m or {}).get(tag) else 0 for m in metadatas], dtype=np.int32)
+    return bits
+
+def library_mask(libraries: List[str]) -> int:
+    return sum(1 << _LIB_KEYS.index(k) for k in libraries if k in _LIB_KEYS)
+
+
+# -------------------------------
+# Sidecar build / load
+# -------------------------------
+def _fetch_all(collection, include: List[str], page: int = 5000) -> Dict[str, list]:
+    out: Dict[str, list] = {"ids": [], **{k: [] for k in include}}
+    offset = 0
+    while True:
+        r = collection.get(include=include, limit=page, offset=offset)
+        if not r["ids"]:
+            break
+        out["ids"] += list(r["ids"])
+        for k in include:
+            out[k] += list(r[k])
+        offset += len(r["ids"])
+    return out
+
+def _write_sidecar(qdir: Path, ids: List[str], vectors: np.ndarray, metadatas: List[Dict], dtype: str) -> Path:
+    qdir.mkdir(parents=True, exist_ok=True)
+    codes, scales = quantize(vectors, dtype)
+    np.save(qdir / "codes.npy", codes)
+    if scales is not None:
+        np.save(qdir / "scales.npy", scales)
+    elif (qdir / "scales.npy").exists():
+        (qdir / "scales.npy").unlink()
+    np.save(qdir / "lib_bits.npy", _lib_bits(metadatas))
+    with open(qdir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "ids": ids}, f)
+    return qdir
+
+def build_sidecar(chroma, index_dir: Path, dtype: str = VECTOR_DTYPE) -> Optional[Path]:
+    """Chroma 컬렉션 전체를 읽어 quant/ 사이드카를 다시 씁니다 (float32 모드면 아무것도 하지 않음)."""
+    if dtype == "float32":
+        return None
+    data = _fetch_all(chroma._collection, ["embeddings", "metadatas"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), -1)
+    return _write_sidecar(index_dir / QUANT_DIR_NAME, data["ids"], vectors, data["metadatas"], dtype)
+
+
+class QuantizedIndex:
+    """mmap 으로 연 양자화 사이드카 + Chroma(정밀 재점수용)."""
+
+    def __init__(self, qdir: Path):
+        with open(qdir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dtype = meta["dtype"]
+        self.ids = meta["ids"]
+        self.codes = np.load(qdir / "codes.npy", mmap_mode="r")
+        self.scales = np.load(qdir / "scales.npy") if (qdir / "scales.npy").exists() else None
+        self.lib_bits = np.load(qdir / "lib_bits.npy")
+
+    def candidates(self, query_vec, n: int, lib_mask: int = 0) -> List[str]:
+        scores = quantized_scores(self.codes, self.scales, query_vec)
+        if lib_mask:
+            scores = np.where((self.lib_bits & lib_mask) != 0, scores, -np.inf)
+        n = min(n, int(np.isfinite(scores).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[i] for i in top]
+
+    def search(self, db, query_vec, k: int, libraries: Optional[List[str]] = None):
+        """양자화 후보 → float32 재점수 → langchain Document 리스트."""
+        from langchain_core.documents import Document
+
+        q = np.asarray(query_vec, dtype=np.float32)
+        ids = self.candidates(q, k * OVERSAMPLE, library_mask(libraries or []))
+        if not ids:
+            return []
+        r = db._collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        exact = np.asarray(r["embeddings"], dtype=np.float32) @ q
+        order = np.argsort(-exact)[:k]
+        return [Document(page_content=r["documents"][i], metadata=r["metadatas"][i] or {}) for i in order]
+
+
+_quant_cache: Dict[str, QuantizedIndex] = {}  # {index_dir: QuantizedIndex}
+
+def get_quantized_index(index_dir: Path) -> Optional[QuantizedIndex]:
+    """현재 모드의 사이드카가 있으면 반환 (없으면 None → 일반 Chroma 검색)."""
+    if VECTOR_DTYPE == "float32":
+        return None
+    key = os.fspath(index_dir)
+    idx = _quant_cache.get(key)
+    if idx is None:
+        qdir = index_dir / QUANT_DIR_NAME
+        if not (qdir / "meta.json").exists():
+            return None
+        idx = QuantizedIndex(qdir)
+        if idx.dtype != VECTOR_DTYPE:
+            return None
+        _quant_cache.clear()
+        _quant_cache[key] = idx
+    return idx
+
+
+# -------------------------------
+# Benchmark
+# -------------------------------
+# 모드마다 새 프로세스(워커와 같은 조건)에서 Chroma 핸들 + 그 모드의 사이드카만 열고 쿼리를 돌린 뒤 VmRSS 를 잼
+#   float32: Chroma 검색만 (현재 rag_search 와 같음)
+#   float16/int8: mmap 사이드카로 후보 → 후보의 float32 벡터만 Chroma 에서 가져와 재점수
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _exact_topk(vectors: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    s = vectors @ q
+    top = np.argpartition(-s, k - 1)[:k]
+    return top[np.argsort(-s[top])]
+
+def _bench_worker(mode: str, index_dir: str, qdir: Optional[str], queries_path: str, k: int) -> dict:
+    """(자식 프로세스) 한 모드로 쿼리를 실행하고 top-k id / 지연 / VmRSS 를 반환."""
+    import chromadb
+
+    queries = np.load(queries_path)
+    baseline = _rss_mb()  # numpy / chromadb import 까지 — 이후 증가분이 인덱스 몫
+    collection = chromadb.PersistentClient(path=index_dir).get_collection("notebooks")
+    quant = QuantizedIndex(Path(qdir)) if qdir else None
+    approx, rescored = [], []
+    t0 = time.perf_counter()
+    for q in queries:
+        if quant is None:
+            ids = collection.query(query_embeddings=[q.tolist()], n_results=k, include=["distances"])["ids"][0]
+            approx.append(ids)
+            rescored.append(ids)
+            continue
+        cand = quant.candidates(q, k * OVERSAMPLE)
+        r = collection.get(ids=cand, include=["embeddings"])
+        exact = np.asarray(r["embeddings"], dtype=np.float32) @ q
+        approx.append(cand[:k])
+        rescored.append([r["ids"][i] for i in np.argsort(-exact)[:k]])
+    ms = (time.perf_counter() - t0) / max(1, len(queries)) * 1000
+    return {"mode": mode, "rss_mb": _rss_mb(), "baseline_mb": baseline, "ms": ms,
+            "approx": approx, "rescored": rescored}
+
+def _run_worker(mode: str, index_dir: Path, qdir: Optional[Path], queries_path: Path, k: int) -> dict:
+    cmd = [sys.executable, "-m", "src.vector_quant", "--worker", mode, "--index-dir", str(index_dir),
+           "--queries-file", str(queries_path), "--k", str(k)]
+    if qdir is not None:
+        cmd += ["--qdir", str(qdir)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=os.environ.copy())
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} worker failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def benchmark(index_dir: Path, k: int = 4, n_queries: int = 200, seed: int = 0) -> List[Dict]:
+    """저장된 벡터에 잡음을 섞은 합성 쿼리로 float32 정답 대비 recall@k / 지연 / 워커 RSS 를 모드별로 측정."""
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=str(index_dir)).get_collection("notebooks")
+    data = _fetch_all(collection, ["embeddings", "metadatas"])
+    ids = data["ids"]
+    vectors = np.ascontiguousarray(np.asarray(data["embeddings"], dtype=np.float32).reshape(len(ids), -1))
+    del collection
+
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    picks = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(0, 0.02, size=(len(picks), vectors.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [{ids[i] for i in _exact_topk(vectors, q, k)} for q in queries]
+    recall = lambda results: sum(len(gold & set(r)) for gold, r in zip(truth, results)) / (k * len(queries))
+
+    norms = np.linalg.norm(vectors, axis=1)
+    if not np.allclose(norms, 1.0, atol=1e-2):
+        # OpenAI 임베딩은 단위 벡터라 L2 / cosine / 내적 순위가 같지만, 오프라인 가짜 임베딩 등은 아님
+        print(f"⚠️ vectors are not unit-normalized (|v| ≈ {norms.mean():.2f}): Chroma's L2 ranking differs from "
+              f"the inner-product ground truth, so the float32 recall below is not comparable")
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="vq_bench_") as tmp:
+        queries_path = Path(tmp) / "queries.npy"
+        np.save(queries_path, queries)
+        for mode in ["float32", "float16", "int8"]:
+            qdir = None
+            nbytes = vectors.nbytes
+            if mode != "float32":
+                qdir = _write_sidecar(Path(tmp) / mode, ids, vectors, data["metadatas"], mode)
+                nbytes = sum(f.stat().st_size for f in qdir.glob("*.npy"))
+            r = _run_worker(mode, index_dir, qdir, queries_path, k)
+            rows.append({"mode": mode, "bytes": nbytes, "rss_mb": r["rss_mb"],
+                         "rss_delta_mb": r["rss_mb"] - r["baseline_mb"],
+                         "recall": recall(r["approx"]), "recall_rescored": recall(r["rescored"]), "ms": r["ms"]})
+    return rows
+
+if __name__ == "__main__":
+    from .index_store import current_index_dir
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    # 내부용: 모드별 측정 프로세스
+    parser.add_argument("--worker", choices=["float32", "float16", "int8"], help=argparse.SUPPRESS)
+    parser.add_argument("--index-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--qdir", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_bench_worker(args.worker, args.index_dir, args.qdir, args.queries_file, args.k)))
+        raise SystemExit(0)
+
+    index_dir = current_index_dir()
+    if index_dir is None:
+        raise SystemExit("RAG index not found. Please build it first (python -m src.rag_build).")
+    print(f"🗂️  Index: {index_dir}  (each mode measured in a fresh worker process)\n")
+
+    print(f"{'mode':<8} {'matrix MB':>10} {'RSS MB':>8} {'RSS Δ MB':>9} {'recall@k':>9} {'+rescore':>9} {'ms/query':>9}")
+    for r in benchmark(index_dir, k=args.k, n_queries=args.queries):
+        print(f"{r['mode']:<8} {r['bytes'] / 1e6:>10.2f} {r['rss_mb']:>8.1f} {r['rss_delta_mb']:>9.1f} "
+              f"{r['recall']:>9.3f} {r['recall_rescored']:>9.3f} {r['ms']:>9.3f}")
+    print("\nRSS = worker VmRSS after the queries; RSS Δ = growth over the process after numpy/chromadb import")
@@ -2,16 +2,20 @@ import os
 import uuid
 import logging
 import shutil
+import time
 from pathlib import Path
 from fastapi import FastAPI, Depends, Request, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from slack_sdk.web import WebClient
 from slack_sdk.errors import SlackApiError
 from langchain_core.messages import SystemMessage
 
-from .schemas import AgentRequest, AgentResponse
+from .schemas import AgentRequest, AgentResponse, IndexRequest
+from .upload_stream import UploadError, receive_files, safe_filename, session_upload_dir
 from ..agent_manager import AgentFlowManager
-from ..util.util import get_save_text_output_dir
+from .. import metrics, http_pool
+from ..util.util import get_save_text_output_dir, is_valid_session_id
 
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_DEFAULT_DM_EMAIL = os.getenv("SLACK_DEFAULT_DM_EMAIL")
@@ -151,6 +155,12 @@ active_agents: dict[str, 'AgentFlowManager'] = {}
 #     print(f"[INIT] '{UPLOAD_DIR}' 폴더를 새로 생성했습니다.")
 # =================================
 
+@app.on_event("shutdown")
+async def close_http_pool():
+    """공용 OpenAI HTTP 연결 풀의 keep-alive 연결 정리."""
+    await http_pool.aclose()
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
@@ -170,10 +180,13 @@ async def add_request_id(request: Request, call_next):
 #AgentFlowManager 인스턴스를 가져오거나 생성
 def _get_or_create_agent(session_id: str) -> AgentFlowManager:
     """세션 ID에 해당하는 AgentManager 인스턴스를 반환합니다. 없으면 새로 생성합니다."""
+    if not is_valid_session_id(session_id):
+        # 세션 ID 는 서버 경로(도구 결과 저장소, 카세트)에 쓰임 → 영문/숫자/-/_ 만 허용
+        raise HTTPException(status_code=400, detail="Invalid session_id")
     
     if session_id not in active_agents:
         # AgentManager가 없으면 새로 생성 후 저장
-        agent = AgentFlowManager()
+        agent = AgentFlowManager(session_id)
         active_agents[session_id] = agent
         logger.info(f"✅ AgentManager 저장됨: {session_id[:8]}")
     else:
@@ -195,8 +208,10 @@ async def run_agent_api(
     
     user_query = request_data.query
     session_id = request_data.session_id
-    upload_file_path = request_data.upload_file_path
-    logger.info(f"[upload_file_path] : {str(upload_file_path)}")
+    upload_file_paths = request_data.upload_file_paths
+    if upload_file_paths is None and request_data.upload_file_path:
+        upload_file_paths = [request_data.upload_file_path]
+    logger.info(f"[upload_file_paths] : {str(upload_file_paths)}")
 
     # session_id 기준으로 하나의 agent_manager를 생성하여 사용
     agent_manager = _get_or_create_agent(session_id)
@@ -223,7 +238,9 @@ async def run_agent_api(
     logger.info(f"Session ID: {session_id[:8]} | [REQ ID: {request_id}] | Agent Object ID: {id(agent_manager)} | Query: '{user_query[:20]}...'")
 
     # agent_manager > run_agent_flow 메서드를 호출
-    agent_answer = agent_manager.run_agent_flow(user_query, upload_file_path)    
+    started = time.perf_counter()
+    agent_answer = agent_manager.run_agent_flow(user_query, upload_file_paths)    
+    metrics.observe("agent_turn_seconds", time.perf_counter() - started)
 
     logger.info(f"agent_answer : {agent_answer}")
 
@@ -239,10 +256,89 @@ async def run_agent_api(
         response=answer,
         trace=f"Session ID: {session_id}, Request ID: {request_id}, Agent ID: {id(agent_manager)}",
         file_path=file_path,
+        index_status=agent_answer.get("index_status"),
     )
     return response
 
 
+# 파일 업로드 (multipart 스트리밍): 저장 + 해시 → 바로 백그라운드 색인 시작
+# UI 와 API 가 파일시스템을 공유하지 않아도 되며, 응답의 path 를 /agent 의 upload_file_paths 로 사용
+@app.post("/upload")
+async def upload_files(request: Request, session_id: str):
+    try:
+        received = await receive_files(request, session_upload_dir(session_id))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if not received:
+        raise HTTPException(status_code=400, detail="No file part in the request")
+
+    # 세션 생성(업로드 저장소 준비) / 색인 제출은 잠금을 잡을 수 있어 스레드풀에서 (이벤트 루프 블로킹 방지)
+    agent_manager = await run_in_threadpool(_get_or_create_agent, session_id)
+    files = []
+    for f in received:
+        # 내용 해시를 버전으로 사용 → 같은 내용 재업로드는 재색인하지 않음
+        job = await run_in_threadpool(agent_manager.start_indexing, f["path"], signature=f["sha256"])
+        files.append({**f, "index_status": job.status()})
+        logger.info(f"📥 업로드 저장 + 색인 시작: {session_id[:8]} | {f['name']} ({f['size']} bytes)")
+    return {"files": files}
+
+
+# 업로드 파일 삭제 (세션 corpus 에서 제거 + 서버 파일 삭제)
+@app.delete("/upload/{session_id}/{filename}")
+async def delete_upload(session_id: str, filename: str):
+    try:
+        path = session_upload_dir(session_id) / safe_filename(filename)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    agent_manager = active_agents.get(session_id)
+    if agent_manager:
+        agent_manager.remove_upload(path.as_posix())
+    if path.exists():
+        path.unlink()
+    return {"deleted": path.as_posix()}
+
+
+# 업로드 직후 호출: 첫 질문 전에 백그라운드 색인 시작 (세션 corpus 에 추가, UI 와 파일시스템을 공유하는 경우)
+@app.post("/index")
+async def start_index(request_data: IndexRequest):
+    agent_manager = await run_in_threadpool(_get_or_create_agent, request_data.session_id)
+    job = await run_in_threadpool(agent_manager.start_indexing, request_data.upload_file_path)
+    logger.info(f"📥 색인 시작: {request_data.session_id[:8]} | {request_data.upload_file_path}")
+    return job.status()
+
+
+# 업로드 파일 색인 진행 상태 조회
+@app.get("/index/{session_id}")
+async def get_index_status(session_id: str):
+    agent_manager = active_agents.get(session_id)
+    status = agent_manager.index_status() if agent_manager else None
+    if status is None:
+        raise HTTPException(status_code=404, detail="No upload is being indexed for this session")
+    return status
+
+
+# 세션 종료: 업로드 컬렉션 해제 + 세션 업로드 폴더 삭제
+@app.delete("/session/{session_id}")
+async def end_session(session_id: str):
+    agent_manager = active_agents.pop(session_id, None)
+    if agent_manager:
+        agent_manager.close()
+    try:
+        upload_dir = session_upload_dir(session_id)
+        if upload_dir.exists():
+            shutil.rmtree(upload_dir)
+    except UploadError:
+        pass
+    logger.info(f"🧹 세션 종료: {session_id[:8]}")
+    return {"session_id": session_id, "closed": agent_manager is not None}
+
+
+# 메트릭 (Prometheus text format): 업로드 컬렉션 수, 상주 벡터 바이트, 턴 지연 등
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return metrics.render_prometheus()
+
+
 @app.get("/download/{filename}")
 async def download_file(filename: str):
     """
@@ -1,3 +1,4 @@
+from typing import Any
 from pydantic import BaseModel
 
 # 입력 모델
@@ -7,7 +8,8 @@ class AgentRequest(BaseModel):
     slack_user_id: str | None = None       # DM 대상 Uxxxxx
     slack_email: str | None = None         # DM 대상 이메일
     slack_channel_id: str | None = None    # 채널/그룹/DM 채널 ID (C/G/Dxxxxx)
-    upload_file_path: str | None = None # 업로드한 파일 경로
+    upload_file_path: str | None = None # 업로드한 파일 경로 (단일 파일, 하위 호환)
+    upload_file_paths: list[str] | None = None # 세션 corpus 로 유지할 업로드 파일 경로 목록
 
 # 출력 모델
 class AgentResponse(BaseModel):
@@ -15,3 +17,9 @@ class AgentResponse(BaseModel):
     trace: str # 출력 확인용
 
     file_path: str | None = None # 파일이 생성된 경우, 해당 파일 경로
+    index_status: dict[str, Any] | None = None # 업로드 파일 색인 상태 (state/done/total + 파일별 files)
+
+# 업로드 파일 색인 요청 (파일 저장 직후 호출)
+class IndexRequest(BaseModel):
+    session_id: str
+    upload_file_path: str
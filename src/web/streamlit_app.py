@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import os
 import uuid
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 with st.sidebar:
@@ -20,7 +21,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.tools import DEFAULT_DOCS
+from src.libraries import DEFAULT_DOCS
 # =================================
 
 # 챗봇 세션이 시작될 때 고유 ID 생성 (탭이 새로 열릴 때마다 1번 실행)
@@ -29,13 +30,12 @@ if "session_id" not in st.session_state:
     print(f"[REQ ID: {st.session_state.session_id[:8]}] - session start")
 
 # ============ 파일 업로드 관련 초기 설정
-UPLOADS_DIR = Path("uploads")
+# 파일은 FastAPI /upload 로 스트리밍 전송 (UI 와 API 가 파일시스템을 공유하지 않아도 됨)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
-if 'uploaded_file_name' not in st.session_state:
-    st.session_state['uploaded_file_name'] = None
-
-SESSION_PATH = UPLOADS_DIR / st.session_state['session_id']
-SESSION_PATH.mkdir(parents=True, exist_ok=True)
+if 'uploaded_files' not in st.session_state:
+    # {파일 이름: {"file_id", "path"}} — file_id 로 같은 이름의 수정본 재업로드 감지, path 는 서버 저장 경로
+    st.session_state['uploaded_files'] = {}
 # =================================
 
 # 환경변수 로드
@@ -68,10 +68,8 @@ def get_agent_response(user_input: str):
         if slack_channel_id:
             payload["slack_channel_id"] = slack_channel_id
 
-        # ✅ 업로드 경로 전달 (기존 순서 버그 수정: path 만든 뒤 넣기)
-        if st.session_state.get("uploaded_file_name"):
-            path = SESSION_PATH / st.session_state["uploaded_file_name"]
-            payload["upload_file_path"] = path.as_posix()
+        # ✅ 세션 corpus 로 유지할 업로드 경로 목록 전달 (빈 목록이면 서버가 corpus 를 비움)
+        payload["upload_file_paths"] = [f["path"] for f in st.session_state["uploaded_files"].values()]
 
         resp = requests.post(endpoint, json=payload, timeout=60)
 
@@ -137,36 +135,73 @@ st.markdown(
 # ----------------------------------------------------
 # 파일 업로드
 # ----------------------------------------------------
+# multipart 본문을 조각(chunk)으로 만들어 주는 generator → requests 가 chunked 전송
+def _multipart_chunks(uploaded_file, boundary: str):
+    filename = uploaded_file.name.replace('"', "_")
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode("utf-8")
+    uploaded_file.seek(0)
+    while chunk := uploaded_file.read(UPLOAD_CHUNK_BYTES):
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+# FastAPI /upload 로 파일 스트리밍 → 서버가 저장 + 해시 + 백그라운드 색인 시작
+def upload_to_server(uploaded_file) -> dict:
+    boundary = uuid.uuid4().hex
+    resp = requests.post(
+        f"{FASTAPI_URL}/upload",
+        params={"session_id": st.session_state.session_id},
+        data=_multipart_chunks(uploaded_file, boundary),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        timeout=300,
+    )
+    if resp.status_code != 200:
+        raise ValueError(resp.json().get("detail", resp.text))
+    return resp.json()["files"][0]
+
+# 업로드 파일 색인 진행 상태 조회 (없으면 None)
+def get_index_status():
+    try:
+        resp = requests.get(f"{FASTAPI_URL}/index/{st.session_state.session_id}", timeout=3)
+        return resp.json() if resp.status_code == 200 else None
+    except requests.exceptions.RequestException:
+        return None
+
 # Streamlit 업로드 핸들러
 def handle_upload(uploaded_file):
-    """파일 저장(업로드), 세션 상태 업데이트를 처리합니다."""
+    """파일 업로드(서버로 스트리밍), 세션 상태 업데이트를 처리합니다."""
     
-    if uploaded_file.name == st.session_state['uploaded_file_name']:
+    saved = st.session_state['uploaded_files'].get(uploaded_file.name)
+    if saved and saved["file_id"] == uploaded_file.file_id:
         # st.info("같은 파일이 이미 업로드되어 있습니다. RAG를 다시 구축하지 않습니다.")
         return
 
-    # 세션 폴더에 파일 저장
-    file_path_on_disk = SESSION_PATH / uploaded_file.name
     try:
-        # 이전에 업로드된 파일이 있다면 삭제 (단일 파일 유지)
-        if st.session_state['uploaded_file_name']:
-            old_path = SESSION_PATH / st.session_state['uploaded_file_name']
-            if old_path.exists():
-                os.remove(old_path)
-
-        # 새 파일 저장
-        with open(file_path_on_disk, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        st.session_state['uploaded_file_name'] = uploaded_file.name
+        # 같은 이름이면 서버에서 덮어쓰기 → 수정본이면 바뀐 chunk 만 다시 임베딩
+        result = upload_to_server(uploaded_file)
+        st.session_state['uploaded_files'][uploaded_file.name] = {
+            "file_id": uploaded_file.file_id,
+            "path": result["path"],
+        }
         
     except ValueError as ve:
-        st.session_state['uploaded_file_name'] = None
+        st.session_state['uploaded_files'].pop(uploaded_file.name, None)
         st.error(f"파일 업로드 실패 (내용 오류): {ve}")
     except Exception as e:
-        st.session_state['uploaded_file_name'] = None
+        st.session_state['uploaded_files'].pop(uploaded_file.name, None)
         st.error(f"파일 업로드 실패 : {e}")
 
+# 업로더에서 빠진 파일 삭제 (서버 corpus 에서 제거 + 서버 파일 삭제)
+def remove_upload(file_name: str):
+    st.session_state['uploaded_files'].pop(file_name, None)
+    try:
+        requests.delete(f"{FASTAPI_URL}/upload/{st.session_state.session_id}/{quote(file_name)}", timeout=5)
+    except requests.exceptions.RequestException as e:
+        print(f"[upload] delete failed: {e}")
+
 # ----------------------------------------------------
 # 채팅 UI
 # ----------------------------------------------------
@@ -227,32 +262,40 @@ if prompt := st.chat_input("여기에 질문을 입력하세요..."):
     # 5. UI를 새로고침하여 새로 추가된 메시지와 버튼을 표시
     st.rerun()
 
-# 업로드 버튼 위젯 생성
-uploaded_file = st.file_uploader(
-        label="파일 업로드 (.py, .ipynb 등 챗봇에게 질문할 때 사용할 파일을 업로드 하세요.)",
-        type=['ipynb', 'py'],
+# 업로드 버튼 위젯 생성 (여러 파일을 올리면 세션 corpus 하나로 합쳐서 검색)
+uploaded_files = st.file_uploader(
+        label="파일 업로드 (.py, .ipynb, .pdf 등 챗봇에게 질문할 때 사용할 파일을 업로드 하세요.)",
+        type=['ipynb', 'py', 'pdf'],
+        accept_multiple_files=True,
         width=450,
     )
 
-# 조건문으로 연결 (파일이 업로드되었을 때만 함수 실행)
-if uploaded_file is not None:
-    
-    # 현재 세션 상태를 확인하여 중복 실행 방지
-    if uploaded_file.name != st.session_state.get('uploaded_file_name'):
-        
-        # 파일 객체를 인수로 전달하며 RAG 초기화 함수 호출
-        handle_upload(uploaded_file)
-
-elif "uploaded_file_name" in st.session_state:
-    # 파일 삭제 처리
-    file_name = st.session_state["uploaded_file_name"]
-    if file_name:
-        try:
-            old_path = SESSION_PATH / st.session_state['uploaded_file_name']
-            if old_path.exists():
-                os.remove(old_path)
-                # st.info(f"이전 파일 '{st.session_state['uploaded_file_name']}'을(를) 삭제했습니다.")
-                
-        except FileNotFoundError:
-            pass
-    del st.session_state["uploaded_file_name"]
+# 업로더에서 제거된 파일 정리
+current_names = {f.name for f in uploaded_files}
+for name in list(st.session_state['uploaded_files']):
+    if name not in current_names:
+        remove_upload(name)
+
+# 새로 올라오거나 수정된 파일만 저장 + 색인 요청 (중복 실행 방지는 handle_upload 에서 file_id 로 확인)
+for uploaded_file in uploaded_files:
+    handle_upload(uploaded_file)
+
+# 색인 진행 상태 표시 (질문은 색인 완료를 기다리지 않아도 됨)
+if uploaded_files:
+    index_status = get_index_status()
+    for file_status in (index_status or {}).get("files", []):
+        name = os.path.basename(file_status.get("path") or "")
+        if name not in current_names:
+            continue
+        state = file_status.get("state")
+        if state == "ready":
+            st.caption(f"✅ {name}: 색인 완료 ({file_status.get('total') or 0} chunks, {file_status.get('elapsed_s')}s)")
+        elif state == "failed":
+            st.caption(f"⚠️ {name}: 색인 실패: {file_status.get('error')}")
+        elif file_status.get("total"):
+            st.progress(file_status.get("progress") or 0.0,
+                        text=f"{name}: 색인 중... {file_status.get('done')}/{file_status.get('total')} chunks "
+                             "(색인 중에도 질문할 수 있으며, 완료된 부분까지 검색됩니다)")
+        else:
+            st.caption(f"⏳ {name}: 색인 중... {file_status.get('done')} chunks "
+                       "(색인 중에도 질문할 수 있으며, 완료된 부분까지 검색됩니다)")
@@ -0,0 +1,157 @@
+# new_src/web/upload_stream.py
+"""
+/upload 용 스트리밍 multipart 수신기
+
+request.stream() 으로 들어오는 chunk 를 multipart 파서에 바로 흘려보내고,
+파일 part 의 데이터는 받는 즉시 sha256 해시 + 임시 파일 기록 → 끝나면 os.replace 로 교체합니다.
+파일 전체를 메모리(또는 Starlette 의 spool 임시 파일)에 올리지 않으므로
+UI/API 가 서로 다른 호스트에 있어도 되고, 큰 업로드도 메모리가 chunk 크기로 유지됩니다.
+파싱 / 파일 기록 / 해시는 블로킹 작업이라 chunk 마다 스레드풀에서 실행 (큰 업로드 중에도 이벤트 루프는 다른 요청 처리).
+
+    uploads/<session_id>/<file name>
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from ..upload_helpers import SUPPORTED_EXTENSIONS
+from ..util.util import is_valid_session_id
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))  # 파일 하나 기준
+
+
+class UploadError(ValueError):
+    """잘못된 업로드 요청 (status_code 로 HTTP 상태를 함께 전달)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def session_upload_dir(session_id: str) -> Path:
+    """세션 업로드 폴더 (session_id 는 경로 조작 방지를 위해 영문/숫자/-/_ 만 허용)."""
+    if not is_valid_session_id(session_id):
+        raise UploadError("Invalid session_id")
+    return UPLOAD_DIR / session_id
+
+def safe_filename(filename: str) -> str:
+    name = os.path.basename(filename.replace("\\", "/")).strip()
+    if not name or name.startswith("."):
+        raise UploadError(f"Invalid file name: {filename!r}")
+    if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise UploadError(f"Unsupported file type: {name} (only {', '.join(SUPPORTED_EXTENSIONS)})", 415)
+    return name
+
+
+class _PartWriter:
+    """multipart 파일 part 하나를 임시 파일에 기록하며 해시를 계산."""
+
+    def __init__(self, target_dir: Path, filename: str):
+        self.name = safe_filename(filename)
+        self.path = target_dir / self.name
+        self.tmp = target_dir / f".{self.name}.{uuid.uuid4().hex[:8]}.part"
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._f = open(self.tmp, "wb")
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > UPLOAD_MAX_BYTES:
+            raise UploadError(f"{self.name} exceeds UPLOAD_MAX_BYTES ({UPLOAD_MAX_BYTES} bytes)", 413)
+        self._hash.update(data)
+        self._f.write(data)
+
+    def finish(self) -> Dict:
+        self._f.close()
+        os.replace(self.tmp, self.path)  # 같은 이름 재업로드는 원자적으로 덮어쓰기
+        return {"name": self.name, "path": self.path.as_posix(), "size": self.size,
+                "sha256": self._hash.hexdigest()}
+
+    def abort(self) -> None:
+        self._f.close()
+        if self.tmp.exists():
+            self.tmp.unlink()
+
+
+async def receive_files(request: Request, target_dir: Path) -> List[Dict]:
+    """
+    multipart/form-data 요청 본문을 스트리밍으로 읽어 파일 part 를 target_dir 에 저장합니다.
+    반환: [{"name", "path", "size", "sha256"}, ...] (파일이 아닌 form field 는 무시)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data body")
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    # 파서 콜백은 동기 함수라 이벤트만 모아 두고, chunk 마다 아래 루프에서 처리
+    events: List[tuple] = []
+    callbacks = {
+        "on_part_begin": lambda: events.append(("begin", None)),
+        "on_header_field": lambda d, s, e: events.append(("field", d[s:e])),
+        "on_header_value": lambda d, s, e: events.append(("value", d[s:e])),
+        "on_header_end": lambda: events.append(("header_end", None)),
+        "on_part_data": lambda d, s, e: events.append(("data", d[s:e])),
+        "on_part_end": lambda: events.append(("end", None)),
+    }
+    parser = MultipartParser(params[b"boundary"], callbacks)
+
+    received: List[Dict] = []
+    writer: Optional[_PartWriter] = None
+    field, value = b"", b""
+
+    def handle(kind: str, payload: Optional[bytes]) -> None:
+        nonlocal writer, field, value
+        if kind == "begin":
+            field, value = b"", b""
+        elif kind == "field":
+            field += payload
+        elif kind == "value":
+            value += payload
+        elif kind == "header_end":
+            if field.lower() == b"content-disposition":
+                _, disp = parse_options_header(value)
+                if b"filename" in disp:
+                    writer = _PartWriter(target_dir, disp[b"filename"].decode("utf-8", "replace"))
+            field, value = b"", b""
+        elif kind == "data":
+            if writer is not None:
+                writer.write(payload)
+        elif kind == "end":
+            if writer is not None:
+                received.append(writer.finish())
+                writer = None
+
+    def feed(chunk: Optional[bytes]) -> None:
+        # 스레드풀에서 실행 (chunk 는 순서대로 하나씩 await 하므로 위 상태를 동시에 건드리지 않음)
+        if chunk is None:
+            parser.finalize()
+        else:
+            parser.write(chunk)
+        for kind, payload in events:
+            handle(kind, payload)
+        events.clear()
+
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(feed, chunk)
+        await run_in_threadpool(feed, None)
+    except MultipartParseError as e:
+        if writer is not None:
+            await run_in_threadpool(writer.abort)
+        raise UploadError(f"Malformed multipart body: {e}")
+    except Exception:
+        if writer is not None:
+            await run_in_threadpool(writer.abort)
+        raise
+    if writer is not None:  # 본문이 part 중간에서 끊긴 경우
+        await run_in_threadpool(writer.abort)
+        raise UploadError("Incomplete multipart body")
+    return received
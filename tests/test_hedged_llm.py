@@ -0,0 +1,104 @@
+# tests/test_hedged_llm.py
+"""
+HedgedChatModel 동작 확인 (FakeDelayModel, 네트워크/키 불필요)
+
+    uv run python -m pytest -q tests/test_hedged_llm.py
+"""
+import time
+import uuid
+
+import pytest
+
+from src import hedged_llm, metrics
+from src.hedged_llm import FakeDelayModel, HedgedChatModel
+
+HEDGE_DELAY_S = 0.1
+
+
+@pytest.fixture(autouse=True)
+def short_hedge_delay(monkeypatch):
+    # 관측이 HEDGE_MIN_SAMPLES 미만이면 기본 지연을 쓰므로 그 값만 짧게
+    monkeypatch.setattr(hedged_llm, "HEDGE_DEFAULT_DELAY_S", HEDGE_DELAY_S)
+    monkeypatch.setattr(hedged_llm, "HEDGE_MIN_DELAY_S", HEDGE_DELAY_S)
+
+
+def _name() -> str:
+    # 테스트마다 다른 모델 이름 → 프로세스 공용 metrics 가 서로 섞이지 않음
+    return f"test_{uuid.uuid4().hex[:8]}"
+
+def _counter(name: str, **labels) -> float:
+    key = metrics._fmt_labels(metrics._key(labels))
+    return metrics.snapshot()["counters"].get(name, {}).get(key, 0.0)
+
+
+def test_hedge_fires_after_delay_and_faster_result_wins():
+    primary = FakeDelayModel(lambda: 1.0, "primary")
+    fallback = FakeDelayModel(lambda: 0.01, "fallback")
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    started = time.perf_counter()
+    result = model.invoke("q")
+    elapsed = time.perf_counter() - started
+
+    assert result.content == "answer from fallback"
+    assert HEDGE_DELAY_S <= elapsed < 0.5  # hedge 지연만큼은 기다렸고, 느린 1차 호출은 기다리지 않음
+    assert len(primary.calls) == 1 and len(fallback.calls) == 1
+    assert _counter("llm_hedge_total", model=model.name, reason="slow") == 1
+    assert _counter("llm_hedge_wins_total", model=model.name, winner="hedge") == 1
+
+
+def test_fast_primary_does_not_hedge():
+    primary = FakeDelayModel(lambda: 0.0, "primary")
+    fallback = FakeDelayModel(lambda: 0.0, "fallback")
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    assert model.invoke("q").content == "answer from primary"
+    assert fallback.calls == []
+    assert _counter("llm_hedge_total", model=model.name, reason="slow") == 0
+
+
+def test_primary_error_fails_over_immediately(monkeypatch):
+    monkeypatch.setattr(hedged_llm, "HEDGE_DEFAULT_DELAY_S", 5.0)  # 오류면 이 지연을 기다리지 않아야 함
+    primary = FakeDelayModel(lambda: 0.0, "primary", error=RuntimeError("primary down"))
+    fallback = FakeDelayModel(lambda: 0.01, "fallback")
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    started = time.perf_counter()
+    result = model.invoke("q")
+
+    assert result.content == "answer from fallback"
+    assert time.perf_counter() - started < 1.0
+    assert _counter("llm_hedge_total", model=model.name, reason="error") == 1
+
+
+def test_error_reraised_when_both_calls_fail():
+    primary = FakeDelayModel(lambda: 0.0, "primary", error=RuntimeError("primary down"))
+    fallback = FakeDelayModel(lambda: 0.0, "fallback", error=ValueError("fallback down"))
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    with pytest.raises(RuntimeError, match="primary down"):
+        model.invoke("q")
+    assert len(fallback.calls) == 1
+
+
+def test_slow_primary_error_reraised_when_hedge_also_fails():
+    primary = FakeDelayModel(lambda: 0.3, "primary", error=RuntimeError("primary down"))
+    fallback = FakeDelayModel(lambda: 0.0, "fallback", error=ValueError("fallback down"))
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    with pytest.raises(ValueError, match="fallback down"):  # 먼저 실패한 쪽의 오류
+        model.invoke("q")
+    assert len(primary.calls) == 1 and len(fallback.calls) == 1
+
+
+def test_bound_kwargs_reach_both_calls():
+    primary = FakeDelayModel(lambda: 0.5, "primary")
+    fallback = FakeDelayModel(lambda: 0.0, "fallback")
+    model = HedgedChatModel(primary, fallback, name=_name())
+
+    bound = model.bind(tool_choice="rag_search")
+    bound.invoke("q", timeout=30)
+
+    expected = {"tool_choice": "rag_search", "timeout": 30}
+    assert primary.calls == [expected]
+    assert fallback.calls == [expected]